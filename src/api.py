@@ -1,24 +1,34 @@
 from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 import logging
 from src.v1.router import router_v1
-from src.v1.main import get_engine
+from src.v1 import main as engine_main
+from src.v1.startup import STARTUP_BACKGROUND, StartupLoader, default_loader
+from src.v1 import metrics
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+startup_loader: Optional[StartupLoader] = None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 서버 시작 시 ERes2Net 모델을 즉시 로드하여 GPU에 항시 띄워둡니다.
-    logger.info("Pre-loading ERes2Net model into GPU memory...")
-    try:
-        get_engine()
-        logger.info("ERes2Net model is now resident in GPU memory.")
-    except Exception as e:
-        logger.error(f"Failed to pre-load ERes2Net model: {e}")
+    # ERes2Net 모델(→ 스케줄러 → 워밍업 → 기준 임베딩)과 Kiwi 를 백그라운드 스레드에서 병렬로 로드합니다.
+    # 로드가 끝나기 전에도 서버는 바로 시작되며, 준비 여부와 구성 요소별 소요 시간은 GET /ready 로 확인합니다.
+    global startup_loader
+    startup_loader = default_loader().start()
+    if not STARTUP_BACKGROUND:
+        await run_in_threadpool(startup_loader.wait)
     yield
+    if engine_main.job_manager is not None:
+        engine_main.job_manager.stop()
+    if engine_main.scheduler is not None:
+        engine_main.scheduler.stop()
 
 app = FastAPI(
     title="Speaker Recognition API",
@@ -31,7 +41,21 @@ app.include_router(router_v1)
 
 @app.get("/health")
 async def health():
+    """프로세스 생존 여부 (liveness). 모델 로드 상태와 무관하게 응답합니다."""
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def ready():
+    """준비 여부 (readiness). 필수 구성 요소가 모두 로드/워밍업되면 200, 아니면 503 과 구성 요소별 상태/소요 시간."""
+    if startup_loader is None:
+        return JSONResponse({"ready": False, "components": {}}, status_code=503)
+    body = startup_loader.describe()
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus 텍스트 형식의 단계별 지연 시간 히스토그램, 세그먼트/unknown 카운터, 모델 로드 시간, 스케줄러 대기열 길이."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     uvicorn.run("src.api:app", host="0.0.0.0", port=8016, reload=True)
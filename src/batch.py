@@ -0,0 +1,311 @@
+"""보관된 회의 녹음 + Whisper JSON 을 HTTP 없이 일괄 처리하는 배치 CLI.
+
+- 입력 디렉토리(같은 이름의 오디오/JSON 쌍) 또는 JSONL 매니페스트(`{"id", "audio", "whisper"}`)를 읽습니다.
+- 부모 프로세스가 기준 화자 임베딩 캐시와 메모리 매핑 인덱스를 한 번 만들고,
+  워커 프로세스는 모델을 한 번만 로드한 뒤 같은 인덱스를 매핑해 공유합니다.
+- 결과는 녹음당 한 줄의 JSONL 로 기록하며, 이미 성공한 녹음은 다시 실행할 때 건너뜁니다 (중단 후 재개).
+- 처리한 녹음 시간 / 경과 시간(녹음 시간 per 실제 시간)을 주기적으로 출력합니다.
+
+실행: python -m src.batch --input-dir /data/meetings --output results.jsonl --workers 4
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".m4a", ".mp3", ".ogg", ".webm", ".mp4")
+PROGRESS_INTERVAL_SEC = 30.0
+
+# 워커 프로세스별 상태 (initializer 에서 설정)
+_worker_engine = None
+_worker_options: Dict[str, Any] = {}
+
+
+def discover_jobs(input_dir: Optional[str] = None, manifest: Optional[str] = None) -> List[Dict[str, Any]]:
+    """처리할 녹음 목록. 각 항목은 id, audio, whisper 경로를 가집니다.
+
+    - input_dir: 하위 디렉토리까지 오디오 파일을 찾고, 같은 위치/같은 이름의 .json 을 Whisper 결과로 사용합니다.
+    - manifest: 한 줄에 하나씩 {"audio": ..., "whisper": ..., "id": (선택)} 인 JSONL. 상대 경로는 매니페스트 기준입니다.
+    """
+    jobs: List[Dict[str, Any]] = []
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                    audio = os.path.join(base, item["audio"])
+                    whisper = os.path.join(base, item["whisper"])
+                except (ValueError, KeyError) as e:
+                    logger.error(f"Skipping manifest line {line_no}: {e}")
+                    continue
+                jobs.append({"id": str(item.get("id") or os.path.relpath(audio, base)), "audio": audio, "whisper": whisper})
+    elif input_dir:
+        root = Path(input_dir).resolve()
+        for path in sorted(root.rglob("*")):
+            if not path.is_file() or path.suffix.lower() not in AUDIO_EXTENSIONS:
+                continue
+            whisper = path.with_suffix(".json")
+            if not whisper.exists():
+                logger.warning(f"No Whisper JSON next to {path}, skipping")
+                continue
+            jobs.append({"id": str(path.relative_to(root)), "audio": str(path), "whisper": str(whisper)})
+    return jobs
+
+
+def read_checkpoint(output_path: str, retry_failed: bool = False) -> Set[str]:
+    """출력 JSONL 에서 이미 끝난 녹음 id 를 읽습니다.
+
+    중단 시점에 마지막 줄이 잘려 있으면 그 줄을 잘라내 이어서 추가해도 JSONL 이 깨지지 않게 합니다.
+    retry_failed 가 True 이면 실패(status=error) 기록은 완료로 보지 않습니다.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            logger.warning(f"Truncating incomplete last record in {output_path}")
+            f.truncate(end)
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("status") == "success" or not retry_failed:
+            done.add(record.get("id"))
+    return done
+
+
+def prepare_enrollment(speakers_root: str) -> Dict[str, Any]:
+    """부모 프로세스에서 기준 화자 임베딩 캐시와 메모리 매핑 인덱스를 최신 상태로 만듭니다."""
+    from src.v1.main import get_engine
+
+    start = time.time()
+    store = get_engine().get_enrollment_store(speakers_root, force_refresh=True)
+    matrix = store.matrix()
+    if len(matrix) == 0:
+        raise RuntimeError(f"No speaker enrollment files found in {speakers_root}")
+    return {
+        "speakers": len(matrix),
+        "refs": int(matrix.embeddings.size(0)),
+        "refresh": store.last_stats,
+        "elapsed": round(time.time() - start, 3),
+    }
+
+
+def _init_worker(options: Dict[str, Any]) -> None:
+    """워커 프로세스마다 한 번: 스레드 수를 나누고 모델을 로드합니다."""
+    global _worker_engine, _worker_options
+    import torch
+    from src.v1 import main as engine_main
+
+    if options.get("threads"):
+        torch.set_num_threads(options["threads"])
+    _worker_options = options
+    _worker_engine = engine_main.get_engine()
+    # 부모가 만든 캐시/인덱스를 읽기만 하므로 녹음마다 직원 DB 를 다시 스캔하지 않습니다.
+    _worker_engine.get_enrollment_store(options["speakers_root"]).refresh_interval = float("inf")
+
+
+def _process(job: Dict[str, Any]) -> Dict[str, Any]:
+    """녹음 하나를 처리합니다. 파형 전체를 메모리에 올리지 않도록 PCM 캐시 파일로 디코딩해 스트리밍 경로로 식별합니다."""
+    from src.v1.audio import decode_to_pcm_file
+    from src.v1.vad import vad_config
+
+    opts = _worker_options
+    started = time.time()
+    record: Dict[str, Any] = {"id": job["id"], "audio": job["audio"], "whisper": job["whisper"]}
+    try:
+        with open(job["whisper"], "r", encoding="utf-8") as f:
+            whisper_data = json.load(f)
+        with open(job["audio"], "rb") as f:
+            pcm, decode_info = decode_to_pcm_file(f, job["audio"])
+        results: List[Dict[str, Any]] = []
+        summary: Dict[str, Any] = {}
+        with pcm:
+            for item in _worker_engine.identify_speaker_stream(
+                pcm,
+                whisper_data,
+                opts["speakers_root"],
+                threshold=opts["threshold"],
+                aggregate=opts["aggregate"],
+                top_k=opts["top_k"],
+                search=opts["search"],
+                mode=opts["mode"],
+                vad=vad_config(opts["vad"]),
+                split=opts["split_speakers"],
+            ):
+                if "speaker" in item:
+                    results.append(item)
+                else:
+                    summary = item
+        record.update(
+            status="success",
+            duration=decode_info["duration"],
+            processing_time=round(time.time() - started, 3),
+            results=results,
+        )
+        for key in ("clustering", "cascade", "vad", "speaker_change"):
+            if key in summary:
+                record[key] = summary[key]
+    except Exception as e:
+        # [[memory:6804125]]
+        logger.error(f"Failed to process {job['id']}: {e}")
+        record.update(status="error", error=str(e), processing_time=round(time.time() - started, 3))
+    record["pid"] = os.getpid()
+    return record
+
+
+class Throughput:
+    """처리한 녹음 길이 합계와 경과 시간으로 처리량(녹음 시간 / 실제 시간)을 계산합니다."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.started = time.time()
+        self.last_report = self.started
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.done += 1
+        if record.get("status") != "success":
+            self.failed += 1
+        self.audio_seconds += record.get("duration") or 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = max(1e-9, time.time() - self.started)
+        return {
+            "recordings": self.done,
+            "remaining": self.total - self.done,
+            "failed": self.failed,
+            "audio_hours": round(self.audio_seconds / 3600, 3),
+            "wall_hours": round(elapsed / 3600, 4),
+            "recording_hours_per_hour": round(self.audio_seconds / elapsed, 2),
+            "recordings_per_min": round(self.done / elapsed * 60, 2),
+        }
+
+    def maybe_report(self, force: bool = False) -> None:
+        now = time.time()
+        if force or now - self.last_report >= PROGRESS_INTERVAL_SEC:
+            self.last_report = now
+            s = self.summary()
+            logger.info(
+                f"{s['recordings']}/{self.total} recordings ({s['failed']} failed), "
+                f"{s['audio_hours']}h audio, {s['recording_hours_per_hour']} recording-hours per hour"
+            )
+
+
+def _bounded_map(executor: ProcessPoolExecutor, jobs: List[Dict[str, Any]], max_in_flight: int) -> Iterator[Dict[str, Any]]:
+    """작업을 한꺼번에 제출하지 않고 max_in_flight 개만 유지하며 완료 순서대로 결과를 내보냅니다."""
+    pending = set()
+    it = iter(jobs)
+    for job in it:
+        pending.add(executor.submit(_process, job))
+        if len(pending) >= max_in_flight:
+            break
+    while pending:
+        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in finished:
+            yield fut.result()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.add(executor.submit(_process, nxt))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline speaker identification for archived meetings")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--input-dir", help="오디오 파일과 같은 이름의 Whisper JSON 이 있는 디렉토리")
+    src.add_argument("--manifest", help='한 줄에 {"audio", "whisper", "id"} 인 JSONL 매니페스트')
+    parser.add_argument("--output", required=True, help="결과 JSONL (이미 있으면 끝난 녹음은 건너뛰고 이어서 기록)")
+    parser.add_argument("--speakers-root", default=None, help="기준 화자 디렉토리 (기본값: EMPLOYEE_DB_PATH)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 4))
+    parser.add_argument("--threads-per-worker", type=int, default=0, help="0 이면 CPU 코어 수 / workers")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--aggregate", default="max")
+    parser.add_argument("--top-k", type=int, default=0)
+    parser.add_argument("--search", default="exact")
+    parser.add_argument("--mode", default="segment")
+    parser.add_argument("--vad", default=None, help="off, trim, mask (기본값: VAD_MODE)")
+    parser.add_argument("--split-speakers", action="store_true", help="긴 문장 안의 화자 전환 지점에서 문장을 나눔")
+    parser.add_argument("--retry-failed", action="store_true", help="이전 실행에서 실패한 녹음도 다시 처리")
+    parser.add_argument("--limit", type=int, default=0, help="0 보다 크면 이번 실행에서 처리할 최대 녹음 수")
+    args = parser.parse_args(argv)
+
+    from src.v1.vad import vad_config
+
+    try:
+        vad_config(args.vad)
+    except ValueError as e:
+        parser.error(str(e))
+
+    from src.v1.main import get_employee_db_path
+
+    speakers_root = os.path.abspath(args.speakers_root or get_employee_db_path())
+    jobs = discover_jobs(args.input_dir, args.manifest)
+    done = read_checkpoint(args.output, retry_failed=args.retry_failed)
+    todo = [job for job in jobs if job["id"] not in done]
+    # 긴 녹음부터 배분해 마지막에 한 워커만 긴 녹음을 처리하며 남는 시간을 줄입니다.
+    todo.sort(key=lambda job: os.path.getsize(job["audio"]) if os.path.exists(job["audio"]) else 0, reverse=True)
+    if args.limit > 0:
+        todo = todo[: args.limit]
+    logger.info(f"{len(jobs)} recordings found, {len(done)} already done, {len(todo)} to process")
+    if not todo:
+        return 0
+
+    enrollment = prepare_enrollment(speakers_root)
+    logger.info(f"Enrollment ready: {enrollment['speakers']} speakers ({enrollment['refs']} refs) in {enrollment['elapsed']}s")
+
+    workers = max(1, min(args.workers, len(todo)))
+    options = {
+        "speakers_root": speakers_root,
+        "threads": args.threads_per_worker or max(1, (os.cpu_count() or 1) // workers),
+        "threshold": args.threshold,
+        "aggregate": args.aggregate,
+        "top_k": args.top_k,
+        "search": args.search,
+        "mode": args.mode,
+        "vad": args.vad,
+        "split_speakers": args.split_speakers,
+    }
+    stats = Throughput(len(todo))
+    # fork 는 부모의 torch 스레드/CUDA 상태를 물려받아 멈출 수 있으므로 spawn 을 사용합니다.
+    ctx = multiprocessing.get_context("spawn")
+    with open(args.output, "a", encoding="utf-8") as out:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(options,))
+        try:
+            for record in _bounded_map(executor, todo, workers * 2):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+                stats.add(record)
+                stats.maybe_report()
+        except KeyboardInterrupt:
+            logger.warning("Interrupted; finished records are kept in the output and will be skipped on the next run")
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown(wait=True)
+
+    stats.maybe_report(force=True)
+    print(json.dumps({"enrollment": enrollment, "workers": workers, **stats.summary()}, ensure_ascii=False, indent=2))
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""CPU 임베딩 백엔드 벤치마크: modelscope(eager) vs TorchScript vs ONNX Runtime (fp32 / int8).
+
+기준 음성(기본: 직원 DB)으로 modelscope 임베딩 대비 코사인 유사도와 점수 오차를 확인하고,
+세그먼트 배치 처리량(seg/s)과 단일 세그먼트 지연 시간(p50/p95)을 측정합니다.
+실행: python -m src.resoursces.test.bench_backends --backends torchscript onnx --quantize none int8
+"""
+import time
+import argparse
+import tempfile
+import logging
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from src.v1.main import get_engine, get_employee_db_path
+from src.v1.audio import load_audio
+from src.v1.batching import BatchedEmbedder, compute_fbank
+from src.v1.backends import (
+    ExportedEmbedder,
+    configure_threads,
+    export_onnx,
+    export_path,
+    export_torchscript,
+    load_onnx_runner,
+    load_torchscript_runner,
+    parity_check,
+)
+
+# 로거 설정 [[memory:6804125]]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTS = (".wav", ".mp3", ".m4a", ".flac")
+
+
+def reference_feats(root: str, limit: int):
+    feats = []
+    for path in sorted(p for p in Path(root).rglob("*") if p.suffix.lower() in AUDIO_EXTS)[:limit]:
+        try:
+            wav, _ = load_audio(str(path))
+        except Exception as e:
+            # [[memory:6804125]]
+            logger.error(f"Skipping {path}: {e}")
+            continue
+        feats.append(compute_fbank(wav))
+    return feats
+
+
+def random_segments(n: int, min_sec: float, max_sec: float, seed: int):
+    gen = torch.Generator().manual_seed(seed)
+    lengths = torch.randint(int(min_sec * 100), int(max_sec * 100), (n,), generator=gen)
+    return [compute_fbank(torch.randn(1, int(length) * 160, generator=gen) * 0.1) for length in lengths]
+
+
+def measure(embedder: BatchedEmbedder, segments, repeats: int):
+    embedder.embed(segments[:4])  # warm-up
+    start = time.time()
+    embedder.embed(segments)
+    throughput = len(segments) / (time.time() - start)
+    latencies = []
+    for feats in segments[:repeats]:
+        start = time.time()
+        embedder.embed([feats])
+        latencies.append((time.time() - start) * 1000)
+    return throughput, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torchscript", "onnx"])
+    parser.add_argument("--quantize", nargs="+", default=["none", "int8"])
+    parser.add_argument("--reference-dir", default=get_employee_db_path())
+    parser.add_argument("--reference-clips", type=int, default=32)
+    parser.add_argument("--segments", type=int, default=200)
+    parser.add_argument("--min-sec", type=float, default=0.6)
+    parser.add_argument("--max-sec", type=float, default=8.0)
+    parser.add_argument("--latency-repeats", type=int, default=50)
+    parser.add_argument("--export-dir", default="")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    configure_threads()
+    engine = get_engine()
+    embedding_model = engine.sv_pipeline.model.embedding_model.cpu().eval()
+    reference = BatchedEmbedder(embedding_model)
+    clips = reference_feats(args.reference_dir, args.reference_clips) or random_segments(8, 1.0, 6.0, args.seed)
+    segments = random_segments(args.segments, args.min_sec, args.max_sec, args.seed)
+    export_dir = args.export_dir or tempfile.mkdtemp(prefix="speaker_backends_")
+
+    rows = [("modelscope", None, *measure(reference, segments, args.latency_repeats))]
+    for backend in args.backends:
+        for quantize in args.quantize:
+            name = f"{backend}-{quantize}"
+            path = export_path(export_dir, "bench", backend, quantize)
+            try:
+                if backend == "onnx":
+                    export_onnx(embedding_model, path, quantize)
+                    runner = load_onnx_runner(path)
+                else:
+                    export_torchscript(embedding_model, path, quantize)
+                    runner = load_torchscript_runner(path)
+            except Exception as e:
+                # [[memory:6804125]]
+                logger.error(f"{name}: export/load failed: {e}")
+                continue
+            embedder = ExportedEmbedder(runner, name)
+            parity = parity_check(reference, embedder, clips)
+            rows.append((name, parity, *measure(embedder, segments, args.latency_repeats)))
+
+    base = rows[0][2]
+    print(f"reference clips: {len(clips)}  segments: {len(segments)}  threads: {torch.get_num_threads()}")
+    for name, parity, throughput, p50, p95 in rows:
+        quality = (
+            f"cos min={parity['min_cosine']:.5f} mean={parity['mean_cosine']:.5f} "
+            f"score_err={parity['max_score_abs_error']:.5f}" if parity else "reference"
+        )
+        print(
+            f"{name:<18} {throughput:8.1f} seg/s (x{throughput / base:.2f})  "
+            f"latency p50={p50:.1f}ms p95={p95:.1f}ms  | {quality}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""세그먼트 임베딩 추출 벤치마크: 기존 파일 단위 경로 vs 길이 버킷 배치 경로.
+
+실행: python -m src.resoursces.test.bench_batch_embedding --segments 200 --batch-size 32
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import logging
+
+import torch
+import torchaudio
+
+from src.v1.main import get_engine
+from src.v1.batching import BatchedEmbedder
+
+# 로거 설정 [[memory:6804125]]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_chunks(n_segments: int, min_sec: float, max_sec: float, seed: int):
+    rng = random.Random(seed)
+    chunks, t = [], 0.0
+    for _ in range(n_segments):
+        dur = rng.uniform(min_sec, max_sec)
+        chunks.append({"start": t, "end": t + dur, "text": "", "speaker": "unknown"})
+        t += dur + rng.uniform(0.0, 0.5)
+    return chunks, t
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, default=200)
+    parser.add_argument("--min-sec", type=float, default=0.6)
+    parser.add_argument("--max-sec", type=float, default=8.0)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    chunks, total_sec = make_chunks(args.segments, args.min_sec, args.max_sec, args.seed)
+    torch.manual_seed(args.seed)
+    wav = torch.randn(1, int(total_sec * 16000) + 16000) * 0.1
+    n_samples = wav.size(1)
+
+    # 1. 기존 방식: 청크마다 /tmp wav 저장 후 다시 읽어 한 개씩 임베딩
+    tmp_path = os.path.join(tempfile.gettempdir(), f"bench_seg_{os.getpid()}.wav")
+    start = time.time()
+    per_file = []
+    try:
+        for c in chunks:
+            s_idx, e_idx = int(round(c["start"] * 16000)), min(n_samples, int(round(c["end"] * 16000)))
+            torchaudio.save(tmp_path, wav[:, s_idx:e_idx], 16000)
+            seg, _ = torchaudio.load(tmp_path)
+            with torch.no_grad():
+                per_file.append(engine.sv_pipeline.model(seg).reshape(-1).float())
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    per_file_sec = time.time() - start
+
+    # 2. 배치 방식: 메모리 상에서 길이 버킷 배치 추출
+    engine.embedder = BatchedEmbedder(engine.sv_pipeline.model.embedding_model, batch_size=args.batch_size)
+    start = time.time()
+    _, batched = engine.extract_chunk_embeddings(wav, chunks)
+    batched_sec = time.time() - start
+
+    cos = torch.nn.functional.cosine_similarity(torch.stack(per_file), batched, dim=1)
+    print(f"segments: {len(chunks)}  audio: {total_sec:.1f}s  device: {engine.device}")
+    print(f"per-file : {per_file_sec:.2f}s  ({len(chunks) / per_file_sec:.1f} seg/s)")
+    print(f"batched  : {batched_sec:.2f}s  ({len(chunks) / batched_sec:.1f} seg/s)  speedup x{per_file_sec / batched_sec:.2f}")
+    print(f"embedding cosine vs per-file: min={cos.min().item():.5f} mean={cos.mean().item():.5f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""2단계(cascade) 채점 벤치마크: 전체 모델 단독 경로(mode=segment) 대비 지연 시간, 단계별 처리량, 화자 일치율을 비교합니다.
+
+- 같은 합성 회의에 대해 mode=segment 를 기준으로 실행한 뒤, CASCADE_MARGIN 값마다 mode=cascade 를 실행합니다.
+- agreement: 기준 경로와 화자 라벨이 같은 문장 비율, accuracy: 합성 정답 대비 화자 정확도
+- rescored_ratio: 2단계(전체 구간 재채점)로 넘어간 문장 비율, embedded_seconds: 단계별 임베딩 길이 합계
+실행: python -m src.resoursces.test.bench_cascade --speakers 5 --sentences 200 --margins 0.05 0.1 0.2
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import logging
+from typing import Any, Dict, List
+
+from src.v1 import main as engine_main
+from src.v1.audio import decode_stream
+from src.v1.utils.kr_tag import kiwi_tagger
+from src.resoursces.test.bench_suite import build_engine, summarize
+from src.resoursces.test.synthetic_meeting import generate_meeting, speaker_accuracy
+
+# 로거 설정 [[memory:6804125]]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def agreement(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]]) -> float:
+    """같은 구간(start, end)의 화자 라벨이 기준 결과와 같은 비율."""
+    base = {(r["start"], r["end"]): r["speaker"] for r in baseline}
+    pairs = [(r["speaker"], base[(r["start"], r["end"])]) for r in results if (r["start"], r["end"]) in base]
+    return round(sum(a == b for a, b in pairs) / len(pairs), 4) if pairs else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--speakers", type=int, default=5)
+    parser.add_argument("--sentences", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--margins", type=float, nargs="+", default=[0.05, 0.1, 0.2])
+    parser.add_argument("--crop-sec", type=float, default=engine_main.CASCADE_CROP_SEC)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_cascade_")
+    try:
+        meeting = generate_meeting(
+            os.path.join(work_dir, "meeting"), n_speakers=args.speakers, n_sentences=args.sentences, seed=args.seed
+        )
+        with open(meeting.whisper_path, encoding="utf-8") as f:
+            whisper = json.load(f)
+        with open(meeting.audio_path, "rb") as f:
+            wav, _ = decode_stream(f, os.path.basename(meeting.audio_path))
+        engine = build_engine(args.model, os.path.join(work_dir, "cache"))
+        engine.load_matrix(meeting.speakers_root)
+        kiwi_tagger.load()
+        engine_main.CASCADE_CROP_SEC = args.crop_sec
+
+        def _run(mode: str):
+            latencies, response = [], None
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                response = engine.identify_speaker(
+                    wav, whisper, meeting.speakers_root, threshold=args.threshold, mode=mode
+                )
+                latencies.append(time.perf_counter() - start)
+            return summarize(latencies, items=len(response["results"]), audio_sec=meeting.duration), response
+
+        report: Dict[str, Any] = {"audio_sec": round(meeting.duration, 2), "crop_sec": args.crop_sec, "runs": {}}
+        latency, baseline = _run("segment")
+        report["runs"]["segment"] = {
+            "latency": latency, "accuracy": speaker_accuracy(baseline["results"], meeting.truth), "agreement": 1.0,
+        }
+        for margin in args.margins:
+            engine_main.CASCADE_MARGIN = margin
+            latency, response = _run("cascade")
+            report["runs"][f"cascade@{margin}"] = {
+                "latency": latency,
+                "accuracy": speaker_accuracy(response["results"], meeting.truth),
+                "agreement": agreement(response["results"], baseline["results"]),
+                "cascade": response["cascade"],
+            }
+
+        base_p50 = report["runs"]["segment"]["latency"]["p50_ms"]
+        for name, row in report["runs"].items():
+            cascade = row.get("cascade", {})
+            print(
+                f"{name:>14} | p50={row['latency']['p50_ms']:9.1f}ms ({row['latency']['p50_ms'] / base_p50:5.2f}x) "
+                f"acc={row['accuracy']} agree={row['agreement']:.4f} "
+                f"rescored={cascade.get('rescored_ratio', '-')} full_dim_cmp={cascade.get('full_dim_comparisons', '-')}"
+            )
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
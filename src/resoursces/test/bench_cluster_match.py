@@ -0,0 +1,81 @@
+"""cluster 모드 벤치마크: 세그먼트 단위 채점 vs 군집화 후 클러스터 중심 채점.
+
+모델 없이 합성 임베딩(회의 참석자 중심 + 세그먼트별 잡음)으로 비교 횟수, 지연 시간, 화자 일치율을 측정합니다.
+실행: python -m src.resoursces.test.bench_cluster_match --segments 200 800 2000 --voices 5 --enrolled 300
+"""
+import time
+import argparse
+import logging
+
+import numpy as np
+import torch
+
+from src.v1.clustering import agglomerative_cluster, cluster_centroids, comparison_stats
+from src.v1.scoring import EnrollmentMatrix, score_segments
+
+# 로거 설정 [[memory:6804125]]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def synth(args, n_segments: int):
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.enrolled, args.dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    owners = np.repeat(np.arange(args.enrolled), args.refs)
+    refs = centers[owners] + args.ref_noise * rng.standard_normal((len(owners), args.dim)).astype(np.float32)
+    # 회의 참석자는 등록 화자 중 일부
+    voices = rng.choice(args.enrolled, size=args.voices, replace=False)
+    truth = voices[rng.integers(0, args.voices, size=n_segments)]
+    segs = centers[truth] + args.seg_noise * rng.standard_normal((n_segments, args.dim)).astype(np.float32)
+    enroll = {f"spk{i:04d}": [torch.from_numpy(refs[j]) for j in np.nonzero(owners == i)[0]] for i in range(args.enrolled)}
+    return EnrollmentMatrix.from_speaker_embeddings(enroll), torch.from_numpy(segs), truth
+
+
+def run(n_segments: int, args) -> None:
+    matrix, segs, truth = synth(args, n_segments)
+    names = np.array(matrix.speakers)
+
+    start = time.time()
+    per_segment = score_segments(segs, matrix, args.threshold)
+    segment_sec = time.time() - start
+
+    start = time.time()
+    labels = agglomerative_cluster(segs.numpy(), threshold=args.cluster_threshold)
+    centroids = torch.from_numpy(cluster_centroids(segs.numpy(), labels))
+    cluster_sec = time.time() - start
+    start = time.time()
+    assigned = score_segments(centroids, matrix, args.threshold)
+    centroid_sec = time.time() - start
+    clustered = [assigned[label]["speaker"] for label in labels.tolist()]
+
+    stats = comparison_stats(n_segments, len(centroids), matrix.embeddings.size(0))
+    agree = np.mean([a["speaker"] == b for a, b in zip(per_segment, clustered)])
+    acc_seg = np.mean([a["speaker"] == names[t] for a, t in zip(per_segment, truth)])
+    acc_cls = np.mean([b == names[t] for b, t in zip(clustered, truth)])
+    print(
+        f"segments={n_segments:>5} clusters={stats['clusters']:>3} saved={stats['saved_ratio']:.3f} | "
+        f"per_segment={segment_sec * 1000:.1f}ms cluster={cluster_sec * 1000:.1f}ms+{centroid_sec * 1000:.1f}ms | "
+        f"agreement={agree:.3f} acc(segment)={acc_seg:.3f} acc(cluster)={acc_cls:.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, nargs="+", default=[200, 800, 2000])
+    parser.add_argument("--voices", type=int, default=5)
+    parser.add_argument("--enrolled", type=int, default=300)
+    parser.add_argument("--refs", type=int, default=3)
+    parser.add_argument("--dim", type=int, default=192)
+    parser.add_argument("--ref-noise", type=float, default=0.05)
+    parser.add_argument("--seg-noise", type=float, default=0.06)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--cluster-threshold", type=float, default=0.4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for n in args.segments:
+        run(n, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""fbank 특징 추출 벤치마크: 세그먼트마다 파형을 잘라 계산 vs 녹음 전체를 한 번 계산 후 프레임 구간 슬라이스.
+
+녹음 길이별로 합성 문장 청크(이웃 문장과 일부 겹침)를 만들어 특징 추출 시간과 두 방식의 특징 차이를 측정합니다.
+실행: python -m src.resoursces.test.bench_fbank --minutes 1 10 60 --overlap 0.2
+"""
+import time
+import random
+import argparse
+import logging
+
+import torch
+
+from src.v1.audio import TensorAudio
+from src.v1.batching import RecordingFeatures, chunk_sample_range, compute_fbank, fbank_frame_range
+
+# 로거 설정 [[memory:6804125]]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_chunks(total_sec: float, min_sec: float, max_sec: float, overlap: float, seed: int):
+    """녹음 전체를 덮는 문장 청크. overlap 비율만큼 앞 문장과 겹치게 시작합니다."""
+    rng = random.Random(seed)
+    chunks, t = [], 0.0
+    while t < total_sec:
+        dur = rng.uniform(min_sec, max_sec)
+        chunks.append({"start": t, "end": min(total_sec, t + dur), "text": "", "speaker": "unknown"})
+        t += dur * (1 - overlap) if rng.random() < 0.5 else dur + rng.uniform(0.0, 0.3)
+    return chunks
+
+
+def run(minutes: float, args) -> None:
+    torch.manual_seed(args.seed)
+    total_sec = minutes * 60
+    wav = torch.randn(1, int(total_sec * 16000)) * 0.1
+    audio = TensorAudio(wav)
+    chunks = make_chunks(total_sec, args.min_sec, args.max_sec, args.overlap, args.seed)
+    ranges = [chunk_sample_range(c, audio.n_samples) for c in chunks]
+
+    start = time.time()
+    per_segment = [compute_fbank(audio.read(s, e)) for s, e in ranges]
+    per_segment_sec = time.time() - start
+
+    start = time.time()
+    features = RecordingFeatures(block_sec=args.block_sec)
+    shared = [features.slice(audio, s, e) for s, e in ranges]
+    shared_sec = time.time() - start
+
+    frame_diff = max(abs(a.size(0) - b.size(0)) for a, b in zip(per_segment, shared))
+    # 시작을 프레임 격자로 맞춘 구간 단위 계산과는 (블록 경계 포함) 값이 같아야 합니다.
+    total = features.total_frames(audio.n_samples)
+    max_err = 0.0
+    for (s, e), feats in zip(ranges, shared):
+        f0, f1 = fbank_frame_range(s, e, total)
+        aligned = compute_fbank(audio.read(f0 * 160, (f1 - 1) * 160 + 400))
+        max_err = max(max_err, float((aligned - feats).abs().max()))
+    served = features.frames_served
+    print(
+        f"audio={minutes:>5.1f}min segments={len(chunks):>5} | per-segment={per_segment_sec * 1000:8.1f}ms "
+        f"whole-recording={shared_sec * 1000:8.1f}ms speedup x{per_segment_sec / shared_sec:.2f} | "
+        f"frames computed={features.frames_computed} served={served} | max_frame_diff={frame_diff} aligned_max_err={max_err:.2e}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 60])
+    parser.add_argument("--min-sec", type=float, default=0.6)
+    parser.add_argument("--max-sec", type=float, default=8.0)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    parser.add_argument("--block-sec", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for minutes in args.minutes:
+        run(minutes, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""문장 정제 벤치마크: 기존 refine_whisper_json (단어 전체 재탐색) vs 오프셋 이진 탐색 버전.
+
+합성 장시간 전사(기본 20k~80k 단어)로 두 구현의 결과가 같은지 확인하고 소요 시간을 비교합니다.
+Kiwi 문장 분리 결과는 두 구현에 공통이므로 한 번만 계산하여 캐시하고(첫 호출 시간에 포함) 매핑 비용만 비교합니다.
+실행: python -m src.resoursces.test.bench_refine --words 20000 80000
+"""
+import time
+import random
+import argparse
+import logging
+from typing import Any, Dict, List
+
+from src.v1.utils import json_paser
+from src.v1.utils.json_paser import refine_whisper_json, iter_refined_sentences, MIN_SPEAKER_DURATION, SPEAKER_VERY_SHORT, SPEAKER_UNKNOWN
+
+# 로거 설정 [[memory:6804125]]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+VOCAB = ["오늘", "회의", "안건은", "예산", "집행", "현황", "입니다", "그리고", "다음", "분기", "계획을", "공유하겠습니다",
+         "질문", "있으신가요", "네", "확인했습니다", "일정이", "조금", "늦어질", "것", "같습니다", "검토", "부탁드립니다"]
+ENDINGS = ["입니다.", "했습니다.", "있나요?", "좋네요!", "같습니다."]
+
+
+def legacy_refine(whisper_data: Dict[str, Any], kiwi_tagger) -> List[Dict[str, Any]]:
+    """변경 전 refine_whisper_json 과 동일한 구현 (문장마다 word_map 전체를 재탐색)."""
+    raw_segments = whisper_data.get("segments") or whisper_data.get("chunks") or []
+    all_words: List[Dict[str, Any]] = []
+    for seg in raw_segments:
+        words = seg.get("words", [])
+        if not words:
+            all_words.append({"start": float(seg.get("start", 0)), "end": float(seg.get("end", 0)), "word": seg.get("text", "").strip()})
+        else:
+            all_words.extend(words)
+    if not all_words:
+        return []
+    full_text = ""
+    word_map = []
+    for w in all_words:
+        w_text = (w.get("word") or w.get("text", "")).strip()
+        if not w_text:
+            continue
+        start_char = len(full_text)
+        if full_text:
+            full_text += " "
+            start_char += 1
+        full_text += w_text
+        word_map.append((start_char, len(full_text), w))
+    if not full_text:
+        return []
+    kiwi_sentences = kiwi_tagger.split_into_sents(full_text)
+    final_results = []
+    if not kiwi_sentences:
+        start_time = float(all_words[0].get("start", 0))
+        end_time = float(all_words[-1].get("end", 0))
+        final_results.append({
+            "start": start_time, "end": end_time, "text": full_text,
+            "speaker": SPEAKER_VERY_SHORT if end_time - start_time < MIN_SPEAKER_DURATION else SPEAKER_UNKNOWN,
+        })
+        return final_results
+    for sent in kiwi_sentences:
+        sent_words = [w for s, e, w in word_map if not (e <= sent.start or s >= sent.end)]
+        if sent_words:
+            start_time = float(sent_words[0].get("start", 0))
+            end_time = float(sent_words[-1].get("end", 0))
+            final_results.append({
+                "start": start_time, "end": end_time, "text": sent.text,
+                "speaker": SPEAKER_VERY_SHORT if end_time - start_time < MIN_SPEAKER_DURATION else SPEAKER_UNKNOWN,
+            })
+    return final_results
+
+
+def synth_transcript(n_words: int, seed: int) -> Dict[str, Any]:
+    """평균 12단어 문장, 세그먼트당 약 20단어로 구성된 합성 Whisper 결과."""
+    rng = random.Random(seed)
+    segments: List[Dict[str, Any]] = []
+    words: List[Dict[str, Any]] = []
+    t = 0.0
+    until_end = rng.randint(4, 20)
+    for i in range(n_words):
+        until_end -= 1
+        if until_end <= 0:
+            token = rng.choice(ENDINGS)
+            until_end = rng.randint(4, 20)
+        else:
+            token = rng.choice(VOCAB)
+        dur = rng.uniform(0.1, 0.6)
+        words.append({"start": round(t, 2), "end": round(t + dur, 2), "word": " " + token})
+        t += dur + rng.uniform(0.0, 0.2)
+        if len(words) >= 20 or i == n_words - 1:
+            segments.append({"start": words[0]["start"], "end": words[-1]["end"], "words": words})
+            words = []
+    return {"segments": segments}
+
+
+class _CachedSplitter:
+    """Kiwi 분리 결과를 한 번만 계산해 두 구현에 같은 입력을 주기 위한 래퍼."""
+
+    def __init__(self, tagger):
+        self.tagger = tagger
+        self.cache: Dict[str, Any] = {}
+
+    def split_into_sents(self, text: str):
+        if text not in self.cache:
+            self.cache[text] = self.tagger.split_into_sents(text)
+        return self.cache[text]
+
+
+def run(n_words: int, args) -> None:
+    data = synth_transcript(n_words, args.seed)
+    splitter = _CachedSplitter(json_paser.kiwi_tagger)
+    original = json_paser.kiwi_tagger
+    json_paser.kiwi_tagger = splitter
+    try:
+        # 첫 호출에서 Kiwi 분리 결과가 캐시되므로 이후 측정에는 매핑/텍스트 구성 비용만 남습니다.
+        start = time.time()
+        refine_whisper_json(data)
+        first_sec = time.time() - start
+
+        start = time.time()
+        new = refine_whisper_json(data)
+        new_sec = time.time() - start
+
+        start = time.time()
+        old = legacy_refine(data, splitter)
+        old_sec = time.time() - start
+    finally:
+        json_paser.kiwi_tagger = original
+
+    start = time.time()
+    streamed = sum(1 for _ in iter_refined_sentences(data["segments"])) if args.stream else 0
+    stream_sec = time.time() - start
+
+    line = (
+        f"words={n_words:>6} sentences={len(new):>5} identical={new == old} first_call={first_sec:.2f}s "
+        f"legacy={old_sec * 1000:.1f}ms linear={new_sec * 1000:.1f}ms speedup={old_sec / max(new_sec, 1e-9):.1f}x"
+    )
+    if args.stream:
+        line += f" | stream sentences={streamed} total={stream_sec:.2f}s"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, nargs="+", default=[20000, 80000])
+    parser.add_argument("--stream", action="store_true", help="iter_refined_sentences 도 함께 측정 (Kiwi 포함)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for n in args.words:
+        run(n, args)
+
+
+if __name__ == "__main__":
+    main()
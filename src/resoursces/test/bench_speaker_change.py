@@ -0,0 +1,151 @@
+"""문장 내부 화자 전환 분할 벤치마크: split=False(문장 단위) 대비 split=True 의 지연 시간, 추가 임베딩 길이, 시간 가중 정확도를 비교합니다.
+
+- 합성 회의에서 화자가 다른 인접 문장 쌍을 --merge-ratio 비율만큼 한 문장으로 합쳐(앞 문장 종결 어미 제거) 긴 문장 안의 화자 전환을 만듭니다.
+- time_accuracy: 결과 구간과 정답 구간이 겹치는 시간 중 화자가 같은 시간의 비율 (합친 문장을 한 화자로 태깅하면 떨어짐)
+- window_ratio: 검사한 문장 길이 대비 윈도 임베딩 길이 (추가 비용의 상한, 약 SPLIT_WINDOW_SEC / SPLIT_HOP_SEC)
+실행: python -m src.resoursces.test.bench_speaker_change --speakers 5 --sentences 200 --merge-ratio 0.3
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.v1.audio import decode_stream
+from src.v1.utils.kr_tag import kiwi_tagger
+from src.resoursces.test.bench_suite import build_engine, summarize
+from src.resoursces.test.synthetic_meeting import ENDINGS, generate_meeting, speaker_accuracy
+
+# 로거 설정 [[memory:6804125]]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _strip_ending(word: str) -> str:
+    for ending in ENDINGS:
+        if word.endswith(ending):
+            return word[: -len(ending)] + "고"
+    return word
+
+
+def merge_speaker_turns(
+    whisper: Dict[str, Any], truth: List[Dict[str, Any]], ratio: float, seed: int = 0
+) -> Dict[str, Any]:
+    """화자가 다른 인접 문장 쌍 일부를 한 세그먼트로 합친 Whisper 결과 (문장 분리기가 다시 나누지 않도록 앞 문장 어미 제거)."""
+    rng = np.random.default_rng(seed)
+    segments = whisper["segments"]
+    merged: List[Dict[str, Any]] = []
+    i = 0
+    while i < len(segments):
+        seg = segments[i]
+        if i + 1 < len(segments) and truth[i]["speaker"] != truth[i + 1]["speaker"] and rng.random() < ratio:
+            nxt = segments[i + 1]
+            words = [dict(w) for w in seg["words"]] + [dict(w) for w in nxt["words"]]
+            words[len(seg["words"]) - 1]["word"] = _strip_ending(words[len(seg["words"]) - 1]["word"])
+            merged.append({
+                "start": seg["start"],
+                "end": nxt["end"],
+                "text": " ".join(w["word"] for w in words),
+                "words": words,
+            })
+            i += 2
+            continue
+        merged.append(seg)
+        i += 1
+    return {
+        "text": " ".join(s["text"] for s in merged),
+        "chunks": [{"timestamp": [s["start"], s["end"]], "text": s["text"]} for s in merged],
+        "segments": merged,
+    }
+
+
+def time_accuracy(results: List[Dict[str, Any]], truth: List[Dict[str, Any]]) -> float:
+    """결과와 정답이 겹치는 전체 시간 중 화자가 같은 시간의 비율 (very_short 제외)."""
+    starts = np.array([x["start"] for x in truth])
+    ends = np.array([x["end"] for x in truth])
+    speakers = np.array([x["speaker"] for x in truth])
+    hit = total = 0.0
+    for res in results:
+        if res.get("speaker") == "very_short":
+            continue
+        overlap = np.clip(np.minimum(ends, res["end"]) - np.maximum(starts, res["start"]), 0.0, None)
+        total += float(overlap.sum())
+        hit += float(overlap[speakers == res.get("speaker")].sum())
+    return round(hit / total, 4) if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--speakers", type=int, default=5)
+    parser.add_argument("--sentences", type=int, default=200)
+    parser.add_argument("--merge-ratio", type=float, default=0.3)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_speaker_change_")
+    try:
+        # 합친 문장이 SPLIT_MIN_SENTENCE_SEC 를 넘도록 문장 길이를 넉넉히 둡니다.
+        meeting = generate_meeting(
+            os.path.join(work_dir, "meeting"), n_speakers=args.speakers, n_sentences=args.sentences,
+            min_sec=2.0, max_sec=8.0, seed=args.seed,
+        )
+        with open(meeting.whisper_path, encoding="utf-8") as f:
+            whisper = merge_speaker_turns(json.load(f), meeting.truth, args.merge_ratio, args.seed)
+        with open(meeting.audio_path, "rb") as f:
+            wav, _ = decode_stream(f, os.path.basename(meeting.audio_path))
+        engine = build_engine(args.model, os.path.join(work_dir, "cache"))
+        engine.load_matrix(meeting.speakers_root)
+        kiwi_tagger.load()
+
+        def _run(split: bool):
+            latencies, response = [], None
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                response = engine.identify_speaker(
+                    wav, whisper, meeting.speakers_root, threshold=args.threshold, split=split
+                )
+                latencies.append(time.perf_counter() - start)
+            return summarize(latencies, items=len(response["results"]), audio_sec=meeting.duration), response
+
+        report: Dict[str, Any] = {
+            "audio_sec": round(meeting.duration, 2),
+            "segments": len(whisper["segments"]),
+            "truth_sentences": len(meeting.truth),
+            "runs": {},
+        }
+        for split in (False, True):
+            latency, response = _run(split)
+            report["runs"]["split" if split else "sentence"] = {
+                "latency": latency,
+                "results": len(response["results"]),
+                "accuracy": speaker_accuracy(response["results"], meeting.truth),
+                "time_accuracy": time_accuracy(response["results"], meeting.truth),
+                "speaker_change": response.get("speaker_change"),
+            }
+
+        base_p50 = report["runs"]["sentence"]["latency"]["p50_ms"]
+        for name, row in report["runs"].items():
+            change = row["speaker_change"] or {}
+            print(
+                f"{name:>8} | p50={row['latency']['p50_ms']:9.1f}ms ({row['latency']['p50_ms'] / base_p50:5.2f}x) "
+                f"results={row['results']} acc={row['accuracy']} time_acc={row['time_accuracy']} "
+                f"window_ratio={change.get('window_ratio', '-')} split={change.get('sentences_split', '-')}"
+            )
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""메모리 매핑 화자 인덱스 벤치마크: 정확 검색 vs IVF 근사 검색 (recall@k, 지연 시간).
+
+모델 없이 합성 임베딩(화자 중심 + 잡음)으로 100 / 1k / 10k 화자 규모를 측정합니다.
+실행: python -m src.resoursces.test.bench_speaker_index --speakers 100 1000 10000
+"""
+import time
+import argparse
+import tempfile
+import logging
+
+import numpy as np
+
+from src.v1 import speaker_index
+from src.v1.speaker_index import SpeakerIndex, write_index
+
+# 로거 설정 [[memory:6804125]]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def synth(n_speakers: int, refs_per_speaker: int, n_queries: int, dim: int, noise: float, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_speakers, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    owners = np.repeat(np.arange(n_speakers), refs_per_speaker)
+    refs = centers[owners] + noise * rng.standard_normal((len(owners), dim)).astype(np.float32)
+    refs /= np.linalg.norm(refs, axis=1, keepdims=True)
+    truth = rng.integers(0, n_speakers, size=n_queries)
+    queries = centers[truth] + noise * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    return refs, owners, queries
+
+
+def run(n_speakers: int, args) -> None:
+    refs, owners, queries = synth(n_speakers, args.refs, args.queries, args.dim, args.noise, args.seed)
+    speakers = [f"spk{i:05d}" for i in range(n_speakers)]
+    paths = [f"/synthetic/{speakers[o]}/{i}.wav" for i, o in enumerate(owners)]
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.time()
+        write_index(tmp, speakers, refs, owners, paths, digest="bench", dtype=args.dtype)
+        build_sec = time.time() - start
+        index = SpeakerIndex.open(tmp)
+
+        start = time.time()
+        exact_scores, exact_top = index.search(queries, k=args.k, mode="exact")
+        exact_ms = (time.time() - start) * 1000 / len(queries)
+
+        line = (
+            f"speakers={n_speakers:>6} refs={len(refs):>6} build={build_sec:.2f}s "
+            f"exact={exact_ms:.3f}ms/q"
+        )
+        if index.has_ivf:
+            for nprobe in args.nprobe:
+                start = time.time()
+                _, ivf_top = index.search(queries, k=args.k, mode="ivf", nprobe=nprobe)
+                ivf_ms = (time.time() - start) * 1000 / len(queries)
+                recall = np.mean([
+                    len(set(a) & set(b)) / args.k for a, b in zip(exact_top.tolist(), ivf_top.tolist())
+                ])
+                top1 = np.mean(exact_top[:, 0] == ivf_top[:, 0])
+                line += f" | ivf(nprobe={nprobe})={ivf_ms:.3f}ms/q recall@{args.k}={recall:.3f} top1={top1:.3f}"
+        else:
+            line += f" | ivf: not built (< {speaker_index.IVF_MIN_REFS} refs)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--speakers", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--refs", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.04)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--ivf-min-refs", type=int, default=speaker_index.IVF_MIN_REFS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    speaker_index.IVF_MIN_REFS = args.ivf_min_refs
+
+    for n in args.speakers:
+        run(n, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""서버 시작 벤치마크: 새 프로세스마다 import 시간, /ready 까지의 시간, 첫 성공 /v1/recognize 까지의 시간을 측정합니다.
+
+- 매 반복은 새 파이썬 프로세스에서 src.api 를 import 하고 FastAPI 앱(lifespan 포함)을 시작합니다.
+- STARTUP_BACKGROUND=true(백그라운드 병렬 로드 + /ready 게이트)와 false(모든 구성 요소 로드 후 요청 수신)를 비교합니다.
+- 모든 시점은 프로세스 시작 기준(초)이며, 구성 요소별(engine, scheduler, warmup, enrollment, kiwi) 소요 시간도 함께 기록합니다.
+- --model stub 은 결정적 스텁 임베딩 모델을 사용하므로 engine 단계는 측정되지 않습니다 (--model real 은 ERes2Net 로드 포함).
+실행: python -m src.resoursces.test.bench_startup --model stub --repeats 3
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import logging
+import subprocess
+from typing import Any, Dict, List
+
+import numpy as np
+
+# 로거 설정 [[memory:6804125]]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def child(args) -> None:
+    """측정 대상 프로세스: import → 앱 시작 → 첫 성공 요청 / 준비 완료 시점을 JSON 한 줄로 출력합니다."""
+    from src.v1 import metrics
+
+    import src.api as api
+    imported = time.time() - metrics.PROCESS_STARTED
+    if args.model == "stub":
+        from src.resoursces.test.bench_suite import build_engine
+
+        build_engine("stub", os.path.join(args.work_dir, "cache"))
+    from fastapi.testclient import TestClient
+
+    with open(args.audio, "rb") as f:
+        audio_bytes = f.read()
+    with open(args.whisper, "rb") as f:
+        whisper_bytes = f.read()
+
+    with TestClient(api.app) as client:
+        serving = time.time() - metrics.PROCESS_STARTED
+        # 준비 전에 들어온 요청은 모델 로드가 끝날 때까지 기다렸다가 처리됩니다.
+        resp = client.post(
+            "/v1/recognize",
+            files={
+                "audio": ("meeting.wav", audio_bytes, "audio/wav"),
+                "whisper_json": ("meeting.json", whisper_bytes, "application/json"),
+            },
+            data={"threshold": "0.25"},
+        )
+        first_response = time.time() - metrics.PROCESS_STARTED
+        api.startup_loader.wait(args.timeout)
+        ready = client.get("/ready").json()
+    print(json.dumps({
+        "import_sec": round(imported, 3),
+        "serving_sec": round(serving, 3),
+        "first_response_sec": round(first_response, 3),
+        "first_status": resp.status_code,
+        "time_to_first_success": ready.get("time_to_first_success"),
+        "time_to_ready": ready.get("time_to_ready"),
+        "components": {k: v["seconds"] for k, v in ready["components"].items()},
+    }))
+
+
+def run_child(args, meeting, background: bool) -> Dict[str, Any]:
+    env = dict(os.environ, STARTUP_BACKGROUND=str(background).lower(), EMPLOYEE_DB_PATH=meeting.speakers_root)
+    cmd = [
+        sys.executable, "-m", "src.resoursces.test.bench_startup", "--child", "--model", args.model,
+        "--audio", meeting.audio_path, "--whisper", meeting.whisper_path, "--work-dir", args.work_dir,
+        "--timeout", str(args.timeout),
+    ]
+    out = subprocess.run(cmd, env=env, capture_output=True, text=True, timeout=args.timeout * 2)
+    if out.returncode != 0:
+        raise RuntimeError(f"startup child failed: {out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--child", action="store_true")
+    parser.add_argument("--audio")
+    parser.add_argument("--whisper")
+    parser.add_argument("--work-dir")
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+
+    from src.resoursces.test.synthetic_meeting import generate_meeting
+
+    args.work_dir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        meeting = generate_meeting(os.path.join(args.work_dir, "meeting"), n_speakers=3, n_sentences=10, seed=0)
+        report: Dict[str, Any] = {"model": args.model, "modes": {}}
+        for background in (False, True):
+            runs: List[Dict[str, Any]] = [run_child(args, meeting, background) for _ in range(args.repeats)]
+            row: Dict[str, Any] = {"runs": runs}
+            for key in ("import_sec", "serving_sec", "first_response_sec", "time_to_first_success", "time_to_ready"):
+                values = [r[key] for r in runs if r.get(key) is not None]
+                row[key] = round(float(np.median(values)), 3) if values else None
+            name = "background" if background else "blocking"
+            report["modes"][name] = row
+            print(
+                f"{name:>10} | import={row['import_sec']}s serving={row['serving_sec']}s "
+                f"first_success={row['time_to_first_success']}s ready={row['time_to_ready']}s"
+            )
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+    finally:
+        shutil.rmtree(args.work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
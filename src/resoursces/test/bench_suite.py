@@ -0,0 +1,283 @@
+"""재현 가능한 성능 벤치마크 모음: 합성 회의로 전체 /v1/recognize 흐름과 단계별 지연 시간을 측정합니다.
+
+- 합성 회의(N 명, M 문장), Whisper JSON, 직원 DB 구조의 기준 음성을 임시 디렉토리에 생성합니다 (synthetic_meeting).
+- 단계: decode(업로드 디코딩), enrollment(기준 임베딩 cold/warm), refine(refine_whisper_json),
+  embedding(세그먼트 임베딩), scoring(코사인 점수), recognize(FastAPI 앱 경유 전체 요청).
+- --model stub 은 결정적 스텁 임베딩 모델로 네트워크/모델 파일 없이 CPU 에서 실행되고, --model real 은 ERes2Net 을 사용합니다.
+- 결과는 지연 시간 백분위수(p50/p90/p99)와 처리량을 담은 JSON 으로 저장하며, --compare 로 이전 커밋 결과와 비교합니다.
+실행: python -m src.resoursces.test.bench_suite --model stub --speakers 5 --sentences 200 --out bench.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import logging
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import torch
+
+from src.v1 import main as engine_main
+from src.v1.audio import decode_stream
+from src.v1.batching import chunk_sample_range
+from src.v1.scoring import score_segments
+from src.v1.segment_cache import SegmentCache
+from src.v1.utils.json_paser import refine_whisper_json
+from src.v1.utils.kr_tag import kiwi_tagger
+from src.resoursces.test.synthetic_meeting import StubEmbeddingModel, generate_meeting, speaker_accuracy
+
+# 로거 설정 [[memory:6804125]]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+
+def summarize(latencies: List[float], items: Optional[float] = None, audio_sec: Optional[float] = None) -> Dict[str, Any]:
+    """지연 시간(초) 목록의 백분위수(ms)와 처리량."""
+    arr = np.asarray(latencies, dtype=np.float64)
+    out: Dict[str, Any] = {
+        "runs": len(arr),
+        "mean_ms": round(float(arr.mean()) * 1000, 3),
+        "p50_ms": round(float(np.percentile(arr, 50)) * 1000, 3),
+        "p90_ms": round(float(np.percentile(arr, 90)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(arr, 99)) * 1000, 3),
+        "min_ms": round(float(arr.min()) * 1000, 3),
+    }
+    p50 = float(np.percentile(arr, 50))
+    if items is not None and p50 > 0:
+        out["items"] = items
+        out["items_per_sec"] = round(items / p50, 2)
+    if audio_sec is not None and p50 > 0:
+        # 실시간 대비 처리 속도 (녹음 길이 / 처리 시간)
+        out["realtime_factor"] = round(audio_sec / p50, 2)
+    return out
+
+
+def timed(fn: Callable[[], Any], repeats: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def build_engine(model: str, cache_dir: str):
+    """벤치마크용 엔진. 기준 임베딩 캐시는 임시 디렉토리를 사용하고, 세그먼트 캐시는 끕니다 (매 반복이 cold 경로)."""
+    engine_main.ENROLL_CACHE_DIR = cache_dir
+    if model == "stub":
+        engine = engine_main.SpeakerEngine("stub", embedding_model=StubEmbeddingModel())
+    else:
+        engine = engine_main.SpeakerEngine(engine_main.MODEL_PATH)
+    engine.segment_cache = SegmentCache(model_id=engine.model_id, max_items=0)
+    # get_engine() 이 이 엔진을 반환하도록 싱글톤을 교체합니다 (FastAPI 앱 경유 요청에서 사용).
+    engine_main.engine = engine
+    return engine
+
+
+def run_stages(args, meeting, engine):
+    with open(meeting.whisper_path, encoding="utf-8") as f:
+        whisper = json.load(f)
+    stages: Dict[str, Any] = {}
+
+    def _decode():
+        with open(meeting.audio_path, "rb") as f:
+            return decode_stream(f, os.path.basename(meeting.audio_path))
+
+    stages["decode"] = summarize(timed(_decode, args.repeats), audio_sec=meeting.duration)
+    wav, _ = _decode()
+
+    # 기준 임베딩: 매번 새 캐시 위치에서 전체 계산(cold), 이후 변경 없는 갱신(warm)
+    n_refs = sum(len(files) for _, _, files in os.walk(meeting.speakers_root))
+    cold = []
+    for r in range(args.repeats):
+        engine._stores.clear()
+        engine_main.ENROLL_CACHE_DIR = os.path.join(args.cache_dir, f"cold{r}")
+        start = time.perf_counter()
+        engine.get_enrollment_store(meeting.speakers_root, force_refresh=True)
+        cold.append(time.perf_counter() - start)
+    stages["enrollment_cold"] = summarize(cold, items=n_refs)
+    stages["enrollment_warm"] = summarize(
+        timed(lambda: engine.get_enrollment_store(meeting.speakers_root, force_refresh=True), args.repeats), items=n_refs
+    )
+    matrix = engine.load_matrix(meeting.speakers_root)
+
+    kiwi_tagger.load()
+    chunks = refine_whisper_json(whisper)
+    stages["refine"] = summarize(timed(lambda: refine_whisper_json(whisper), args.repeats), items=len(whisper["segments"]))
+
+    embed_chunks = [c for c in chunks if c.get("speaker") != "very_short"]
+    stages["embedding"] = summarize(
+        timed(lambda: engine.extract_chunk_embeddings(wav, embed_chunks), args.repeats),
+        items=len(embed_chunks), audio_sec=meeting.duration,
+    )
+    _, seg_embs = engine.extract_chunk_embeddings(wav, embed_chunks)
+    stages["scoring"] = summarize(
+        timed(lambda: score_segments(seg_embs, matrix, args.threshold), args.repeats), items=len(seg_embs)
+    )
+
+    n_samples = wav.size(1)
+    lengths = [(e - s) / 16000 for s, e in (chunk_sample_range(c, n_samples) for c in embed_chunks)]
+    chunk_info = {
+        "refined": len(chunks),
+        "embedded": len(embed_chunks),
+        "mean_sec": round(float(np.mean(lengths)), 3) if lengths else 0.0,
+    }
+    return stages, chunk_info
+
+
+def run_recognize(args, meeting) -> Dict[str, Any]:
+    """FastAPI 앱(lifespan 포함)에 실제 multipart 요청을 보내 전체 /v1/recognize 흐름을 측정합니다."""
+    from fastapi.testclient import TestClient
+    from src.api import app
+
+    os.environ["EMPLOYEE_DB_PATH"] = meeting.speakers_root
+    with open(meeting.audio_path, "rb") as f:
+        audio_bytes = f.read()
+    with open(meeting.whisper_path, "rb") as f:
+        whisper_bytes = f.read()
+
+    out: Dict[str, Any] = {}
+    with TestClient(app) as client:
+        for mode in args.modes:
+            last: Dict[str, Any] = {}
+
+            def _request():
+                resp = client.post(
+                    "/v1/recognize",
+                    files={
+                        "audio": ("meeting.wav", audio_bytes, "audio/wav"),
+                        "whisper_json": ("meeting.json", whisper_bytes, "application/json"),
+                    },
+                    data={"threshold": str(args.threshold), "mode": mode},
+                )
+                resp.raise_for_status()
+                last.update(resp.json())
+
+            latencies = timed(_request, args.repeats)
+            summary = summarize(latencies, items=len(last.get("results", [])), audio_sec=meeting.duration)
+            summary["accuracy"] = speaker_accuracy(last.get("results", []), meeting.truth)
+            out[f"recognize_{mode}"] = summary
+    return out
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """단계별 p50 지연 시간 변화를 출력하고, tolerance 를 넘는 회귀 단계 목록을 반환합니다."""
+    regressions = []
+    print(f"\ncompare with {baseline.get('meta', {}).get('commit')} (p50, tolerance {tolerance:.0%})")
+    for name, stage in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or "p50_ms" not in base:
+            continue
+        change = stage["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<20} {base['p50_ms']:10.2f}ms -> {stage['p50_ms']:10.2f}ms  ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--speakers", type=int, default=5)
+    parser.add_argument("--unknown-speakers", type=int, default=1)
+    parser.add_argument("--sentences", type=int, default=200)
+    parser.add_argument("--min-sec", type=float, default=1.0)
+    parser.add_argument("--max-sec", type=float, default=8.0)
+    parser.add_argument("--refs", type=int, default=2)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--modes", nargs="+", default=["segment", "cluster"])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=0, help="torch 스레드 수 (0 이면 기본값)")
+    parser.add_argument("--skip-recognize", action="store_true", help="FastAPI 앱 경유 전체 요청 측정을 건너뜁니다")
+    parser.add_argument("--keep-data", default="", help="합성 데이터를 이 경로에 남깁니다 (기본: 임시 디렉토리 삭제)")
+    parser.add_argument("--out", default="", help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", default="", help="비교할 이전 결과 JSON")
+    parser.add_argument("--fail-over", type=float, default=0.0, help="p50 회귀가 이 비율을 넘으면 종료 코드 1 (0 이면 비활성)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+    torch.manual_seed(args.seed)
+    data_dir = args.keep_data or tempfile.mkdtemp(prefix="bench_meeting_")
+    args.cache_dir = os.path.join(data_dir, "cache")
+    try:
+        started = time.perf_counter()
+        meeting = generate_meeting(
+            data_dir, args.speakers, args.sentences, args.min_sec, args.max_sec,
+            n_unknown=args.unknown_speakers, refs_per_speaker=args.refs, seed=args.seed,
+        )
+        generate_sec = time.perf_counter() - started
+        engine = build_engine(args.model, args.cache_dir)
+        stages, chunk_info = run_stages(args, meeting, engine)
+        if not args.skip_recognize:
+            stages.update(run_recognize(args, meeting))
+    finally:
+        if engine_main.scheduler is not None:
+            engine_main.scheduler.stop()
+        if not args.keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    result = {
+        "schema": SCHEMA_VERSION,
+        "meta": {
+            "commit": git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "model": args.model,
+            "device": engine.device,
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "threads": torch.get_num_threads(),
+            "platform": platform.platform(),
+        },
+        "workload": {
+            "speakers": args.speakers,
+            "unknown_speakers": args.unknown_speakers,
+            "sentences": args.sentences,
+            "audio_sec": round(meeting.duration, 2),
+            "min_sec": args.min_sec,
+            "max_sec": args.max_sec,
+            "refs_per_speaker": args.refs,
+            "repeats": args.repeats,
+            "seed": args.seed,
+            "generate_sec": round(generate_sec, 3),
+            "chunks": chunk_info,
+        },
+        "stages": stages,
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.fail_over or 0.1)
+        if args.fail_over > 0 and regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""VAD 비교 벤치마크: 무음이 섞인 문장 경계에서 off / trim / mask 모드의 임베딩 길이, 지연 시간, 점수 분포를 비교합니다.
+
+합성 회의의 Whisper 문장 경계를 앞뒤 무음 쪽으로 넓혀(--pad-sec) 실제 STT 결과처럼 무음이 포함되게 만든 뒤,
+같은 엔진(기본: 결정적 스텁 모델)으로 모드마다 identify_speaker 를 실행합니다.
+- embedded_seconds: 실제로 임베딩한 fbank 프레임 길이 합계 (debug counts 의 embedded_frames)
+- 점수 분포: 등록 화자 문장(target)과 미등록 화자 문장(nontarget)의 최고 점수 백분위수, unknown 비율, 화자 정확도
+실행: python -m src.resoursces.test.bench_vad --speakers 5 --sentences 200 --pad-sec 0.6
+"""
+import os
+import json
+import copy
+import time
+import shutil
+import argparse
+import tempfile
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.v1.audio import decode_stream
+from src.v1.utils.kr_tag import kiwi_tagger
+from src.v1.vad import VAD_MODES, vad_config
+from src.resoursces.test.bench_suite import build_engine, summarize
+from src.resoursces.test.synthetic_meeting import generate_meeting, speaker_accuracy
+
+# 로거 설정 [[memory:6804125]]
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def pad_boundaries(whisper: Dict[str, Any], pad_sec: float, duration: float) -> Dict[str, Any]:
+    """문장 경계를 앞뒤로 pad_sec 만큼 넓힙니다 (이웃 문장과 겹치지 않도록 간격의 절반까지만)."""
+    out = copy.deepcopy(whisper)
+    segments = out["segments"]
+    for i, seg in enumerate(segments):
+        prev_end = segments[i - 1]["end"] if i > 0 else 0.0
+        next_start = segments[i + 1]["start"] if i + 1 < len(segments) else duration
+        start = max(seg["start"] - pad_sec, (prev_end + seg["start"]) / 2 if i > 0 else 0.0)
+        end = min(seg["end"] + pad_sec, (seg["end"] + next_start) / 2)
+        seg["start"], seg["end"] = round(start, 3), round(end, 3)
+        if seg.get("words"):
+            seg["words"][0]["start"] = seg["start"]
+            seg["words"][-1]["end"] = seg["end"]
+    out["chunks"] = [{"timestamp": [s["start"], s["end"]], "text": s["text"]} for s in segments]
+    return out
+
+
+def score_distribution(results: List[Dict[str, Any]], truth: List[Dict[str, Any]]) -> Dict[str, Any]:
+    starts = np.array([x["start"] for x in truth])
+    ends = np.array([x["end"] for x in truth])
+    target, nontarget = [], []
+    for res in results:
+        if res.get("speaker") in ("very_short", "no_speech"):
+            continue
+        overlap = np.minimum(ends, res["end"]) - np.maximum(starts, res["start"])
+        j = int(np.argmax(overlap))
+        (nontarget if truth[j]["speaker"] == "unknown" else target).append(res["score"])
+
+    def _pct(values: List[float]) -> Dict[str, Any]:
+        if not values:
+            return {"n": 0}
+        arr = np.asarray(values)
+        p10, p50, p90 = np.percentile(arr, [10, 50, 90])
+        return {"n": len(arr), "mean": round(float(arr.mean()), 4), "p10": round(float(p10), 4),
+                "p50": round(float(p50), 4), "p90": round(float(p90), 4)}
+
+    return {"target": _pct(target), "nontarget": _pct(nontarget)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--speakers", type=int, default=5)
+    parser.add_argument("--sentences", type=int, default=200)
+    parser.add_argument("--max-gap", type=float, default=2.0)
+    parser.add_argument("--pad-sec", type=float, default=0.6)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_vad_")
+    try:
+        meeting = generate_meeting(
+            os.path.join(work_dir, "meeting"), n_speakers=args.speakers, n_sentences=args.sentences,
+            max_gap=args.max_gap, seed=args.seed,
+        )
+        with open(meeting.whisper_path, encoding="utf-8") as f:
+            whisper = pad_boundaries(json.load(f), args.pad_sec, meeting.duration)
+        engine = build_engine(args.model, os.path.join(work_dir, "cache"))
+        with open(meeting.audio_path, "rb") as f:
+            wav, _ = decode_stream(f, os.path.basename(meeting.audio_path))
+        engine.load_matrix(meeting.speakers_root)
+        kiwi_tagger.load()
+
+        report: Dict[str, Any] = {"audio_sec": round(meeting.duration, 2), "pad_sec": args.pad_sec, "modes": {}}
+        for mode in VAD_MODES:
+            cfg = vad_config(mode)
+
+            def _run():
+                return engine.identify_speaker(
+                    wav, whisper, meeting.speakers_root, threshold=args.threshold, debug=True, vad=cfg
+                )
+
+            latencies = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                response = _run()
+                latencies.append(time.perf_counter() - start)
+            results = response["results"]
+            counts = response["debug"]["counts"]
+            scored = [r for r in results if r["speaker"] not in ("very_short", "no_speech")]
+            report["modes"][mode] = {
+                "latency": summarize(latencies, items=len(results), audio_sec=meeting.duration),
+                "embedded_seconds": round(counts.get("embedded_frames", 0) / 100, 2),
+                "no_speech": sum(r["speaker"] == "no_speech" for r in results),
+                "unknown_rate": round(sum(r["speaker"] == "unknown" for r in scored) / max(1, len(scored)), 4),
+                "accuracy": speaker_accuracy(results, meeting.truth),
+                "scores": score_distribution(results, meeting.truth),
+                "vad": response.get("vad"),
+            }
+
+        base = report["modes"]["off"]["embedded_seconds"] or 1.0
+        for mode, row in report["modes"].items():
+            target = row["scores"]["target"]
+            print(
+                f"{mode:>5} | embedded={row['embedded_seconds']:8.1f}s ({row['embedded_seconds'] / base:6.1%}) "
+                f"p50={row['latency']['p50_ms']:9.1f}ms | no_speech={row['no_speech']:3d} "
+                f"unknown={row['unknown_rate']:.3f} acc={row['accuracy']} target_p50={target.get('p50')}"
+            )
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
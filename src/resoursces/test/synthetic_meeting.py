@@ -0,0 +1,206 @@
+"""벤치마크용 합성 회의 데이터와 결정적 스텁 임베딩 모델.
+
+- 화자마다 기본 주파수(f0)와 배음별 진폭 변조 깊이/속도가 다른 합성 음성을 만듭니다.
+  fbank 는 문장 단위로 평균 정규화되므로, 화자 차이는 멜 대역별 시간 변동(표준편차) 패턴에 담깁니다.
+- 회의 녹음(wav), Whisper 결과 JSON(`chunks` 의 timestamp 형식 + WhisperX `segments`/`words` 형식),
+  화자별 기준 음성 디렉토리(직원 DB 와 같은 구조)와 정답 화자 목록을 함께 생성합니다.
+- StubEmbeddingModel 은 fbank 의 멜 대역별 통계를 고정 난수 행렬로 투영하는 모델로, 모델 파일/네트워크 없이
+  CPU 에서 SpeakerEngine 의 전체 경로(배치/마스킹 포함)를 실행할 수 있게 합니다.
+"""
+import os
+import json
+import wave
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+
+SAMPLE_RATE = 16000
+WORDS = [
+    "오늘", "회의", "에서는", "다음", "분기", "계획", "을", "먼저", "검토", "하고", "일정", "도", "함께",
+    "정리", "해서", "공유", "드리겠", "디자인", "개발", "쪽", "의견", "이", "있으면", "바로", "말씀", "해",
+    "주시면", "반영", "하겠", "고객", "요청", "사항", "은", "지난주", "에", "전달", "받은", "내용", "과", "같",
+]
+ENDINGS = ["습니다.", "어요.", "죠?", "네요."]
+
+
+@dataclass
+class VoiceProfile:
+    f0: float
+    gains: np.ndarray
+    depths: np.ndarray
+    rates: np.ndarray
+
+
+@dataclass
+class SyntheticMeeting:
+    audio_path: str
+    whisper_path: str
+    speakers_root: str
+    duration: float
+    # 문장별 (start, end, speaker); 등록되지 않은 화자는 "unknown"
+    truth: List[Dict[str, Any]] = field(default_factory=list)
+    enrolled: List[str] = field(default_factory=list)
+
+
+def make_voice(rng: np.random.Generator, n_harmonics: int = 40) -> VoiceProfile:
+    return VoiceProfile(
+        f0=float(rng.uniform(90, 260)),
+        gains=rng.uniform(0.2, 1.0, n_harmonics) / np.arange(1, n_harmonics + 1) ** 0.7,
+        depths=rng.uniform(0.0, 0.95, n_harmonics),
+        rates=rng.uniform(2.0, 9.0, n_harmonics),
+    )
+
+
+def synth_voice(voice: VoiceProfile, duration: float, rng: np.random.Generator, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """voice 의 합성 발화 파형 [n] (float32, 최대 진폭 약 0.3)."""
+    n = max(1, int(duration * sr))
+    t = np.arange(n, dtype=np.float64) / sr
+    f0 = voice.f0 * (1 + 0.03 * np.sin(2 * np.pi * rng.uniform(0.3, 1.0) * t + rng.uniform(0, 2 * np.pi)))
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    out = np.zeros(n)
+    for h in range(len(voice.gains)):
+        if (h + 1) * voice.f0 * 1.03 >= sr * 0.45:
+            break
+        env = 1 + voice.depths[h] * np.sin(2 * np.pi * voice.rates[h] * t + rng.uniform(0, 2 * np.pi))
+        out += voice.gains[h] * env * np.sin((h + 1) * phase)
+    out *= 0.3 / max(1e-9, np.abs(out).max())
+    out += 0.003 * rng.standard_normal(n)
+    return out.astype(np.float32)
+
+
+def write_wav(path: str, wav: np.ndarray, sr: int = SAMPLE_RATE) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    pcm = (np.clip(wav, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes(pcm.tobytes())
+
+
+def make_sentence(rng: np.random.Generator, start: float, end: float) -> Dict[str, Any]:
+    """[start, end] 에 단어 타임스탬프를 고르게 배치한 문장 (WhisperX segment 형식)."""
+    n_words = int(rng.integers(3, 10))
+    words = [str(w) for w in rng.choice(WORDS, size=n_words)]
+    words[-1] += str(rng.choice(ENDINGS))
+    step = (end - start) / n_words
+    return {
+        "start": round(start, 3),
+        "end": round(end, 3),
+        "text": " ".join(words),
+        "words": [
+            {"word": w, "start": round(start + i * step, 3), "end": round(start + (i + 0.9) * step, 3)}
+            for i, w in enumerate(words)
+        ],
+    }
+
+
+def generate_meeting(
+    out_dir: str,
+    n_speakers: int = 5,
+    n_sentences: int = 200,
+    min_sec: float = 1.0,
+    max_sec: float = 8.0,
+    max_gap: float = 0.8,
+    n_unknown: int = 1,
+    refs_per_speaker: int = 2,
+    ref_sec: float = 6.0,
+    seed: int = 0,
+) -> SyntheticMeeting:
+    """N 명(+ 미등록 n_unknown 명)의 화자가 번갈아 말하는 M 문장 회의를 out_dir 에 생성합니다."""
+    rng = np.random.default_rng(seed)
+    names = [f"spk{i:02d}" for i in range(n_speakers)]
+    voices = [make_voice(rng) for _ in range(n_speakers + n_unknown)]
+    speakers_root = os.path.join(out_dir, "speakers")
+    for name, voice in zip(names, voices):
+        for r in range(refs_per_speaker):
+            write_wav(os.path.join(speakers_root, name, f"ref{r}.wav"), synth_voice(voice, ref_sec, rng))
+
+    parts: List[np.ndarray] = []
+    segments: List[Dict[str, Any]] = []
+    truth: List[Dict[str, Any]] = []
+    t, current = 0.0, -1
+    for _ in range(n_sentences):
+        gap = float(rng.uniform(0.1, max_gap))
+        parts.append(0.003 * rng.standard_normal(int(gap * SAMPLE_RATE)).astype(np.float32))
+        t += gap
+        # 대부분 화자가 바뀌고, 가끔 같은 화자가 이어서 말합니다.
+        if current < 0 or rng.random() < 0.7:
+            current = int(rng.integers(0, len(voices)))
+        dur = float(rng.uniform(min_sec, max_sec))
+        wav = synth_voice(voices[current], dur, rng)
+        parts.append(wav)
+        start, end = t, t + len(wav) / SAMPLE_RATE
+        segments.append(make_sentence(rng, start, end))
+        truth.append({
+            "start": round(start, 3),
+            "end": round(end, 3),
+            "speaker": names[current] if current < n_speakers else "unknown",
+        })
+        t = end
+    audio = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    audio_path = os.path.join(out_dir, "meeting.wav")
+    whisper_path = os.path.join(out_dir, "meeting.json")
+    write_wav(audio_path, audio)
+    whisper = {
+        "text": " ".join(s["text"] for s in segments),
+        "chunks": [{"timestamp": [s["start"], s["end"]], "text": s["text"]} for s in segments],
+        "segments": segments,
+    }
+    with open(whisper_path, "w", encoding="utf-8") as f:
+        json.dump(whisper, f, ensure_ascii=False)
+    return SyntheticMeeting(audio_path, whisper_path, speakers_root, len(audio) / SAMPLE_RATE, truth, names)
+
+
+def speaker_accuracy(results: List[Dict[str, Any]], truth: List[Dict[str, Any]]) -> Optional[float]:
+    """결과 문장마다 시간상 가장 많이 겹치는 정답 문장의 화자와 일치하는 비율 (very_short 제외)."""
+    if not truth:
+        return None
+    starts = np.array([x["start"] for x in truth])
+    ends = np.array([x["end"] for x in truth])
+    hits = total = 0
+    for res in results:
+        if res.get("speaker") == "very_short":
+            continue
+        overlap = np.minimum(ends, res["end"]) - np.maximum(starts, res["start"])
+        j = int(np.argmax(overlap))
+        if overlap[j] <= 0:
+            continue
+        total += 1
+        hits += res.get("speaker") == truth[j]["speaker"]
+    return round(hits / total, 4) if total else None
+
+
+class TSTP(torch.nn.Module):
+    """ERes2Net 과 같은 이름/출력의 시간축 통계 풀링 (mean + std). MaskedStatsPool 로 교체되어 패딩 배치를 지원합니다."""
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        mean = x.mean(dim=-1)
+        std = torch.sqrt(x.var(dim=-1, unbiased=True) + 1e-7)
+        return torch.cat((mean.flatten(start_dim=1), std.flatten(start_dim=1)), dim=1)
+
+
+class StubEmbeddingModel(torch.nn.Module):
+    """결정적 스텁 임베딩 네트워크: fbank [B, T, 80] -> [B, dim].
+
+    평균 통계는 문장 단위 정규화로 0 에 가까우므로, 멜 대역별 변동 패턴(log std)을 표준화해 고정 난수 행렬로 투영합니다.
+    SpeakerEngine(model_path, embedding_model=StubEmbeddingModel()) 로 전달합니다.
+    """
+
+    def __init__(self, dim: int = 192, seed: int = 0):
+        super().__init__()
+        self.pool = TSTP()
+        gen = torch.Generator().manual_seed(seed)
+        self.proj = torch.nn.Linear(80, dim, bias=False)
+        with torch.no_grad():
+            self.proj.weight.copy_(torch.randn(dim, 80, generator=gen) / 80 ** 0.5)
+        self.eval()
+
+    def forward(self, feats: torch.Tensor) -> torch.Tensor:
+        stats = self.pool(feats.transpose(1, 2))
+        log_std = torch.log(stats[:, stats.size(1) // 2:])
+        z = (log_std - log_std.mean(dim=1, keepdim=True)) / (log_std.std(dim=1, keepdim=True) + 1e-6)
+        return self.proj(z)
@@ -0,0 +1,397 @@
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+import torch
+import torchaudio
+
+logger = logging.getLogger(__name__)
+
+TARGET_SR = 16000
+READ_BLOCK = 1 << 20
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which(FFMPEG_BIN) is not None
+
+
+def ffmpeg_decode_cmd(source: str = "pipe:0", target_sr: int = TARGET_SR, output: str = "pipe:1") -> list:
+    """입력을 한 번에 16k mono float32 raw PCM 으로 변환하는 ffmpeg 명령."""
+    return [
+        FFMPEG_BIN, "-hide_banner", "-loglevel", "error",
+        "-i", source,
+        "-vn", "-ac", "1", "-ar", str(target_sr),
+        "-f", "f32le", "-acodec", "pcm_f32le", output, "-y",
+    ]
+
+
+def _run_ffmpeg(cmd: list, stdin_src: Optional[BinaryIO] = None) -> Tuple[bytearray, str]:
+    """ffmpeg 를 실행하고 stdout 의 PCM 을 하나의 버퍼로 읽습니다. stdin_src 가 있으면 스트림으로 공급합니다."""
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if stdin_src is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    def _feed():
+        try:
+            while True:
+                block = stdin_src.read(READ_BLOCK)
+                if not block:
+                    break
+                proc.stdin.write(block)
+        except (BrokenPipeError, ValueError):
+            # ffmpeg 가 입력을 끝까지 읽지 않고 종료한 경우 (오류는 returncode 로 판단)
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except Exception:
+                pass
+
+    feeder = None
+    if stdin_src is not None:
+        feeder = threading.Thread(target=_feed, daemon=True)
+        feeder.start()
+
+    # stderr 파이프가 가득 차서 멈추지 않도록 별도 스레드에서 비웁니다.
+    err_chunks = []
+    err_reader = threading.Thread(target=lambda: err_chunks.append(proc.stderr.read()), daemon=True)
+    err_reader.start()
+
+    pcm = bytearray()
+    while True:
+        block = proc.stdout.read(READ_BLOCK)
+        if not block:
+            break
+        pcm += block
+    proc.wait()
+    if feeder is not None:
+        feeder.join()
+    err_reader.join()
+    err = b"".join(err_chunks).decode("utf-8", errors="replace").strip()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with {proc.returncode}: {err[-500:]}")
+    return pcm, err
+
+
+def _pcm_to_tensor(pcm: bytearray) -> torch.Tensor:
+    n = len(pcm) // 4
+    if n == 0:
+        return torch.zeros((1, 0))
+    # bytearray 를 복사 없이 float32 텐서로 해석합니다.
+    return torch.frombuffer(pcm, dtype=torch.float32, count=n).unsqueeze(0)
+
+
+def _fallback_load(source: Any, target_sr: int) -> torch.Tensor:
+    """ffmpeg 가 없을 때: torchaudio 로 원본 샘플레이트 로드 후 리샘플 (메모리 사용량 큼)."""
+    wav, sr = torchaudio.load(source)
+    if wav.size(0) > 1:
+        wav = wav.mean(dim=0, keepdim=True)
+    if sr != target_sr:
+        wav = torchaudio.functional.resample(wav, sr, target_sr)
+    return wav.float()
+
+
+def _decode_info(wav: torch.Tensor, method: str, started: float, target_sr: int) -> Dict[str, Any]:
+    return {
+        "duration": round(wav.size(1) / target_sr, 3),
+        "sample_rate": target_sr,
+        "method": method,
+        "decode_time": round(time.time() - started, 3),
+        "buffer_mb": round(wav.numel() * 4 / (1 << 20), 2),
+    }
+
+
+def _ffmpeg_from_stream(fileobj: BinaryIO, filename: str, target_sr: int, output: str = "pipe:1") -> Tuple[bytearray, str]:
+    """스트림을 ffmpeg 파이프로 디코딩합니다. 파이프로 읽을 수 없는 포맷이면 임시 파일로 옮겨 재시도합니다.
+
+    Returns:
+        Tuple[bytearray, str]: stdout 으로 받은 PCM (output 이 파일이면 비어 있음) 과 사용한 방식.
+    """
+    try:
+        pcm, _ = _run_ffmpeg(ffmpeg_decode_cmd(target_sr=target_sr, output=output), stdin_src=fileobj)
+        if output != "pipe:1" or len(pcm) > 0:
+            return pcm, "ffmpeg-pipe"
+        raise RuntimeError("ffmpeg produced no audio from pipe input")
+    except Exception as e:
+        if not hasattr(fileobj, "seek"):
+            raise
+        logger.info(f"Pipe decode failed for '{filename}' ({e}), retrying from a spooled file")
+
+    fileobj.seek(0)
+    suffix = os.path.splitext(os.path.basename(filename or ""))[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as spool:
+        shutil.copyfileobj(fileobj, spool, READ_BLOCK)
+        spool.flush()
+        pcm, _ = _run_ffmpeg(ffmpeg_decode_cmd(spool.name, target_sr=target_sr, output=output))
+    return pcm, "ffmpeg-spooled"
+
+
+def decode_stream(fileobj: BinaryIO, filename: str = "", target_sr: int = TARGET_SR) -> Tuple[torch.Tensor, Dict[str, Any]]:
+    """업로드 스트림을 임시 파일 없이 16k mono float32 파형 [1, T] 으로 디코딩합니다.
+
+    ffmpeg 에 파이프로 스트림을 공급하여 디코딩과 리샘플을 한 번에 수행합니다.
+    moov 아톰이 파일 끝에 있는 m4a 처럼 파이프 입력으로 디코딩할 수 없는 경우에만
+    스트림을 임시 파일로 옮겨 다시 시도합니다.
+
+    Returns:
+        Tuple[torch.Tensor, Dict[str, Any]]: 파형과 디코딩 정보 (길이, 소요 시간, 버퍼 크기 등).
+    """
+    started = time.time()
+
+    if not ffmpeg_available():
+        logger.warning("ffmpeg not found, falling back to torchaudio.load + resample")
+        wav = _fallback_load(fileobj, target_sr)
+        return wav, _decode_info(wav, "torchaudio", started, target_sr)
+
+    pcm, method = _ffmpeg_from_stream(fileobj, filename, target_sr)
+    wav = _pcm_to_tensor(pcm)
+    return wav, _decode_info(wav, method, started, target_sr)
+
+
+def stream_sha1(fileobj: BinaryIO) -> str:
+    """업로드 스트림 내용의 SHA1 해시를 계산하고 스트림 위치를 처음으로 되돌립니다."""
+    h = hashlib.sha1()
+    fileobj.seek(0)
+    while True:
+        block = fileobj.read(READ_BLOCK)
+        if not block:
+            break
+        h.update(block)
+    fileobj.seek(0)
+    return h.hexdigest()
+
+
+class PcmFile:
+    """디코딩된 16k mono float32 PCM 을 담은 파일을 메모리 매핑하여 구간 단위로 읽습니다.
+
+    전체 녹음을 메모리에 올리지 않고 필요한 구간만 페이지 캐시에서 읽으므로,
+    여러 시간 길이의 녹음도 세그먼트 크기만큼의 메모리로 처리할 수 있습니다.
+    """
+
+    def __init__(self, path: str, sample_rate: int = TARGET_SR, delete: bool = True):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.delete = delete
+        size = os.path.getsize(path)
+        self.n_samples = size // 4
+        self._mmap = np.memmap(path, dtype=np.float32, mode="r", shape=(self.n_samples,)) if self.n_samples else None
+
+    def read(self, s_idx: int, e_idx: int) -> torch.Tensor:
+        """[s_idx, e_idx) 구간을 [1, n] 텐서로 복사해 반환합니다."""
+        s_idx, e_idx = max(0, s_idx), min(self.n_samples, e_idx)
+        if self._mmap is None or e_idx <= s_idx:
+            return torch.zeros((1, 0))
+        return torch.from_numpy(np.array(self._mmap[s_idx:e_idx])).unsqueeze(0)
+
+    @property
+    def duration(self) -> float:
+        return self.n_samples / self.sample_rate
+
+    def close(self) -> None:
+        self._mmap = None
+        if self.delete and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self) -> "PcmFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TensorAudio:
+    """이미 메모리에 있는 16k mono 파형 [1, T] 을 PcmFile 과 같은 인터페이스로 감쌉니다."""
+
+    def __init__(self, wav: torch.Tensor, sample_rate: int = TARGET_SR):
+        self.wav = wav
+        self.sample_rate = sample_rate
+        self.n_samples = wav.size(1)
+
+    def read(self, s_idx: int, e_idx: int) -> torch.Tensor:
+        return self.wav[:, max(0, s_idx):min(self.n_samples, e_idx)]
+
+    @property
+    def duration(self) -> float:
+        return self.n_samples / self.sample_rate
+
+    def close(self) -> None:
+        pass
+
+
+class RollingAudioBuffer:
+    """실시간으로 수신되는 16k mono PCM 을 누적하는 버퍼 (스트림 시작 기준 절대 샘플 인덱스 사용).
+
+    수신한 프레임을 블록 리스트로 보관하여 append 비용이 버퍼 길이와 무관하며,
+    이미 처리가 끝난 앞부분은 `trim_before` 로 블록 단위로 버려 메모리를 일정하게 유지합니다.
+    """
+
+    SAMPLE_FORMATS = {"s16le": (np.int16, 1 / 32768.0), "f32le": (np.float32, 1.0)}
+
+    def __init__(self, sample_rate: int = TARGET_SR, sample_format: str = "s16le", max_seconds: float = 600.0):
+        if sample_format not in self.SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample_format '{sample_format}', expected one of {list(self.SAMPLE_FORMATS)}")
+        self.sample_rate = sample_rate
+        self.sample_format = sample_format
+        self.max_samples = int(max_seconds * sample_rate)
+        self._blocks: "deque[Tuple[int, np.ndarray]]" = deque()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    @property
+    def n_samples(self) -> int:
+        """지금까지 수신한 전체 샘플 수 (버린 앞부분 포함)."""
+        return self._total
+
+    @property
+    def base(self) -> int:
+        """버퍼에 남아 있는 첫 샘플의 절대 인덱스."""
+        return self._blocks[0][0] if self._blocks else self._total
+
+    @property
+    def duration(self) -> float:
+        return self.n_samples / self.sample_rate
+
+    def append(self, data: bytes) -> None:
+        dtype, scale = self.SAMPLE_FORMATS[self.sample_format]
+        itemsize = np.dtype(dtype).itemsize
+        usable = len(data) - len(data) % itemsize
+        if usable <= 0:
+            return
+        samples = np.frombuffer(data[:usable], dtype=dtype).astype(np.float32) * scale
+        with self._lock:
+            self._blocks.append((self._total, samples))
+            self._total += len(samples)
+            # 최대 보관 길이를 넘으면 가장 오래된 블록부터 버립니다.
+            while self._blocks and self._total - self._blocks[0][0] - len(self._blocks[0][1]) >= self.max_samples:
+                self._blocks.popleft()
+
+    def trim_before(self, sample: int) -> None:
+        """sample 이전에 완전히 끝나는 블록을 버립니다."""
+        with self._lock:
+            while self._blocks and self._blocks[0][0] + len(self._blocks[0][1]) <= sample:
+                self._blocks.popleft()
+
+    def read(self, s_idx: int, e_idx: int) -> torch.Tensor:
+        with self._lock:
+            parts = []
+            for start, block in self._blocks:
+                end = start + len(block)
+                if end <= s_idx:
+                    continue
+                if start >= e_idx:
+                    break
+                parts.append(block[max(0, s_idx - start):min(len(block), e_idx - start)])
+        if not parts:
+            return torch.zeros((1, 0))
+        return torch.from_numpy(np.concatenate(parts)).unsqueeze(0)
+
+    def close(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+
+
+# 구간 단위로 읽을 수 있는 오디오 (SpeakerEngine 입력)
+class LazyAudio:
+    """길이만 알고 있는 오디오. 캐시에 없는 구간을 처음 읽을 때만 loader 로 디코딩합니다.
+
+    loader 가 없으면 read() 는 AudioUnavailable 을 발생시킵니다 (모든 구간이 캐시된 재채점용).
+    """
+
+    def __init__(self, n_samples: int, loader: Optional[Callable[[], torch.Tensor]] = None, sample_rate: int = TARGET_SR):
+        self.n_samples = n_samples
+        self.sample_rate = sample_rate
+        self._loader = loader
+        self._audio: Optional[TensorAudio] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._audio is not None
+
+    def read(self, s_idx: int, e_idx: int) -> torch.Tensor:
+        if self._audio is None:
+            with self._lock:
+                if self._audio is None:
+                    if self._loader is None:
+                        raise AudioUnavailable("Segment is not cached and no audio was provided")
+                    self._audio = TensorAudio(self._loader(), self.sample_rate)
+        return self._audio.read(s_idx, e_idx)
+
+    @property
+    def duration(self) -> float:
+        return self.n_samples / self.sample_rate
+
+    def close(self) -> None:
+        self._audio = None
+
+
+class AudioUnavailable(RuntimeError):
+    """캐시되지 않은 구간을 계산해야 하지만 원본 오디오가 없을 때 발생합니다."""
+
+
+AudioSource = Union[PcmFile, TensorAudio, RollingAudioBuffer, LazyAudio]
+
+
+def decode_to_pcm_file(
+    fileobj: BinaryIO,
+    filename: str = "",
+    target_sr: int = TARGET_SR,
+    cache_dir: Optional[str] = None,
+) -> Tuple[PcmFile, Dict[str, Any]]:
+    """업로드 스트림을 디스크의 raw float32 PCM 캐시 파일로 디코딩하고 메모리 매핑합니다.
+
+    Returns:
+        Tuple[PcmFile, Dict[str, Any]]: 구간 읽기용 PcmFile 과 디코딩 정보.
+            사용이 끝나면 PcmFile.close() 로 캐시 파일을 삭제해야 합니다.
+    """
+    started = time.time()
+    fd, path = tempfile.mkstemp(prefix="pcm_", suffix=".f32", dir=cache_dir)
+    os.close(fd)
+    try:
+        if ffmpeg_available():
+            _, method = _ffmpeg_from_stream(fileobj, filename, target_sr, output=path)
+        else:
+            # ffmpeg 가 없으면 메모리에서 디코딩한 뒤 파일로 내려씁니다.
+            wav = _fallback_load(fileobj, target_sr)
+            wav.numpy().astype(np.float32).tofile(path)
+            del wav
+            method = "torchaudio"
+        pcm = PcmFile(path, target_sr)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    info = {
+        "duration": round(pcm.duration, 3),
+        "sample_rate": target_sr,
+        "method": f"{method}-mmap",
+        "decode_time": round(time.time() - started, 3),
+        "buffer_mb": 0.0,
+    }
+    return pcm, info
+
+
+def load_audio(path: str, target_sr: int = TARGET_SR) -> Tuple[torch.Tensor, Dict[str, Any]]:
+    """파일 경로의 오디오를 16k mono float32 파형 [1, T] 으로 디코딩합니다."""
+    started = time.time()
+    if ffmpeg_available():
+        try:
+            pcm, _ = _run_ffmpeg(ffmpeg_decode_cmd(path, target_sr=target_sr))
+            wav = _pcm_to_tensor(pcm)
+            return wav, _decode_info(wav, "ffmpeg", started, target_sr)
+        except Exception as e:
+            logger.error(f"ffmpeg decode failed for {path}, falling back to torchaudio: {e}")
+    wav = _fallback_load(path, target_sr)
+    return wav, _decode_info(wav, "torchaudio", started, target_sr)
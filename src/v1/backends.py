@@ -0,0 +1,273 @@
+import os
+import time
+import hashlib
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import torch
+
+from .batching import (
+    BatchedEmbedder,
+    EMBED_BATCH_SIZE,
+    EMBED_BUCKET_RATIO,
+    FEATURE_DIM,
+    MaskedStatsPool,
+    install_masked_pool,
+)
+
+logger = logging.getLogger(__name__)
+
+BACKENDS: Tuple[str, ...] = ("modelscope", "torchscript", "onnx")
+QUANTIZATIONS: Tuple[str, ...] = ("none", "int8")
+
+# 임베딩 추론 백엔드 (modelscope: 기존 eager PyTorch, torchscript / onnx: 내보낸 임베딩 네트워크)
+SPEAKER_BACKEND = os.getenv("SPEAKER_BACKEND", "modelscope")
+# 동적 int8 양자화 (onnx 는 Conv/MatMul, torchscript 는 Linear 계층만 양자화됨)
+SPEAKER_QUANTIZE = os.getenv("SPEAKER_QUANTIZE", "none")
+# 0 이면 라이브러리 기본값 사용
+SPEAKER_INTRA_OP_THREADS = int(os.getenv("SPEAKER_INTRA_OP_THREADS", "0"))
+SPEAKER_INTER_OP_THREADS = int(os.getenv("SPEAKER_INTER_OP_THREADS", "0"))
+# 내보낸 모델 저장 위치 (비어 있으면 ENROLL_CACHE_DIR/backends)
+SPEAKER_EXPORT_DIR = os.getenv("SPEAKER_EXPORT_DIR", "")
+# 시작 시 parity 검사에서 허용하는 최소 코사인 유사도 (modelscope 임베딩 대비)
+SPEAKER_PARITY_MIN_COSINE = float(os.getenv("SPEAKER_PARITY_MIN_COSINE", "0.999"))
+SPEAKER_PARITY_MIN_COSINE_INT8 = float(os.getenv("SPEAKER_PARITY_MIN_COSINE_INT8", "0.98"))
+
+ONNX_OPSET = 17
+
+Runner = Callable[[torch.Tensor, torch.Tensor], torch.Tensor]
+
+
+class _LengthsWrapper(torch.nn.Module):
+    """(feats [B, T, 80], lengths [B]) -> 임베딩 [B, D].
+
+    MaskedStatsPool 의 lengths 를 입력 텐서로 받도록 감싸 내보내므로, 내보낸 그래프는 항상
+    패딩 마스킹 경로를 사용합니다 (패딩이 없으면 lengths == T 로 원래 통계 풀링과 같은 값).
+    """
+
+    def __init__(self, embedding_model: torch.nn.Module, pool: MaskedStatsPool):
+        super().__init__()
+        self.embedding_model = embedding_model
+        self.pool = pool
+
+    def forward(self, feats: torch.Tensor, lengths: torch.Tensor) -> torch.Tensor:
+        self.pool.lengths = lengths
+        self.pool.input_frames = feats.shape[1]
+        try:
+            return self.embedding_model(feats)
+        finally:
+            self.pool.lengths = None
+
+
+def configure_threads(intra_op: int = SPEAKER_INTRA_OP_THREADS, inter_op: int = SPEAKER_INTER_OP_THREADS) -> None:
+    """PyTorch intra/inter-op 스레드 수를 설정합니다 (0 이면 기본값 유지)."""
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            # 병렬 작업이 이미 시작된 뒤에는 변경할 수 없습니다.
+            logger.error(f"Failed to set inter-op threads to {inter_op}: {e}")
+    logger.info(f"Torch threads: intra_op={torch.get_num_threads()}, inter_op={torch.get_num_interop_threads()}")
+
+
+def _example_inputs() -> Tuple[torch.Tensor, torch.Tensor]:
+    # 길이가 다른 두 입력으로 추적해야 마스킹 연산이 그래프에 포함됩니다.
+    feats = torch.randn(2, 300, FEATURE_DIM)
+    return feats, torch.tensor([300, 220])
+
+
+def weights_digest(module: torch.nn.Module) -> str:
+    """파라미터/버퍼 이름, 모양, 값으로 만든 짧은 해시. 같은 경로의 체크포인트가 바뀌면 값이 달라집니다."""
+    h = hashlib.sha1()
+    for name, tensor in module.state_dict().items():
+        tensor = tensor.detach().cpu().contiguous()
+        h.update(f"{name}:{tensor.dtype}:{tuple(tensor.shape)}".encode("utf-8"))
+        h.update(tensor.reshape(-1).view(torch.uint8).numpy().tobytes())
+    return h.hexdigest()[:12]
+
+
+def export_path(export_dir: str, model_id: str, backend: str, quantize: str, digest: str = "") -> str:
+    """내보낸 모델 파일 경로. digest(weights_digest) 를 파일 이름에 넣어 가중치가 바뀌면 새로 내보내게 합니다."""
+    suffix = "onnx" if backend == "onnx" else "ts"
+    name = f"{model_id}.{digest}" if digest else model_id
+    return os.path.join(export_dir, f"{name}.{quantize}.{suffix}")
+
+
+def export_torchscript(embedding_model: torch.nn.Module, path: str, quantize: str = "none") -> str:
+    """임베딩 네트워크를 (feats, lengths) 입력의 TorchScript 로 추적하여 저장합니다."""
+    pool = install_masked_pool(embedding_model)
+    if pool is None:
+        raise RuntimeError("Embedding model has no TSTP pooling layer; cannot export with length masking")
+    wrapper = _LengthsWrapper(embedding_model, pool).cpu().eval()
+    if quantize == "int8":
+        wrapper = torch.ao.quantization.quantize_dynamic(wrapper, {torch.nn.Linear}, dtype=torch.qint8)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with torch.no_grad():
+        traced = torch.jit.trace(wrapper, _example_inputs(), check_trace=False)
+    tmp_path = f"{path}.tmp"
+    traced.save(tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def export_onnx(embedding_model: torch.nn.Module, path: str, quantize: str = "none") -> str:
+    """임베딩 네트워크를 배치/프레임 축이 동적인 ONNX 로 내보내고, 필요하면 동적 int8 양자화합니다."""
+    pool = install_masked_pool(embedding_model)
+    if pool is None:
+        raise RuntimeError("Embedding model has no TSTP pooling layer; cannot export with length masking")
+    wrapper = _LengthsWrapper(embedding_model, pool).cpu().eval()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fp32_path = path if quantize == "none" else path.replace(f".{quantize}.onnx", ".none.onnx")
+    if not os.path.exists(fp32_path):
+        tmp_path = f"{fp32_path}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                wrapper,
+                _example_inputs(),
+                tmp_path,
+                input_names=["feats", "lengths"],
+                output_names=["embedding"],
+                dynamic_axes={"feats": {0: "batch", 1: "frames"}, "lengths": {0: "batch"}, "embedding": {0: "batch"}},
+                opset_version=ONNX_OPSET,
+                dynamo=False,
+            )
+        os.replace(tmp_path, fp32_path)
+    if quantize == "int8":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        tmp_path = f"{path}.tmp"
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, path)
+    return path
+
+
+def load_torchscript_runner(path: str) -> Runner:
+    module = torch.jit.load(path, map_location="cpu").eval()
+    try:
+        module = torch.jit.optimize_for_inference(torch.jit.freeze(module))
+    except Exception as e:
+        logger.warning(f"TorchScript freeze/optimize skipped for {path}: {e}")
+
+    def _run(feats: torch.Tensor, lengths: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return module(feats, lengths)
+    return _run
+
+
+def load_onnx_runner(
+    path: str,
+    intra_op: int = SPEAKER_INTRA_OP_THREADS,
+    inter_op: int = SPEAKER_INTER_OP_THREADS,
+) -> Runner:
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if intra_op > 0:
+        options.intra_op_num_threads = intra_op
+    if inter_op > 0:
+        options.inter_op_num_threads = inter_op
+        options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+    session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+    def _run(feats: torch.Tensor, lengths: torch.Tensor) -> torch.Tensor:
+        out = session.run(
+            ["embedding"],
+            {"feats": feats.cpu().float().numpy(), "lengths": lengths.cpu().long().numpy()},
+        )[0]
+        return torch.from_numpy(out)
+    return _run
+
+
+class ExportedEmbedder(BatchedEmbedder):
+    """내보낸 (feats, lengths) 러너를 BatchedEmbedder 와 같은 버킷/패딩 방식으로 호출합니다 (CPU 전용)."""
+
+    def __init__(
+        self,
+        runner: Runner,
+        name: str,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_batch_frames: int = 0,
+        bucket_ratio: float = EMBED_BUCKET_RATIO,
+    ):
+        self.runner = runner
+        self.name = name
+        self._setup(torch.device("cpu"), True, batch_size, max_batch_frames, bucket_ratio)
+
+    def _run(self, batch: torch.Tensor, lengths: torch.Tensor, padded: bool) -> torch.Tensor:
+        return self.runner(batch, lengths)
+
+
+def parity_check(
+    reference: BatchedEmbedder,
+    candidate: BatchedEmbedder,
+    feats: List[torch.Tensor],
+) -> Dict[str, Any]:
+    """같은 특징에 대한 두 백엔드 임베딩의 코사인 유사도와, 세그먼트 간 점수 행렬 오차를 비교합니다."""
+    ref = torch.nn.functional.normalize(reference.embed(feats).float(), dim=1)
+    cand = torch.nn.functional.normalize(candidate.embed(feats).float(), dim=1)
+    cos = (ref * cand).sum(dim=1)
+    # 실제 판정에 쓰이는 점수(세그먼트 간 코사인)가 얼마나 달라지는지
+    score_err = (ref @ ref.t() - cand @ cand.t()).abs()
+    return {
+        "clips": len(feats),
+        "min_cosine": round(float(cos.min()), 6),
+        "mean_cosine": round(float(cos.mean()), 6),
+        "max_score_abs_error": round(float(score_err.max()), 6),
+    }
+
+
+def synthetic_feats(n: int = 4, seed: int = 0) -> List[torch.Tensor]:
+    """시작 시 parity 검사에 사용할 서로 다른 길이의 fbank 형태 입력."""
+    gen = torch.Generator().manual_seed(seed)
+    return [torch.randn(150 + 90 * i, FEATURE_DIM, generator=gen) for i in range(n)]
+
+
+def build_embedder(
+    embedding_model: torch.nn.Module,
+    reference: Optional[BatchedEmbedder],
+    model_id: str,
+    export_dir: str,
+    backend: str = SPEAKER_BACKEND,
+    quantize: str = SPEAKER_QUANTIZE,
+    parity_feats: Optional[List[torch.Tensor]] = None,
+) -> Optional[BatchedEmbedder]:
+    """SPEAKER_BACKEND 에 맞는 임베딩 추출기를 만듭니다.
+
+    modelscope 이면 reference(기존 BatchedEmbedder) 를 그대로 반환합니다. 그 외에는 내보낸 모델이 없으면
+    한 번 내보내 캐시하고, modelscope 임베딩과의 parity 검사를 통과하지 못하면 reference 로 되돌아갑니다.
+    내보낸 파일 이름에 가중치 해시가 들어가므로 같은 model_id 의 체크포인트를 교체하면 다시 내보냅니다.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"SPEAKER_BACKEND must be one of {BACKENDS}")
+    if quantize not in QUANTIZATIONS:
+        raise ValueError(f"SPEAKER_QUANTIZE must be one of {QUANTIZATIONS}")
+    configure_threads()
+    if backend == "modelscope":
+        return reference
+
+    try:
+        start = time.time()
+        path = export_path(export_dir, model_id, backend, quantize, weights_digest(embedding_model))
+        if not os.path.exists(path):
+            logger.info(f"Exporting ERes2Net embedding network to {path} ({backend}, quantize={quantize})")
+            if backend == "onnx":
+                export_onnx(embedding_model, path, quantize)
+            else:
+                export_torchscript(embedding_model, path, quantize)
+        runner = load_onnx_runner(path) if backend == "onnx" else load_torchscript_runner(path)
+        embedder = ExportedEmbedder(runner, f"{backend}-{quantize}")
+        logger.info(f"Loaded {backend} backend from {path} in {time.time() - start:.2f}s")
+    except Exception as e:
+        logger.error(f"Failed to set up {backend} backend, using modelscope: {e}")
+        return reference
+
+    if reference is not None:
+        report = parity_check(reference, embedder, parity_feats or synthetic_feats())
+        min_cos = SPEAKER_PARITY_MIN_COSINE_INT8 if quantize == "int8" else SPEAKER_PARITY_MIN_COSINE
+        if report["min_cosine"] < min_cos:
+            logger.error(f"{backend} backend failed parity check ({report}, required {min_cos}); using modelscope")
+            return reference
+        logger.info(f"{backend} backend parity check passed: {report}")
+    return embedder
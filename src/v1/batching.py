@@ -0,0 +1,306 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+import torch
+import torchaudio.compliance.kaldi as Kaldi
+
+logger = logging.getLogger(__name__)
+
+FEATURE_DIM = 80
+# ERes2Net 의 통계 풀링(TSTP) 과 동일한 수치 안정화 상수
+STATS_EPS = 1e-7
+# GPU 에서 프레임 1개(10ms)당 추정 활성화 메모리 (ERes2Net base, no_grad 기준 보수적 추정치)
+BYTES_PER_FRAME = 256 * 1024
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+# 배치당 최대 프레임 수 (0 이면 디바이스 메모리에 맞춰 자동 결정)
+EMBED_MAX_BATCH_FRAMES = int(os.getenv("EMBED_MAX_BATCH_FRAMES", "0"))
+# 같은 버킷으로 묶을 수 있는 최대 길이 비율 (가장 긴 항목 / 가장 짧은 항목)
+EMBED_BUCKET_RATIO = float(os.getenv("EMBED_BUCKET_RATIO", "1.25"))
+CPU_MAX_BATCH_FRAMES = 6000
+# 녹음 전체 fbank 를 한 번 계산해 세그먼트별로 프레임 구간만 잘라 쓸지 여부
+FBANK_WHOLE_RECORDING = os.getenv("FBANK_WHOLE_RECORDING", "true").lower() in ("1", "true", "yes")
+# 녹음 전체 fbank 를 계산/보관하는 블록 길이(초)와 녹음당 메모리에 유지할 최대 길이(초, 블록 LRU)
+FBANK_BLOCK_SEC = float(os.getenv("FBANK_BLOCK_SEC", "30"))
+FBANK_MAX_CACHED_SEC = float(os.getenv("FBANK_MAX_CACHED_SEC", "1800"))
+# 파일/실시간 소스(PcmFile, RollingAudioBuffer)에서 유지할 최대 블록 수.
+# 청크는 시간 순으로 소비되므로 현재 배치가 걸친 블록만 남기면 메모리가 녹음 길이와 무관하게 유지됩니다.
+FBANK_STREAM_MAX_BLOCKS = int(os.getenv("FBANK_STREAM_MAX_BLOCKS", "3"))
+
+
+def compute_fbank(wav: torch.Tensor, sample_rate: int = 16000) -> torch.Tensor:
+    """modelscope ERes2Net 과 동일한 80차 fbank 특징 [T', 80] (문장 단위 평균 정규화 포함)."""
+    if wav.dim() == 1:
+        wav = wav.unsqueeze(0)
+    feats = Kaldi.fbank(wav, num_mel_bins=FEATURE_DIM, sample_frequency=sample_rate)
+    return feats - feats.mean(dim=0, keepdim=True)
+
+
+def fbank_frame_range(s_idx: int, e_idx: int, total_frames: int, sample_rate: int = 16000) -> Tuple[int, int]:
+    """샘플 구간 [s_idx, e_idx) 에 대응하는 녹음 전체 fbank 의 프레임 구간 [f0, f1).
+
+    녹음 전체 프레임 i 는 샘플 [i * shift, i * shift + length) 를 사용하므로, 구간 시작을 가장 가까운 프레임
+    격자로 맞춥니다 (최대 shift/2 = 5ms 이동). 프레임 수는 구간 단위 계산(snip_edges)과 최대 1 차이납니다.
+    """
+    shift, length = sample_rate // 100, sample_rate * 25 // 1000
+    f0 = min(total_frames, int(round(s_idx / shift)))
+    f1 = min(total_frames, max(f0 + 1, int(round((e_idx - length) / shift)) + 1))
+    return f0, f1
+
+
+class RecordingFeatures:
+    """녹음 하나의 fbank 를 블록 단위로 한 번만 계산해 두고, 세그먼트마다 프레임 구간을 잘라 정규화합니다.
+
+    Kaldi fbank 는 프레임마다 독립적으로 계산되므로, 프레임 격자에 맞춘 블록(앞 블록과 length - shift 샘플 겹침)을
+    이어 붙인 결과는 녹음 전체를 한 번에 계산한 것과 같습니다. 겹치거나 이웃한 문장은 같은 프레임을 재사용하고,
+    세그먼트 파형을 따로 잘라 복사하지 않습니다. 평균 정규화는 기존처럼 세그먼트 단위로 적용합니다.
+
+    수신 중인 오디오(RollingAudioBuffer)처럼 길이가 늘어나면 끝 블록을 다시 계산하고, 이미 버려진 구간처럼
+    블록을 온전히 읽을 수 없으면 slice() 가 None 을 반환하므로 호출자는 구간 단위 계산으로 돌아갑니다.
+
+    오디오 객체는 보관하지 않고 slice() 호출마다 받습니다. 엔진이 오디오 객체를 약한 참조 키로 이 객체를 캐시하므로,
+    여기서 오디오를 참조하면 키가 해제되지 않아 요청이 끝나도 파형과 fbank 블록이 남습니다.
+
+    max_blocks 를 주면 max_cached_sec 대신 유지할 블록 수를 직접 정합니다. 파일/실시간 소스는 메모리 사용이
+    녹음 길이에 비례하지 않아야 하므로 엔진이 FBANK_STREAM_MAX_BLOCKS 로 제한합니다.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        block_sec: float = FBANK_BLOCK_SEC,
+        max_cached_sec: float = FBANK_MAX_CACHED_SEC,
+        max_blocks: Optional[int] = None,
+    ):
+        self.sample_rate = sample_rate
+        self.shift = sample_rate // 100
+        self.length = sample_rate * 25 // 1000
+        self.block_frames = max(1, int(block_sec * 100))
+        if max_blocks is not None:
+            self.max_blocks = max(1, max_blocks)
+        else:
+            self.max_blocks = max(1, int(max_cached_sec / block_sec)) if block_sec > 0 else 1
+        self._blocks: "OrderedDict[int, torch.Tensor]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.frames_computed = 0
+        self.frames_served = 0
+
+    def total_frames(self, n_samples: int) -> int:
+        return 0 if n_samples < self.length else (n_samples - self.length) // self.shift + 1
+
+    def _block(self, audio: Any, b: int, total_frames: int) -> Optional[torch.Tensor]:
+        expected = min(self.block_frames, total_frames - b * self.block_frames)
+        block = self._blocks.get(b)
+        if block is not None and block.size(0) == expected:
+            self._blocks.move_to_end(b)
+            return block
+        s_idx = b * self.block_frames * self.shift
+        e_idx = s_idx + (expected - 1) * self.shift + self.length
+        wav = audio.read(s_idx, e_idx)
+        if wav.size(-1) != e_idx - s_idx:
+            return None
+        if wav.dim() == 1:
+            wav = wav.unsqueeze(0)
+        block = Kaldi.fbank(wav, num_mel_bins=FEATURE_DIM, sample_frequency=self.sample_rate)
+        self.frames_computed += block.size(0)
+        self._blocks[b] = block
+        self._blocks.move_to_end(b)
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def slice(self, audio: Any, s_idx: int, e_idx: int) -> Optional[torch.Tensor]:
+        """audio 의 [s_idx, e_idx) 구간의 평균 정규화된 fbank [T', 80]. 블록을 읽을 수 없으면 None."""
+        with self._lock:
+            total = self.total_frames(audio.n_samples)
+            f0, f1 = fbank_frame_range(s_idx, e_idx, total, self.sample_rate)
+            if f1 <= f0:
+                return None
+            parts = []
+            for b in range(f0 // self.block_frames, (f1 - 1) // self.block_frames + 1):
+                block = self._block(audio, b, total)
+                if block is None:
+                    return None
+                base = b * self.block_frames
+                parts.append(block[max(0, f0 - base):min(block.size(0), f1 - base)])
+            self.frames_served += f1 - f0
+        feats = parts[0] if len(parts) == 1 else torch.cat(parts)
+        return feats - feats.mean(dim=0, keepdim=True)
+
+
+class MaskedStatsPool(torch.nn.Module):
+    """ERes2Net 의 시간축 통계 풀링(mean + std)을 패딩 마스크를 고려하도록 감싼 모듈.
+
+    `lengths` 가 설정되지 않은 경우 원래 풀링 모듈을 그대로 호출하므로 단일 입력 결과는 동일합니다.
+    """
+
+    def __init__(self, pool: torch.nn.Module):
+        super().__init__()
+        self.pool = pool
+        self.lengths: Optional[torch.Tensor] = None
+        self.input_frames: int = 0
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        if self.lengths is None:
+            return self.pool(x)
+        # 입력 프레임 길이 비율로 다운샘플된 시간축의 유효 길이를 계산합니다.
+        # lengths <= input_frames 이므로 valid 는 t_out 을 넘지 않습니다.
+        # (shape 값을 clamp 상한 등 상수로 쓰지 않아 TorchScript/ONNX 추적 시에도 길이가 동적으로 유지됩니다.)
+        t_out = x.shape[-1]
+        valid = torch.ceil(self.lengths.to(x.device, torch.float32) * t_out / self.input_frames).clamp(min=2)
+        mask = (torch.arange(t_out, device=x.device).unsqueeze(0) < valid.unsqueeze(1)).to(x.dtype)
+        n = valid
+        for _ in range(x.dim() - 2):
+            mask = mask.unsqueeze(1)
+            n = n.unsqueeze(1)
+        mean = (x * mask).sum(dim=-1) / n
+        var = (((x - mean.unsqueeze(-1)) * mask) ** 2).sum(dim=-1) / (n - 1)
+        std = torch.sqrt(var + STATS_EPS)
+        return torch.cat((mean.flatten(start_dim=1), std.flatten(start_dim=1)), dim=1)
+
+
+def install_masked_pool(embedding_model: torch.nn.Module) -> Optional[MaskedStatsPool]:
+    """embedding_model 의 시간축 통계 풀링을 MaskedStatsPool 로 교체합니다. 지원하지 않는 구조면 None."""
+    for attr in ("pool", "pooling"):
+        pool = getattr(embedding_model, attr, None)
+        if isinstance(pool, MaskedStatsPool):
+            return pool
+        if pool is not None and type(pool).__name__ == "TSTP":
+            masked = MaskedStatsPool(pool)
+            setattr(embedding_model, attr, masked)
+            return masked
+    logger.warning("Embedding model has no TSTP pooling layer; batching only equal-length segments")
+    return None
+
+
+def auto_max_batch_frames(device: torch.device) -> int:
+    """디바이스 여유 메모리에 맞춘 배치당 최대 프레임 수."""
+    if EMBED_MAX_BATCH_FRAMES > 0:
+        return EMBED_MAX_BATCH_FRAMES
+    if device.type == "cuda":
+        try:
+            free, _ = torch.cuda.mem_get_info(device)
+            return max(CPU_MAX_BATCH_FRAMES, int(free * 0.5 / BYTES_PER_FRAME))
+        except Exception as e:
+            logger.error(f"Failed to query CUDA memory, using CPU batch budget: {e}")
+    return CPU_MAX_BATCH_FRAMES
+
+
+def make_buckets(
+    lengths: List[int],
+    batch_size: int,
+    max_batch_frames: int,
+    bucket_ratio: float,
+) -> List[List[int]]:
+    """길이순으로 정렬한 뒤, 길이 비율/배치 크기/프레임 예산을 넘지 않게 인덱스를 묶습니다."""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets: List[List[int]] = []
+    current: List[int] = []
+    for idx in order:
+        if current:
+            shortest = lengths[current[0]]
+            longest = lengths[idx]
+            if (
+                len(current) >= batch_size
+                or longest > shortest * bucket_ratio
+                or longest * (len(current) + 1) > max_batch_frames
+            ):
+                buckets.append(current)
+                current = []
+        current.append(idx)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+class BatchedEmbedder:
+    """fbank 특징 리스트를 길이 버킷 단위로 패딩/마스킹하여 ERes2Net 에 한 번에 통과시킵니다."""
+
+    def __init__(
+        self,
+        embedding_model: torch.nn.Module,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_batch_frames: int = 0,
+        bucket_ratio: float = EMBED_BUCKET_RATIO,
+    ):
+        self.embedding_model = embedding_model
+        self.masked_pool = install_masked_pool(embedding_model)
+        self._setup(next(embedding_model.parameters()).device, self.masked_pool is not None,
+                    batch_size, max_batch_frames, bucket_ratio)
+
+    def _setup(
+        self,
+        device: torch.device,
+        masked: bool,
+        batch_size: int,
+        max_batch_frames: int,
+        bucket_ratio: float,
+    ) -> None:
+        self.device = device
+        self.batch_size = max(1, batch_size)
+        self.max_batch_frames = max_batch_frames or auto_max_batch_frames(self.device)
+        # 마스킹을 지원하지 않으면 완전히 같은 길이끼리만 묶습니다.
+        self.bucket_ratio = bucket_ratio if masked else 1.0
+        # MaskedStatsPool 의 lengths 상태를 공유하므로 forward 는 한 번에 하나만 실행합니다.
+        self._lock = threading.Lock()
+        logger.info(
+            f"{type(self).__name__} on {self.device}: batch_size={self.batch_size}, "
+            f"max_batch_frames={self.max_batch_frames}, bucket_ratio={self.bucket_ratio}"
+        )
+
+    def _forward(self, feats: List[torch.Tensor]) -> torch.Tensor:
+        lengths = [f.size(0) for f in feats]
+        max_len = max(lengths)
+        batch = feats[0].new_zeros((len(feats), max_len, feats[0].size(1)))
+        for i, f in enumerate(feats):
+            batch[i, : f.size(0)] = f
+        with self._lock:
+            out = self._run(batch, torch.tensor(lengths), any(length != max_len for length in lengths))
+        return out.detach().float().cpu()
+
+    def _run(self, batch: torch.Tensor, lengths: torch.Tensor, padded: bool) -> torch.Tensor:
+        """패딩된 배치 [B, T, 80] 를 임베딩 [B, D] 로 변환합니다 (self._lock 안에서 호출)."""
+        if self.masked_pool is not None and padded:
+            self.masked_pool.lengths = lengths
+            self.masked_pool.input_frames = batch.size(1)
+        try:
+            with torch.no_grad():
+                return self.embedding_model(batch.to(self.device))
+        finally:
+            if self.masked_pool is not None:
+                self.masked_pool.lengths = None
+
+    def _forward_with_retry(self, feats: List[torch.Tensor]) -> torch.Tensor:
+        try:
+            return self._forward(feats)
+        except RuntimeError as e:
+            # GPU 메모리 부족 시 배치를 반으로 나누어 재시도합니다.
+            if "out of memory" not in str(e) or len(feats) == 1:
+                raise
+            torch.cuda.empty_cache()
+            self.max_batch_frames = max(CPU_MAX_BATCH_FRAMES, self.max_batch_frames // 2)
+            logger.warning(f"OOM with batch of {len(feats)}, reducing max_batch_frames to {self.max_batch_frames}")
+            half = len(feats) // 2
+            return torch.cat([self._forward_with_retry(feats[:half]), self._forward_with_retry(feats[half:])])
+
+    def embed(self, feats: List[torch.Tensor]) -> torch.Tensor:
+        """특징 리스트 [T_i, 80] 를 입력 순서대로 임베딩 [N, D] 로 변환합니다."""
+        if not feats:
+            return torch.zeros((0, 0))
+        buckets = make_buckets([f.size(0) for f in feats], self.batch_size, self.max_batch_frames, self.bucket_ratio)
+        out: List[Optional[torch.Tensor]] = [None] * len(feats)
+        for bucket in buckets:
+            embs = self._forward_with_retry([feats[i] for i in bucket])
+            for i, emb in zip(bucket, embs):
+                out[i] = emb
+        return torch.stack(out)
+
+
+def chunk_sample_range(chunk: dict, n_samples: int, sr: int = 16000) -> Tuple[int, int]:
+    """refine_whisper_json 청크의 (시작, 끝) 샘플 인덱스. VAD 로 잘라낸 임베딩 구간(embed_start/embed_end)이 있으면 그 구간."""
+    s_idx = max(0, int(round(chunk.get("embed_start", chunk["start"]) * sr)))
+    e_idx = min(n_samples, int(round(chunk.get("embed_end", chunk["end"]) * sr)))
+    return s_idx, e_idx
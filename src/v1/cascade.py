@@ -0,0 +1,145 @@
+import os
+import logging
+import threading
+import weakref
+from typing import Any, Dict, List, Tuple
+
+import torch
+
+from .batching import chunk_sample_range
+from .scoring import EnrollmentMatrix, aggregate_speaker_scores, cosine_matrix
+
+logger = logging.getLogger(__name__)
+
+# 1단계: 문장 가운데에서 잘라 임베딩할 길이(초). 이보다 짧은 문장은 1단계에서 이미 전체 구간을 임베딩합니다.
+CASCADE_CROP_SEC = float(os.getenv("CASCADE_CROP_SEC", "1.5"))
+# 1단계 후보 선별에 사용할 기준 임베딩 PCA 투영 차원
+CASCADE_PROJ_DIM = int(os.getenv("CASCADE_PROJ_DIM", "32"))
+# 1단계에서 남길 후보 화자 수 (2단계는 이 화자들의 기준 임베딩과만 비교)
+CASCADE_SHORTLIST = int(os.getenv("CASCADE_SHORTLIST", "3"))
+# 1단계 신뢰 여유(1·2위 점수 차, 1위 점수와 threshold 의 차 중 작은 값)가 이보다 작으면 전체 구간으로 다시 채점합니다.
+CASCADE_MARGIN = float(os.getenv("CASCADE_MARGIN", "0.1"))
+# True 이면 비교용으로 전체 구간 세그먼트 단위 채점도 수행해 지연 시간과 일치율을 보고합니다.
+CASCADE_REPORT_BASELINE = os.getenv("CASCADE_REPORT_BASELINE", "false").lower() in ("1", "true", "yes")
+
+
+class ProjectedMatrix:
+    """기준 임베딩을 평균 중심화한 뒤 상위 주성분(PCA)으로 투영한 저차원 행렬 (1단계 후보 선별용).
+
+    D 차원 전체 비교 대신 dim 차원에서 비교하므로 기준 임베딩 비교 비용이 D / dim 배 줄어듭니다.
+    """
+
+    def __init__(self, matrix: EnrollmentMatrix, dim: int = CASCADE_PROJ_DIM):
+        emb = matrix.embeddings.float()
+        self.mean = emb.mean(dim=0, keepdim=True)
+        centered = emb - self.mean
+        # 기준 임베딩 수보다 많은 주성분은 의미가 없습니다 (중심화 후 계수는 최대 R - 1).
+        self.dim = max(1, min(dim, emb.size(1), emb.size(0) - 1))
+        _, _, vh = torch.linalg.svd(centered, full_matrices=False)
+        self.components = vh[: self.dim].t().contiguous()
+        self.refs = torch.nn.functional.normalize(centered @ self.components, dim=1)
+
+    def project(self, seg_embs: torch.Tensor) -> torch.Tensor:
+        seg = torch.nn.functional.normalize(seg_embs.float(), dim=1)
+        return torch.nn.functional.normalize((seg - self.mean) @ self.components, dim=1)
+
+    def scores(self, seg_embs: torch.Tensor) -> torch.Tensor:
+        """세그먼트 [S, D] 와 모든 기준 임베딩의 투영 공간 코사인 유사도 [S, R]."""
+        return self.project(seg_embs) @ self.refs.t()
+
+
+_projections: "weakref.WeakKeyDictionary[EnrollmentMatrix, Dict[int, ProjectedMatrix]]" = weakref.WeakKeyDictionary()
+_projections_lock = threading.Lock()
+
+
+def projected_matrix(matrix: EnrollmentMatrix, dim: int = CASCADE_PROJ_DIM) -> ProjectedMatrix:
+    """기준 임베딩 스냅샷별 투영 행렬 (스냅샷이 바뀌면 새로 계산하고, 이전 것은 스냅샷과 함께 해제)."""
+    with _projections_lock:
+        per_dim = _projections.setdefault(matrix, {})
+        proj = per_dim.get(dim)
+        if proj is None:
+            proj = ProjectedMatrix(matrix, dim)
+            per_dim[dim] = proj
+        return proj
+
+
+def crop_chunk(chunk: Dict[str, Any], crop_sec: float, n_samples: int, sr: int = 16000) -> Tuple[Dict[str, Any], bool]:
+    """1단계용 청크: 임베딩 구간 가운데 crop_sec 만 남긴 사본과, 잘라내지 않았는지(전체 구간인지) 여부."""
+    s_idx, e_idx = chunk_sample_range(chunk, n_samples, sr)
+    crop = int(round(crop_sec * sr))
+    if e_idx - s_idx <= crop:
+        return chunk, True
+    start = (s_idx + e_idx - crop) // 2
+    out = dict(chunk)
+    # mask 모드의 프레임 선택은 전체 임베딩 구간 기준이므로 잘라낸 구간에는 적용하지 않습니다.
+    out.pop("speech_keep", None)
+    out["embed_start"] = start / sr
+    out["embed_end"] = (start + crop) / sr
+    return out, False
+
+
+def shortlist_speakers(
+    seg_embs: torch.Tensor, matrix: EnrollmentMatrix, proj: ProjectedMatrix, aggregate: str, k: int
+) -> torch.Tensor:
+    """투영 공간 점수로 세그먼트별 상위 k 명의 화자 인덱스 [S, k] 를 고릅니다."""
+    spk_scores = aggregate_speaker_scores(proj.scores(seg_embs), matrix, aggregate)
+    _, top_idx = torch.sort(spk_scores, dim=1, descending=True, stable=True)
+    return top_idx[:, :k]
+
+
+def score_shortlist(
+    seg_embs: torch.Tensor, matrix: EnrollmentMatrix, shortlist: torch.Tensor, aggregate: str
+) -> Tuple[torch.Tensor, torch.Tensor, int]:
+    """세그먼트마다 후보 화자의 기준 임베딩과만 전체 차원 코사인 점수를 계산합니다.
+
+    후보 집합이 같은 세그먼트끼리 묶어 한 번에 계산하며(회의에서는 후보 조합이 많지 않음),
+    점수는 score_segments 와 같은 방식으로 반올림/집계됩니다.
+
+    Returns:
+        Tuple[torch.Tensor, torch.Tensor, int]: 후보 화자 점수 [S, k] 와 화자 인덱스 [S, k] (점수 내림차순), 기준 임베딩 비교 횟수.
+    """
+    n_seg, k = shortlist.shape
+    top_scores = torch.full((n_seg, k), -1.0)
+    top_idx = torch.full((n_seg, k), -1, dtype=torch.long)
+    groups: Dict[Tuple[int, ...], List[int]] = {}
+    for i, row in enumerate(shortlist.tolist()):
+        groups.setdefault(tuple(sorted(row)), []).append(i)
+
+    comparisons = 0
+    for speakers, rows in groups.items():
+        spk = torch.tensor(speakers, dtype=torch.long)
+        ref_mask = torch.isin(matrix.ref_speaker, spk)
+        # 후보 화자만 담은 부분 행렬 (화자 인덱스는 후보 순서로 다시 매김)
+        local_owner = torch.searchsorted(spk, matrix.ref_speaker[ref_mask])
+        sub = EnrollmentMatrix([matrix.speakers[i] for i in speakers], matrix.embeddings[ref_mask], local_owner)
+        scores = aggregate_speaker_scores(cosine_matrix(seg_embs[rows], sub), sub, aggregate)
+        comparisons += len(rows) * int(ref_mask.sum())
+        sorted_scores, order = torch.sort(scores, dim=1, descending=True, stable=True)
+        top_scores[rows, : len(speakers)] = sorted_scores
+        top_idx[rows, : len(speakers)] = spk[order]
+    return top_scores, top_idx, comparisons
+
+
+def confidence_margin(top_scores: torch.Tensor, threshold: float) -> torch.Tensor:
+    """1단계 판단의 여유 [S]: 1·2위 점수 차와 1위 점수-threshold 거리 중 작은 값 (작을수록 애매)."""
+    top1 = top_scores[:, 0]
+    boundary = (top1 - threshold).abs()
+    if top_scores.size(1) < 2:
+        return boundary
+    second = top_scores[:, 1]
+    gap = torch.where(second > -1.0, top1 - second, torch.full_like(top1, float("inf")))
+    return torch.minimum(gap, boundary)
+
+
+def cascade_stats(n_refs: int, stage1: Dict[str, Any], stage2: Dict[str, Any]) -> Dict[str, Any]:
+    """단계별 세그먼트/비교 횟수와 전체 모델 단독 경로 대비 절약량."""
+    full_comparisons = stage1["segments"] * n_refs
+    used = stage1["projected_comparisons"] + stage1["shortlist_comparisons"] + stage2["comparisons"]
+    return {
+        "stage1": stage1,
+        "stage2": stage2,
+        "rescored_ratio": round(stage2["segments"] / stage1["segments"], 4) if stage1["segments"] else 0.0,
+        "full_path_comparisons": full_comparisons,
+        "full_dim_comparisons": stage1["shortlist_comparisons"] + stage2["comparisons"],
+        "total_comparisons": used,
+    }
@@ -0,0 +1,143 @@
+import os
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 화자 매칭 방식 (cascade 는 cascade.py 의 2단계 채점)
+MATCH_MODES: Tuple[str, ...] = ("segment", "cluster", "cascade")
+# 평균 연결(average linkage) 코사인 유사도가 이 값 이상인 클러스터끼리만 병합합니다.
+CLUSTER_THRESHOLD = float(os.getenv("CLUSTER_THRESHOLD", "0.4"))
+# very_short 청크에 이웃 문장의 화자를 붙일 때 허용하는 최대 시간 간격(초)
+NEIGHBOR_MAX_GAP = float(os.getenv("CLUSTER_NEIGHBOR_MAX_GAP", "2.0"))
+
+
+def agglomerative_cluster(embs: np.ndarray, threshold: float = CLUSTER_THRESHOLD) -> np.ndarray:
+    """코사인 유사도 기반 평균 연결 병합 군집화.
+
+    행마다 가장 가까운 클러스터(best_sim, best_j)를 유지하고 병합된 행/열만 Lance-Williams 식으로 갱신하므로,
+    병합 한 번의 비용이 O(S) 에 가깝고 전체는 O(S^2) 입니다 (S: 세그먼트 수, 메모리도 S x S).
+
+    Args:
+        embs: 세그먼트 임베딩 [S, D] (정규화 여부 무관).
+        threshold: 병합을 멈출 평균 코사인 유사도.
+
+    Returns:
+        np.ndarray: 세그먼트별 클러스터 번호 [S] (0..C-1, 첫 등장 순서).
+    """
+    n = len(embs)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    x = np.asarray(embs, dtype=np.float32)
+    x = x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+    sim = x @ x.T
+    np.fill_diagonal(sim, -np.inf)
+    sizes = np.ones(n, dtype=np.float32)
+    active = np.ones(n, dtype=bool)
+    parent = np.arange(n)
+    best_j = np.argmax(sim, axis=1)
+    best_sim = sim[np.arange(n), best_j]
+
+    for _ in range(n - 1):
+        i = int(np.argmax(best_sim))
+        if best_sim[i] < threshold:
+            break
+        j = int(best_j[i])
+        # j 를 i 로 병합: sim(i∪j, k) = (n_i sim(i,k) + n_j sim(j,k)) / (n_i + n_j)
+        merged = (sizes[i] * sim[i] + sizes[j] * sim[j]) / (sizes[i] + sizes[j])
+        merged[~active] = -np.inf
+        merged[i] = merged[j] = -np.inf
+        sim[i, :] = merged
+        sim[:, i] = merged
+        sim[j, :] = -np.inf
+        sim[:, j] = -np.inf
+        sizes[i] += sizes[j]
+        active[j] = False
+        parent[parent == j] = i
+        best_sim[j] = -np.inf
+
+        best_j[i] = int(np.argmax(sim[i]))
+        best_sim[i] = sim[i, best_j[i]]
+        # 가장 가까운 상대가 i 또는 j 였던 행은 다시 계산하고, 나머지는 새 i 와만 비교합니다.
+        stale = np.nonzero(active & ((best_j == i) | (best_j == j)))[0]
+        stale = stale[stale != i]
+        for k in stale:
+            best_j[k] = int(np.argmax(sim[k]))
+            best_sim[k] = sim[k, best_j[k]]
+        closer = active & (merged > best_sim)
+        closer[i] = False
+        best_j[closer] = i
+        best_sim[closer] = merged[closer]
+
+    _, labels = np.unique(parent, return_inverse=True)
+    # 첫 등장 순서로 번호를 다시 매깁니다.
+    order = {}
+    return np.array([order.setdefault(label, len(order)) for label in labels.tolist()], dtype=np.int64)
+
+
+def cluster_centroids(embs: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """클러스터별 정규화된 평균 임베딩 [C, D]."""
+    x = np.asarray(embs, dtype=np.float32)
+    x = x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+    n_clusters = int(labels.max()) + 1 if len(labels) else 0
+    sums = np.zeros((n_clusters, x.shape[1]), dtype=np.float32)
+    np.add.at(sums, labels, x)
+    return sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+
+def neighbor_labels(
+    times: List[Tuple[float, float]],
+    labeled: List[Optional[int]],
+    max_gap: float = NEIGHBOR_MAX_GAP,
+) -> List[Optional[int]]:
+    """라벨이 없는 구간에 시간상 가장 가까운 (max_gap 이내) 이웃 구간의 라벨을 붙입니다.
+
+    Args:
+        times: 시간순으로 정렬된 (start, end) 목록.
+        labeled: 구간별 라벨 (없으면 None).
+    """
+    n = len(times)
+    prev_idx: List[Optional[int]] = [None] * n
+    next_idx: List[Optional[int]] = [None] * n
+    last = None
+    for i in range(n):
+        prev_idx[i] = last
+        if labeled[i] is not None:
+            last = i
+    last = None
+    for i in range(n - 1, -1, -1):
+        next_idx[i] = last
+        if labeled[i] is not None:
+            last = i
+
+    out = list(labeled)
+    for i in range(n):
+        if labeled[i] is not None:
+            continue
+        start, end = times[i]
+        candidates = []
+        if prev_idx[i] is not None:
+            candidates.append((max(0.0, start - times[prev_idx[i]][1]), prev_idx[i]))
+        if next_idx[i] is not None:
+            candidates.append((max(0.0, times[next_idx[i]][0] - end), next_idx[i]))
+        if candidates:
+            gap, j = min(candidates)
+            if gap <= max_gap:
+                out[i] = labeled[j]
+    return out
+
+
+def comparison_stats(n_segments: int, n_clusters: int, n_refs: int) -> Dict[str, Any]:
+    """세그먼트 단위 대비 기준 임베딩 비교 횟수."""
+    per_segment = n_segments * n_refs
+    clustered = n_clusters * n_refs
+    return {
+        "segments": n_segments,
+        "clusters": n_clusters,
+        "enrollment_comparisons": clustered,
+        "per_segment_comparisons": per_segment,
+        "saved_comparisons": per_segment - clustered,
+        "saved_ratio": round(1 - clustered / per_segment, 4) if per_segment else 0.0,
+    }
@@ -0,0 +1,414 @@
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import torch
+
+from .scoring import EnrollmentMatrix
+from .speaker_index import SpeakerIndex, entries_digest, write_index
+
+logger = logging.getLogger(__name__)
+
+# 기존 identify_speaker 와 동일한 확장자 규칙 (대소문자 두 가지만 허용)
+ENROLL_EXTENSIONS: Tuple[str, ...] = (".wav", ".flac", ".m4a", ".mp3", ".WAV", ".FLAC", ".M4A", ".MP3")
+CACHE_VERSION = 1
+# 메모리 매핑 인덱스 저장 dtype (float16 이면 디스크/페이지 캐시 사용량이 절반)
+SPEAKER_INDEX_DTYPE = os.getenv("SPEAKER_INDEX_DTYPE", "float32")
+
+
+def file_sha1(path: str, block_size: int = 1 << 20) -> str:
+    """파일 내용의 SHA1 해시를 블록 단위로 계산합니다."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+def discover_enrollment_files(speakers_root: str) -> Dict[str, List[Path]]:
+    """speakers_root 아래의 화자별 기준 음성 파일 목록을 찾습니다.
+
+    - 하위 디렉토리는 화자로 간주하며 디렉토리명이 화자 이름입니다.
+    - speakers_root 자체에 있는 오디오 파일은 파일명(stem)을 화자 이름으로 사용합니다.
+    """
+    speakers_path = Path(speakers_root)
+    found: Dict[str, List[Path]] = {}
+    if not speakers_path.exists():
+        return found
+
+    for spk_dir in sorted([p for p in speakers_path.iterdir() if p.is_dir() and not p.name.startswith(".")]):
+        refs: List[Path] = []
+        for ext in ENROLL_EXTENSIONS:
+            refs.extend(sorted(spk_dir.glob(f"*{ext}")))
+        if refs:
+            found[spk_dir.name] = refs
+
+    for ext in ENROLL_EXTENSIONS:
+        for f in sorted(speakers_path.glob(f"*{ext}")):
+            if f.stem not in found:
+                found[f.stem] = [f]
+    return found
+
+
+class EnrollmentStore:
+    """기준 화자 음성의 ERes2Net 임베딩을 디스크에 보관하고 변경분만 갱신하는 저장소.
+
+    각 항목은 파일 경로 + mtime/size + 내용 해시(SHA1)로 식별되며,
+    mtime/size 가 바뀐 경우에만 해시를 다시 계산하고, 해시까지 바뀐 파일만 임베딩을 재계산합니다.
+    """
+
+    def __init__(
+        self,
+        speakers_root: str,
+        cache_path: str,
+        embed_fn: Callable[[str], Tuple[torch.Tensor, float]],
+        model_id: str = "",
+        refresh_interval: float = 30.0,
+    ):
+        self.speakers_root = os.path.abspath(speakers_root)
+        self.cache_path = cache_path
+        self.embed_fn = embed_fn
+        self.model_id = model_id
+        self.refresh_interval = refresh_interval
+
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.last_refresh: float = 0.0
+        self.last_stats: Dict[str, Any] = {}
+        self.version: int = 0
+        self._matrix: Optional[EnrollmentMatrix] = None
+        self._matrix_version: int = -1
+        self._lock = threading.Lock()
+        # 여러 워커 프로세스가 공유하는 메모리 매핑 인덱스 (<cache_path>.index/)
+        self.index_dir = f"{os.path.splitext(cache_path)[0]}.index"
+        self._index: Optional[SpeakerIndex] = None
+        self._index_lock = threading.Lock()
+
+    def load(self) -> int:
+        """디스크 캐시를 읽어옵니다. 모델이 다르거나 포맷이 맞지 않으면 무시합니다."""
+        if not os.path.exists(self.cache_path):
+            return 0
+        start = time.time()
+        try:
+            data = torch.load(self.cache_path, map_location="cpu")
+            if data.get("version") != CACHE_VERSION or data.get("model_id") != self.model_id:
+                logger.info(f"Enrollment cache {self.cache_path} is stale (model/version changed), rebuilding")
+                return 0
+            self.entries = data.get("entries", {})
+            self.version += 1
+        except Exception as e:
+            logger.error(f"Failed to load enrollment cache {self.cache_path}: {e}")
+            self.entries = {}
+            return 0
+        logger.info(f"Loaded {len(self.entries)} cached enrollment embeddings in {time.time() - start:.3f}s")
+        return len(self.entries)
+
+    def save(self) -> None:
+        """캐시 파일을 원자적으로 기록합니다 (임시 파일 작성 후 교체)."""
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            torch.save({
+                "version": CACHE_VERSION,
+                "model_id": self.model_id,
+                "speakers_root": self.speakers_root,
+                "entries": self.entries,
+            }, tmp_path)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.error(f"Failed to save enrollment cache {self.cache_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def refresh(self, force: bool = False) -> Dict[str, Any]:
+        """speakers_root 를 다시 스캔하여 변경된 항목만 재계산합니다.
+
+        Args:
+            force: True 이면 refresh_interval 과 상관없이 즉시 스캔합니다.
+
+        Returns:
+            Dict[str, Any]: added/updated/removed/reused 개수와 소요 시간.
+        """
+        # 주기 내 재호출은 잠금 없이 바로 반환하여 화자 등록 작업 중에도 인식 요청이 기다리지 않게 합니다.
+        if not force and self.entries and time.time() - self.last_refresh < self.refresh_interval:
+            return self.last_stats
+        with self._lock:
+            if not force and self.entries and time.time() - self.last_refresh < self.refresh_interval:
+                return self.last_stats
+
+            start = time.time()
+            stats = {"added": 0, "updated": 0, "removed": 0, "reused": 0, "failed": 0}
+            old_entries = self.entries
+            by_hash = {e["sha1"]: e for e in old_entries.values()}
+            new_entries: Dict[str, Dict[str, Any]] = {}
+            dirty = False
+
+            for spk_name, files in discover_enrollment_files(self.speakers_root).items():
+                for f in files:
+                    path = str(f.resolve())
+                    try:
+                        st = f.stat()
+                        old = old_entries.get(path)
+                        if old is not None and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+                            entry = dict(old, speaker=spk_name)
+                            stats["reused"] += 1
+                        else:
+                            dirty = True
+                            sha1 = file_sha1(path)
+                            same = by_hash.get(sha1)
+                            if same is not None:
+                                # 내용이 같으면 (touch, 이름 변경 등) 임베딩 재사용
+                                embedding, duration, computed_at = same["embedding"], same["duration"], same["computed_at"]
+                                stats["reused"] += 1
+                            else:
+                                embedding, duration = self.embed_fn(path)
+                                computed_at = time.time()
+                                stats["updated" if old is not None else "added"] += 1
+                            entry = {
+                                "speaker": spk_name,
+                                "path": path,
+                                "mtime_ns": st.st_mtime_ns,
+                                "size": st.st_size,
+                                "sha1": sha1,
+                                "embedding": embedding,
+                                "duration": duration,
+                                "computed_at": computed_at,
+                            }
+                        new_entries[path] = entry
+                    except Exception as e:
+                        stats["failed"] += 1
+                        logger.error(f"Failed to process enrollment file {f}: {e}")
+
+            stats["removed"] = len(set(old_entries) - set(new_entries))
+            self.entries = new_entries
+            self.last_refresh = time.time()
+            if dirty or stats["removed"]:
+                self.version += 1
+                self.save()
+
+            stats["entries"] = len(new_entries)
+            stats["elapsed"] = round(self.last_refresh - start, 3)
+            self.last_stats = stats
+            logger.info(
+                f"Enrollment refresh ({self.speakers_root}): {stats['entries']} refs, "
+                f"+{stats['added']} ~{stats['updated']} -{stats['removed']} reused={stats['reused']} "
+                f"failed={stats['failed']} in {stats['elapsed']}s"
+            )
+            return stats
+
+    def _make_entry(self, spk_name: str, path: str) -> Dict[str, Any]:
+        st = os.stat(path)
+        embedding, duration = self.embed_fn(path)
+        return {
+            "speaker": spk_name,
+            "path": path,
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "sha1": file_sha1(path),
+            "embedding": embedding,
+            "duration": duration,
+            "computed_at": time.time(),
+        }
+
+    def _commit(self, new_entries: Dict[str, Dict[str, Any]]) -> None:
+        # 새 dict 로 통째로 교체하므로 진행 중인 인식 요청은 이전 스냅샷을 그대로 사용합니다.
+        self.entries = new_entries
+        self.version += 1
+        self.save()
+
+    def speaker_dir(self, speaker: str) -> str:
+        if not speaker or speaker.startswith(".") or os.sep in speaker or "/" in speaker or speaker != speaker.strip():
+            raise ValueError(f"Invalid speaker name: {speaker!r}")
+        return os.path.join(self.speakers_root, speaker)
+
+    def enroll_speaker(
+        self,
+        speaker: str,
+        uploads: List[Tuple[str, BinaryIO]],
+        replace: bool = False,
+    ) -> Dict[str, Any]:
+        """기준 음성 파일들을 화자 디렉토리에 저장하고 임베딩을 한 번 계산해 즉시 반영합니다.
+
+        Args:
+            speaker: 화자 이름 (speakers_root 아래 디렉토리명).
+            uploads: (파일명, 파일 객체) 리스트.
+            replace: True 이면 기존 기준 음성을 모두 지우고 새 파일로 교체합니다.
+
+        Returns:
+            Dict[str, Any]: 갱신된 화자 통계.
+        """
+        spk_dir = self.speaker_dir(speaker)
+        if not uploads:
+            raise ValueError("At least one reference clip is required")
+        for filename, _ in uploads:
+            if os.path.splitext(filename or "")[1] not in ENROLL_EXTENSIONS:
+                raise ValueError(f"Unsupported reference file '{filename}', expected one of {ENROLL_EXTENSIONS}")
+
+        os.makedirs(spk_dir, exist_ok=True)
+        written: List[str] = []
+        try:
+            for filename, fileobj in uploads:
+                base = os.path.basename(filename)
+                path = os.path.join(spk_dir, f"{uuid.uuid4().hex[:8]}_{base}")
+                with open(path + ".part", "wb") as out:
+                    shutil.copyfileobj(fileobj, out)
+                os.replace(path + ".part", path)
+                written.append(os.path.realpath(path))
+            # 임베딩 계산은 잠금 밖에서 수행합니다.
+            new_items = {path: self._make_entry(speaker, path) for path in written}
+        except Exception:
+            for path in written:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+
+        with self._lock:
+            entries = dict(self.entries)
+            if replace:
+                for path, entry in list(entries.items()):
+                    if entry["speaker"] == speaker:
+                        del entries[path]
+                        if os.path.exists(path):
+                            os.remove(path)
+            entries.update(new_items)
+            self._commit(entries)
+        logger.info(f"Enrolled {len(new_items)} clip(s) for speaker '{speaker}' (replace={replace})")
+        return self.speaker_stats(speaker)
+
+    def remove_speaker(self, speaker: str) -> int:
+        """화자의 기준 음성 파일과 임베딩을 삭제합니다. 삭제한 파일 수를 반환합니다."""
+        spk_dir = self.speaker_dir(speaker)
+        with self._lock:
+            entries = dict(self.entries)
+            removed = [path for path, entry in entries.items() if entry["speaker"] == speaker]
+            for path in removed:
+                del entries[path]
+                if os.path.exists(path):
+                    os.remove(path)
+            if os.path.isdir(spk_dir) and not os.listdir(spk_dir):
+                os.rmdir(spk_dir)
+            if removed:
+                self._commit(entries)
+        logger.info(f"Removed speaker '{speaker}' ({len(removed)} clip(s))")
+        return len(removed)
+
+    def speaker_stats(self, speaker: Optional[str] = None) -> Any:
+        """화자별 기준 음성 수, 총 길이(초), 마지막 임베딩 계산 시각.
+
+        speaker 를 지정하면 해당 화자의 통계 dict (없으면 None), 아니면 전체 리스트를 반환합니다.
+        """
+        summary: Dict[str, Dict[str, Any]] = {}
+        for entry in self.entries.values():
+            st = summary.setdefault(entry["speaker"], {
+                "speaker": entry["speaker"],
+                "num_refs": 0,
+                "total_seconds": 0.0,
+                "last_computed_at": 0.0,
+                "files": [],
+            })
+            st["num_refs"] += 1
+            st["total_seconds"] += float(entry.get("duration") or 0.0)
+            st["last_computed_at"] = max(st["last_computed_at"], float(entry.get("computed_at") or 0.0))
+            st["files"].append(os.path.basename(entry["path"]))
+        for st in summary.values():
+            st["total_seconds"] = round(st["total_seconds"], 2)
+            st["files"].sort()
+        if speaker is not None:
+            return summary.get(speaker)
+        return [summary[name] for name in sorted(summary)]
+
+    def speaker_embeddings(self) -> Dict[str, List[torch.Tensor]]:
+        """화자 이름 -> 기준 임베딩 리스트 (화자 이름 정렬 순서)."""
+        entries = self.entries
+        grouped: Dict[str, List[torch.Tensor]] = {}
+        for path in sorted(entries, key=lambda p: (entries[p]["speaker"], p)):
+            entry = entries[path]
+            grouped.setdefault(entry["speaker"], []).append(entry["embedding"])
+        return grouped
+
+    def _sorted_paths(self, entries: Dict[str, Dict[str, Any]]) -> List[str]:
+        return sorted(entries, key=lambda p: (entries[p]["speaker"], p))
+
+    def ensure_index(self) -> Optional[SpeakerIndex]:
+        """현재 항목과 내용이 같은 메모리 매핑 인덱스를 열고, 없거나 오래되었으면 새로 기록합니다.
+
+        다른 워커가 이미 같은 내용으로 기록했다면 그 인덱스를 그대로 매핑하므로
+        모든 워커가 하나의 페이지 캐시 사본을 공유합니다.
+        """
+        entries = self.entries
+        paths = self._sorted_paths(entries)
+        digest = entries_digest([(p, entries[p]["sha1"]) for p in paths], self.model_id, SPEAKER_INDEX_DTYPE)
+        with self._index_lock:
+            if self._index is not None and self._index.digest == digest:
+                return self._index
+            try:
+                index = SpeakerIndex.open(self.index_dir)
+                if index is None or index.digest != digest:
+                    speakers = sorted({entries[p]["speaker"] for p in paths})
+                    spk_idx = {name: i for i, name in enumerate(speakers)}
+                    if paths:
+                        emb = torch.nn.functional.normalize(
+                            torch.stack([entries[p]["embedding"].reshape(-1).float() for p in paths]), dim=1
+                        ).numpy()
+                    else:
+                        emb = np.zeros((0, 0), dtype=np.float32)
+                    owners = np.array([spk_idx[entries[p]["speaker"]] for p in paths], dtype=np.int64)
+                    start = time.time()
+                    write_index(self.index_dir, speakers, emb, owners, paths, digest, dtype=SPEAKER_INDEX_DTYPE)
+                    logger.info(f"Wrote speaker index ({len(paths)} refs, {SPEAKER_INDEX_DTYPE}) in {time.time() - start:.3f}s")
+                    index = SpeakerIndex.open(self.index_dir)
+            except Exception as e:
+                logger.error(f"Failed to build speaker index in {self.index_dir}: {e}")
+                return None
+            # 항목의 임베딩을 인덱스 행(view)으로 바꿔 워커마다 별도 사본을 들고 있지 않게 합니다.
+            if index.embeddings.dtype == np.float32 and len(index.paths):
+                rows = torch.from_numpy(index.embeddings)
+                for i, path in enumerate(index.paths):
+                    entry = entries.get(path)
+                    if entry is not None:
+                        entry["embedding"] = rows[i]
+            self._index = index
+            return index
+
+    def matrix(self) -> EnrollmentMatrix:
+        """현재 항목으로 만든 점수 계산용 행렬 스냅샷 (항목이 바뀔 때만 다시 만듭니다).
+
+        메모리 매핑 인덱스를 사용할 수 있으면 임베딩 행렬을 복사하지 않고 인덱스 파일을 그대로 참조합니다.
+        """
+        version = self.version
+        matrix = self._matrix
+        if matrix is None or self._matrix_version != version:
+            index = self.ensure_index()
+            if index is not None:
+                emb = index.embeddings
+                if emb.dtype != np.float32:
+                    emb = np.asarray(emb, dtype=np.float32)
+                matrix = EnrollmentMatrix(
+                    list(index.speakers),
+                    torch.from_numpy(emb) if emb.size else torch.zeros((0, 0)),
+                    torch.from_numpy(index.ref_speaker).long(),
+                    index=index,
+                )
+            else:
+                matrix = EnrollmentMatrix.from_speaker_embeddings(self.speaker_embeddings())
+            matrix.key = index.digest if index is not None else f"{self.cache_path}@{version}"
+            self._matrix, self._matrix_version = matrix, version
+        return matrix
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "speakers_root": self.speakers_root,
+            "cache_path": self.cache_path,
+            "entries": len(self.entries),
+            "last_refresh": self.last_refresh,
+            "last_stats": self.last_stats,
+        }
@@ -0,0 +1,305 @@
+import os
+import time
+import uuid
+import queue
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 비동기 작업 설정
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+JOB_RESULT_TTL_SEC = float(os.getenv("JOB_RESULT_TTL_SEC", "3600"))
+# 업로드 원본을 작업 시작 전까지 보관할 위치 (기본값: 시스템 임시 디렉토리 아래)
+JOB_DIR = os.getenv("JOB_DIR", os.path.join(tempfile.gettempdir(), "speaker_jobs"))
+
+# 우선순위 클래스: 값이 작을수록 먼저 실행합니다.
+PRIORITIES: Dict[str, int] = {"interactive": 0, "backfill": 1}
+ACTIVE_STATES = ("queued", "running")
+FINAL_STATES = ("succeeded", "failed", "cancelled")
+
+COPY_BLOCK = 1 << 20
+
+
+class JobQueueFull(RuntimeError):
+    """대기 중인 작업 수가 JOB_MAX_QUEUED 에 도달해 새 작업을 받을 수 없는 경우."""
+
+
+class JobCancelled(Exception):
+    """실행 중인 작업이 취소 요청을 받아 중단된 경우."""
+
+
+def save_upload(fileobj: BinaryIO, directory: str) -> Tuple[str, str]:
+    """업로드 스트림을 directory 에 그대로 저장하면서 내용 해시(SHA1)를 계산합니다."""
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="upload_", dir=directory)
+    h = hashlib.sha1()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = fileobj.read(COPY_BLOCK)
+                if not block:
+                    break
+                h.update(block)
+                out.write(block)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, h.hexdigest()
+
+
+class Job:
+    """비동기 화자 식별 작업 하나의 상태와 (부분) 결과."""
+
+    def __init__(self, params: Dict[str, Any], audio_path: str, filename: str, priority: str):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.audio_path = audio_path
+        self.filename = filename
+        self.priority = priority
+        # 대기열 순서 (submit 에서 정해짐). 같은 우선순위에서는 작을수록 먼저 실행합니다.
+        self.seq = 0
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.total: Optional[int] = None
+        # 결과를 한꺼번에 내보내는 모드(cluster, cascade)에서 임베딩 배치 단위로 갱신되는 처리 문장 수
+        self.processed = 0
+        self.results: List[Dict[str, Any]] = []
+        self.summary: Optional[Dict[str, Any]] = None
+        self.audio_info: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+
+    def report_progress(self, done: int) -> None:
+        """임베딩 배치마다 호출됩니다: 처리한 문장 수를 기록하고, 취소 요청이 있으면 JobCancelled 를 올려 중단합니다."""
+        self.processed = max(self.processed, done)
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def describe(self) -> Dict[str, Any]:
+        done = max(len(self.results), self.processed)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "filename": self.filename,
+            "progress": {
+                "done": done,
+                "total": self.total,
+                "ratio": round(done / self.total, 4) if self.total else None,
+            },
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "audio": self.audio_info,
+            "error": self.error,
+            "cancel_requested": self.cancel_event.is_set() and self.status == "running",
+        }
+
+
+class JobManager:
+    """긴 녹음용 인프로세스 비동기 작업 큐.
+
+    - 우선순위(interactive → backfill) + 제출 순서로 정렬된 대기열과 고정 크기 워커 스레드 풀로 실행합니다.
+      워커는 공유 SpeakerEngine 을 사용하므로 세그먼트 임베딩은 추론 스케줄러에서 다른 요청과 합쳐집니다.
+    - 결과는 문장 단위로 쌓이므로 실행 중에도 진행률과 부분 결과를 조회할 수 있습니다.
+    - 취소는 대기 중이면 즉시, 실행 중이면 다음 문장 결과 시점에 반영됩니다.
+    - 끝난 작업은 ttl 초 동안 보관한 뒤 삭제합니다. 외부 브로커 없이 업로드 원본만 로컬 디렉토리에 둡니다.
+    """
+
+    def __init__(
+        self,
+        run_fn: Callable[["Job"], Iterator[Dict[str, Any]]],
+        workers: int = JOB_WORKERS,
+        max_queued: int = JOB_MAX_QUEUED,
+        ttl: float = JOB_RESULT_TTL_SEC,
+        directory: str = JOB_DIR,
+    ):
+        self.run_fn = run_fn
+        self.n_workers = max(1, workers)
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.directory = directory
+        self._jobs: Dict[str, Job] = {}
+        self._queue: "queue.PriorityQueue[Tuple[int, int, Optional[str]]]" = queue.PriorityQueue()
+        self._seq = 0
+        self._queued = 0
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stopping = False
+        os.makedirs(self.directory, exist_ok=True)
+        for i in range(self.n_workers):
+            t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info(f"Job manager started (workers={self.n_workers}, max_queued={self.max_queued}, ttl={self.ttl}s)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """워커를 종료합니다. 실행 중인 작업은 취소 신호를 받고, 대기 중인 작업은 취소되어 업로드 원본이 삭제됩니다."""
+        self._stopping = True
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status in ACTIVE_STATES:
+                    job.cancel_event.set()
+                if job.status == "queued":
+                    self._finish(job, "cancelled")
+        # 워커가 종료 신호보다 먼저 꺼내지 않도록 남은 대기열 항목을 비웁니다.
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        for _ in self._threads:
+            self._queue.put((-1, -1, None))
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def submit(self, params: Dict[str, Any], audio_path: str, filename: str = "", priority: str = "interactive") -> Job:
+        """작업을 등록합니다. 대기열이 가득 차면 JobQueueFull 을 발생시킵니다."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {tuple(PRIORITIES)}")
+        if not self._threads:
+            self.start()
+        self.evict_expired()
+        job = Job(params, audio_path, filename, priority)
+        with self._lock:
+            if self._queued >= self.max_queued:
+                raise JobQueueFull(f"Job queue is full ({self.max_queued} queued jobs)")
+            self._jobs[job.id] = job
+            self._queued += 1
+            self._seq += 1
+            job.seq = self._seq
+            self._queue.put((PRIORITIES[priority], job.seq, job.id))
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """작업을 반환합니다. 없거나 보관 기간이 지났으면 KeyError."""
+        self.evict_expired()
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"Job not found: {job_id}")
+        return job
+
+    def position(self, job: Job) -> Optional[int]:
+        """대기 중인 작업 앞에 있는 대기 작업 수 (실행 중/종료된 작업은 None)."""
+        if job.status != "queued":
+            return None
+        key = (PRIORITIES[job.priority], job.seq)
+        with self._lock:
+            return sum(
+                1 for other in self._jobs.values()
+                if other.status == "queued" and (PRIORITIES[other.priority], other.seq) < key
+            )
+
+    def cancel(self, job_id: str) -> Job:
+        """대기 중인 작업은 바로 취소하고, 실행 중인 작업에는 취소 신호를 보냅니다."""
+        job = self.get(job_id)
+        job.cancel_event.set()
+        with self._lock:
+            if job.status == "queued":
+                self._finish(job, "cancelled")
+        return job
+
+    def delete(self, job_id: str) -> Job:
+        """끝난 작업의 결과를 삭제합니다 (진행 중이면 ValueError)."""
+        job = self.get(job_id)
+        with self._lock:
+            if job.status in ACTIVE_STATES:
+                raise ValueError(f"Job {job_id} is {job.status}; cancel it first")
+            self._jobs.pop(job_id, None)
+        return job
+
+    def list(self) -> List[Dict[str, Any]]:
+        self.evict_expired()
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j.created_at)
+        return [job.describe() for job in jobs]
+
+    def evict_expired(self) -> int:
+        """보관 기간(ttl)이 지난 종료 작업을 삭제합니다."""
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None and now - job.finished_at > self.ttl
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {state: 0 for state in ACTIVE_STATES + FINAL_STATES}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return {
+            "workers": self.n_workers,
+            "running": any(t.is_alive() for t in self._threads),
+            "max_queued": self.max_queued,
+            "ttl_sec": self.ttl,
+            "jobs": counts,
+        }
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        # self._lock 을 잡은 상태에서 호출합니다.
+        if job.status == "queued":
+            self._queued -= 1
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        if os.path.exists(job.audio_path):
+            os.remove(job.audio_path)
+
+    def _worker(self) -> None:
+        while True:
+            try:
+                _, _, job_id = self._queue.get(timeout=max(1.0, min(60.0, self.ttl)))
+            except queue.Empty:
+                self.evict_expired()
+                continue
+            if job_id is None or self._stopping:
+                break
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.status != "queued":
+                    continue
+                self._queued -= 1
+                job.status = "running"
+                job.started_at = time.time()
+            self._execute(job)
+
+    def _execute(self, job: Job) -> None:
+        status, error = "succeeded", None
+        try:
+            for record in self.run_fn(job):
+                if job.cancel_event.is_set():
+                    raise JobCancelled()
+                if "speaker" in record:
+                    job.results.append(record)
+                elif "audio" in record and len(record) == 1:
+                    job.audio_info = record["audio"]
+                else:
+                    job.summary = record
+                    if record.get("status") == "error":
+                        status, error = "failed", record.get("detail")
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as e:
+            # [[memory:6804125]]
+            logger.error(f"Job {job.id} failed: {e}")
+            status, error = "failed", str(e)
+        with self._lock:
+            self._finish(job, status, error)
+        logger.info(f"Job {job.id} {status} ({len(job.results)}/{job.total} segments)")
@@ -3,30 +3,139 @@ import torch
 import torchaudio
 import logging
 import time
-import shutil
-from pathlib import Path
-from typing import Dict, List, Tuple, Any, Union
-from modelscope.pipelines import pipeline
+import hashlib
+import threading
+import weakref
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Any, Union
+from .enrollment import EnrollmentStore
+from .scoring import EnrollmentMatrix, assign_speakers, score_segments, top_speaker_scores, AGGREGATIONS, SEARCH_MODES
+from .batching import (
+    BatchedEmbedder, EMBED_BATCH_SIZE, FBANK_STREAM_MAX_BLOCKS, FBANK_WHOLE_RECORDING, RecordingFeatures,
+    compute_fbank, chunk_sample_range
+)
+from .backends import SPEAKER_BACKEND, SPEAKER_QUANTIZE, SPEAKER_EXPORT_DIR, build_embedder
+from .scheduler import InferenceScheduler
+from .audio import AudioSource, AudioUnavailable, LazyAudio, TensorAudio, decode_to_pcm_file, load_audio
+from .jobs import Job, JobManager
+from .vad import VADConfig, apply_vad, select_speech_frames
+from .segment_cache import SegmentCache, ScoreTable, SEGMENT_SCORE_TOP
+from .metrics import (
+    CASCADE_COMPARISONS_TOTAL, CASCADE_SEGMENTS_TOTAL, METRICS_ENABLED, MODEL_LOAD_SECONDS, REGISTRY, Gauge,
+    RequestTrace, span
+)
+from .cascade import (
+    CASCADE_CROP_SEC, CASCADE_MARGIN, CASCADE_PROJ_DIM, CASCADE_REPORT_BASELINE, CASCADE_SHORTLIST,
+    cascade_stats, confidence_margin, crop_chunk, projected_matrix, score_shortlist, shortlist_speakers
+)
+from .speaker_change import (
+    SPLIT_HOP_SEC, SPLIT_WINDOW_SEC, change_times, needs_check, smooth_labels, speaker_change_stats, split_at_words,
+    window_labels, window_ranges
+)
+from .clustering import MATCH_MODES, agglomerative_cluster, cluster_centroids, comparison_stats, neighbor_labels
 from .utils.json_paser import refine_whisper_json
 
 logger = logging.getLogger(__name__)
 
+# Kaldi fbank 프레임 1개(25ms)보다 짧은 구간은 임베딩할 수 없습니다.
+MIN_SEGMENT_SAMPLES = 400
+# 스트리밍 모드에서 한 번에 임베딩할 세그먼트 수
+STREAM_BATCH_SEGMENTS = int(os.getenv("STREAM_BATCH_SEGMENTS", str(EMBED_BATCH_SIZE)))
+
+# 임베딩하지 않고 라벨만 붙여 내보내는 청크 ('very_short': 정제 단계, 'no_speech': VAD 단계)
+SKIP_LABELS: Tuple[str, ...] = ("very_short", "no_speech")
+# 청크에서 결과로 그대로 옮기는 부가 정보 (VAD 음성 길이, 화자 전환으로 나눈 조각의 원래 문장 구간)
+RESULT_CHUNK_KEYS: Tuple[str, ...] = ("speech_duration", "sentence")
+
+# True 이면 cluster 모드에서 비교용으로 세그먼트 단위 채점도 수행해 지연 시간과 일치율을 보고합니다.
+CLUSTER_REPORT_BASELINE = os.getenv("CLUSTER_REPORT_BASELINE", "false").lower() in ("1", "true", "yes")
+
+def _check_options(aggregate: str, search: str, mode: str = "segment") -> None:
+    if aggregate not in AGGREGATIONS:
+        raise ValueError(f"aggregate must be one of {AGGREGATIONS}")
+    if search not in SEARCH_MODES:
+        raise ValueError(f"search must be one of {SEARCH_MODES}")
+    if mode not in MATCH_MODES:
+        raise ValueError(f"mode must be one of {MATCH_MODES}")
+
+def _copy_chunk_info(chunk: Dict[str, Any], res: Dict[str, Any]) -> None:
+    for key in RESULT_CHUNK_KEYS:
+        if key in chunk:
+            res[key] = chunk[key]
+
+def _count_matrix(trace: RequestTrace, matrix: EnrollmentMatrix) -> None:
+    trace.count("speakers", len(matrix))
+    trace.count("refs", matrix.embeddings.size(0))
+
 class SpeakerEngine:
-    def __init__(self, model_path: str):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Loading ERes2Net model from {model_path} on {self.device}")
-        
-        # 모델 저장 경로 및 임시 폴더 설정
+    def __init__(self, model_path: str, embedding_model: Optional[torch.nn.Module] = None):
+        """
+        Args:
+            model_path: modelscope ERes2Net 모델 경로.
+            embedding_model: 주어지면 modelscope 파이프라인을 로드하지 않고 이 임베딩 네트워크(fbank [B, T, 80] -> [B, D])를
+                사용합니다. 벤치마크의 결정적 스텁 모델처럼 네트워크 없는 환경용이며, model_path 는 캐시 식별자로만 쓰입니다.
+        """
         self.model_path = model_path
-        os.environ["MS_CACHE_HOME"] = os.path.dirname(model_path)
-        
-        # 스피커 검증 파이프라인 로드
-        self.sv_pipeline = pipeline(
-            task="speaker-verification", 
-            model=model_path, 
-            device=self.device
-        )
-        logger.info("ERes2Net model is successfully pinned to GPU.")
+        if embedding_model is not None:
+            self.device = str(next(embedding_model.parameters()).device)
+            logger.info(f"Using injected embedding model {type(embedding_model).__name__} on {self.device}")
+            self.sv_pipeline = None
+        else:
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            logger.info(f"Loading ERes2Net model from {model_path} on {self.device}")
+
+            # 모델 저장 경로 및 임시 폴더 설정
+            os.environ["MS_CACHE_HOME"] = os.path.dirname(model_path)
+            # modelscope 는 import 에만 수 초가 걸리므로 서버 import 시점이 아니라 모델 로드 시점에 가져옵니다.
+            from modelscope.pipelines import pipeline
+
+            # 스피커 검증 파이프라인 로드
+            self.sv_pipeline = pipeline(
+                task="speaker-verification",
+                model=model_path,
+                device=self.device
+            )
+            logger.info("ERes2Net model is successfully pinned to GPU.")
+            embedding_model = self.sv_pipeline.model.embedding_model
+
+        # 세그먼트 임베딩 배치 추출기 (임베딩 네트워크 직접 호출, 임시 파일 없음)
+        try:
+            self.embedder = BatchedEmbedder(embedding_model)
+        except Exception as e:
+            logger.error(f"Failed to set up batched embedder, falling back to per-segment model calls: {e}")
+            self.embedder = None
+
+        # CPU 에서는 SPEAKER_BACKEND 로 TorchScript / ONNX Runtime (선택적 int8) 백엔드를 사용할 수 있습니다.
+        # 백엔드/양자화마다 임베딩이 미세하게 다르므로 캐시 식별자(model_id)에 실제로 사용하는 백엔드와 양자화 모드를
+        # 포함합니다 (기준 임베딩 캐시, 화자 인덱스 digest, 세그먼트 캐시가 모두 이 값으로 구분됨).
+        self.model_id = os.path.basename(os.path.normpath(model_path))
+        self.backend = "modelscope"
+        if SPEAKER_BACKEND != "modelscope" and self.sv_pipeline is not None:
+            if self.device != "cpu":
+                logger.warning(f"SPEAKER_BACKEND={SPEAKER_BACKEND} is CPU-only; using modelscope on {self.device}")
+            else:
+                embedder = build_embedder(
+                    embedding_model,
+                    self.embedder,
+                    self.model_id,
+                    SPEAKER_EXPORT_DIR or os.path.join(ENROLL_CACHE_DIR, "backends"),
+                    backend=SPEAKER_BACKEND,
+                    quantize=SPEAKER_QUANTIZE,
+                )
+                if embedder is not self.embedder:
+                    self.embedder = embedder
+                    self.backend = embedder.name
+                    self.model_id = f"{self.model_id}.{SPEAKER_BACKEND}.{SPEAKER_QUANTIZE}"
+
+        # 같은 녹음을 threshold 만 바꿔 다시 요청할 때 재사용할 세그먼트 임베딩/점수 캐시
+        self.segment_cache = SegmentCache(model_id=self.model_id)
+
+        # 오디오 객체별 녹음 전체 fbank (값은 오디오를 참조하지 않으므로 요청/스트림이 끝나 오디오 객체가 사라지면 함께 해제)
+        self._features: "weakref.WeakKeyDictionary[Any, RecordingFeatures]" = weakref.WeakKeyDictionary()
+        self._features_lock = threading.Lock()
+
+        # speakers_root 별 기준 화자 임베딩 저장소
+        self._stores: Dict[str, EnrollmentStore] = {}
+        self._store_lock = threading.Lock()
 
     def ensure_mono_16k(self, wav: torch.Tensor, sr: int) -> torch.Tensor:
         if wav.dim() == 1:
@@ -54,138 +163,1015 @@ class SpeakerEngine:
             return self.extract_score(result[0])
         return 0.0
 
+    def embed_waveform(self, wav: torch.Tensor) -> torch.Tensor:
+        """16k mono 파형 [1, T] 에서 ERes2Net 화자 임베딩 [D] 을 추출합니다."""
+        if self.embedder is not None:
+            return self.embedder.embed([compute_fbank(wav)])[0]
+        with torch.no_grad():
+            emb = self.sv_pipeline.model(wav)
+        return emb.reshape(-1).float().cpu()
+
+    def recording_features(self, audio: AudioSource) -> RecordingFeatures:
+        """오디오 객체의 녹음 전체 fbank. 같은 요청 안의 여러 배치/재채점 호출이 같은 프레임을 공유합니다.
+
+        파형 전체가 이미 메모리에 있는 TensorAudio/LazyAudio 만 FBANK_MAX_CACHED_SEC 까지 블록을 유지하고,
+        PcmFile/RollingAudioBuffer 는 현재 배치가 걸친 블록(FBANK_STREAM_MAX_BLOCKS)만 남겨 메모리를 일정하게 유지합니다.
+        """
+        with self._features_lock:
+            features = self._features.get(audio)
+            if features is None:
+                if isinstance(audio, (TensorAudio, LazyAudio)):
+                    features = RecordingFeatures(audio.sample_rate)
+                else:
+                    features = RecordingFeatures(audio.sample_rate, max_blocks=FBANK_STREAM_MAX_BLOCKS)
+                self._features[audio] = features
+            return features
+
+    def extract_chunk_embeddings(
+        self,
+        wav: Union[torch.Tensor, AudioSource],
+        chunks: List[Dict[str, Any]],
+        sr: int = 16000,
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]] = None,
+        audio_hash: Optional[str] = None,
+        trace: Optional[RequestTrace] = None,
+    ) -> Tuple[List[int], torch.Tensor]:
+        """refine_whisper_json 청크들의 임베딩을 메모리 상에서 배치로 추출합니다.
+
+        Args:
+            wav: 16k mono 전체 파형 [1, T] 또는 구간 단위로 읽는 PcmFile/TensorAudio.
+            chunks: refine_whisper_json 결과 리스트.
+            embed_fn: fbank 특징 리스트를 임베딩하는 함수. 기본값은 엔진의 배치 추출기이며,
+                서버에서는 여러 요청을 합쳐 실행하는 InferenceScheduler.embed 를 전달합니다.
+            audio_hash: 오디오 내용 해시. 주어지면 세그먼트 캐시에 있는 구간은 다시 계산하지 않습니다.
+            trace: 요청 단계별 시간(features, embedding)을 기록할 RequestTrace.
+
+        Returns:
+            Tuple[List[int], torch.Tensor]: 임베딩된 청크 인덱스와 임베딩 [K, D].
+                'very_short'/'no_speech' 이거나 구간이 비어 있는 청크는 제외됩니다.
+                VAD 의 embed_start/embed_end 가 있으면 그 구간을, speech_keep 이 있으면 그 프레임만 임베딩합니다.
+        """
+        audio = TensorAudio(wav, sr) if isinstance(wav, torch.Tensor) else wav
+        candidates: List[int] = []
+        ranges: List[Tuple[int, int]] = []
+        for i, chunk in enumerate(chunks):
+            if chunk.get("speaker") in SKIP_LABELS:
+                continue
+            s_idx, e_idx = chunk_sample_range(chunk, audio.n_samples, sr)
+            if e_idx - s_idx < MIN_SEGMENT_SAMPLES:
+                continue
+            candidates.append(i)
+            ranges.append((s_idx, e_idx))
+
+        cached: List[Optional[torch.Tensor]] = [None] * len(candidates)
+        if audio_hash is not None:
+            cached = self.segment_cache.get_many(audio_hash, ranges)
+            # 내부 휴지를 뺀(mask) 임베딩은 같은 구간의 전체 프레임 임베딩과 다르므로 구간 캐시를 쓰지 않습니다.
+            cached = [None if "speech_keep" in chunks[i] else emb for i, emb in zip(candidates, cached)]
+
+        # 녹음 전체 fbank 에서 프레임 구간만 잘라 쓰고, 블록을 읽을 수 없는 구간만 구간 단위로 계산합니다.
+        features = self.recording_features(audio) if FBANK_WHOLE_RECORDING and self.embedder is not None else None
+        indices: List[int] = []
+        feats: List[torch.Tensor] = []
+        new_ranges: List[Tuple[int, int]] = []
+        with span(trace, "features"):
+            for i, (s_idx, e_idx), emb in zip(candidates, ranges, cached):
+                if emb is not None:
+                    continue
+                try:
+                    seg_feats = features.slice(audio, s_idx, e_idx) if features is not None else None
+                    if seg_feats is None:
+                        seg_feats = compute_fbank(audio.read(s_idx, e_idx), sr)
+                    keep = chunks[i].get("speech_keep")
+                    feats.append(seg_feats if keep is None else select_speech_frames(seg_feats, keep))
+                    indices.append(i)
+                    new_ranges.append((s_idx, e_idx))
+                except AudioUnavailable:
+                    raise
+                except Exception as e:
+                    chunk = chunks[i]
+                    logger.error(f"Failed to extract features for segment {chunk['start']:.2f}-{chunk['end']:.2f}s: {e}")
+        if trace is not None:
+            trace.count("embedded", len(feats))
+            trace.count("embedded_frames", sum(f.size(0) for f in feats))
+            trace.count("cache_hits", sum(emb is not None for emb in cached))
+
+        embs = torch.zeros((0, 0))
+        if feats:
+            with span(trace, "embedding"):
+                if embed_fn is not None:
+                    embs = embed_fn(feats)
+                elif self.embedder is not None:
+                    embs = self.embedder.embed(feats)
+                else:
+                    embs = torch.stack([self.embed_waveform(audio.read(s_idx, e_idx)) for s_idx, e_idx in new_ranges])
+            if audio_hash is not None:
+                plain = [j for j, i in enumerate(indices) if "speech_keep" not in chunks[i]]
+                if plain:
+                    self.segment_cache.put_many(
+                        audio_hash, audio.n_samples, [new_ranges[j] for j in plain], embs[plain]
+                    )
+
+        if not any(emb is not None for emb in cached):
+            return (indices, embs) if feats else ([], torch.zeros((0, 0)))
+
+        # 캐시 적중분과 새로 계산한 임베딩을 청크 순서대로 합칩니다.
+        computed = dict(zip(indices, embs))
+        merged_idx: List[int] = []
+        merged: List[torch.Tensor] = []
+        for i, emb in zip(candidates, cached):
+            emb = emb if emb is not None else computed.get(i)
+            if emb is not None:
+                merged_idx.append(i)
+                merged.append(emb)
+        return merged_idx, torch.stack(merged)
+
+    def embed_enrollment_file(self, path: str) -> Tuple[torch.Tensor, float]:
+        """기준 화자 음성 파일을 16k mono 로 변환 후 임베딩과 길이(초)를 반환합니다."""
+        wav, _ = load_audio(path)
+        return self.embed_waveform(wav), wav.size(1) / 16000
+
+    def get_enrollment_store(self, speakers_root: str, force_refresh: bool = False) -> EnrollmentStore:
+        """speakers_root 별 임베딩 저장소를 반환합니다. 최초 호출 시 디스크 캐시를 읽고 변경분만 갱신합니다."""
+        key = os.path.abspath(speakers_root)
+        with self._store_lock:
+            store = self._stores.get(key)
+            if store is None:
+                cache_name = f"enroll_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}.pt"
+                store = EnrollmentStore(
+                    key,
+                    os.path.join(ENROLL_CACHE_DIR, cache_name),
+                    self.embed_enrollment_file,
+                    model_id=self.model_id,
+                    refresh_interval=ENROLL_REFRESH_INTERVAL,
+                )
+                store.load()
+                self._stores[key] = store
+        store.refresh(force=force_refresh)
+        return store
+
+    def load_matrix(self, speakers_root: str) -> EnrollmentMatrix:
+        # 기준 화자(Enrollment) 임베딩 확보 (디스크 캐시, 변경된 파일만 재계산)
+        store = self.get_enrollment_store(speakers_root)
+        matrix = store.matrix()
+
+        if len(matrix) == 0:
+            logger.error(f"No speaker enrollment files found in {speakers_root}")
+            raise RuntimeError(f"No speaker enrollment files found in {speakers_root}")
+
+        logger.info(f"Loaded {len(matrix)} speakers ({matrix.embeddings.size(0)} refs) for identification")
+        return matrix
+
+    def split_speaker_changes(
+        self,
+        audio: AudioSource,
+        chunks: List[Dict[str, Any]],
+        matrix: EnrollmentMatrix,
+        threshold: float,
+        aggregate: str = "max",
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]] = None,
+        audio_hash: Optional[str] = None,
+        trace: Optional[RequestTrace] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """긴 문장 안에서 화자가 바뀌는 지점을 찾아 단어 경계에서 나눕니다 (refine_whisper_json(keep_words=True) 청크).
+
+        SPLIT_MIN_SENTENCE_SEC 보다 긴 문장마다 SPLIT_WINDOW_SEC 윈도를 SPLIT_HOP_SEC 간격으로 두고,
+        모든 문장의 윈도를 녹음 전체 fbank 에서 잘라 한 번에 배치 임베딩한 뒤 윈도별 최고 점수 화자를 구합니다.
+        짧은 흔들림(SPLIT_MIN_RUN 미만)을 제거한 라벨이 바뀌는 지점에서 가장 가까운 단어 경계로 문장을 나누며,
+        나뉜 조각은 원래 문장 구간('sentence')을 가지고 일반 경로로 다시 채점됩니다.
+        추가 비용은 검사한 문장 길이의 약 (윈도 길이 / 간격) 배 임베딩입니다.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Dict[str, Any]]: 나눈 청크 리스트와 윈도/분할 통계.
+        """
+        started = time.time()
+        sr = audio.sample_rate
+        window = int(round(SPLIT_WINDOW_SEC * sr))
+        hop = max(1, int(round(SPLIT_HOP_SEC * sr)))
+        checked = [i for i, chunk in enumerate(chunks) if needs_check(chunk)]
+        windows: List[Dict[str, Any]] = []
+        owners: List[int] = []
+        checked_sec = 0.0
+        for i in checked:
+            s_idx, e_idx = chunk_sample_range(chunks[i], audio.n_samples, sr)
+            checked_sec += (e_idx - s_idx) / sr
+            for ws, we in window_ranges(s_idx, e_idx, window, hop):
+                windows.append({"start": ws / sr, "end": we / sr, "text": ""})
+                owners.append(i)
+        if not windows or len(matrix) == 0:
+            return chunks, speaker_change_stats(len(checked), 0, 0.0, checked_sec, 0, 0, time.time() - started)
+
+        idx, embs = self.extract_chunk_embeddings(
+            audio, windows, sr, embed_fn=embed_fn, audio_hash=audio_hash, trace=trace
+        )
+        per_chunk: Dict[int, List[Tuple[float, float, int]]] = {}
+        if idx:
+            with span(trace, "scoring"):
+                top_scores, top_idx = top_speaker_scores(embs, matrix, aggregate, k=1)
+            for j, score, spk in zip(idx, top_scores[:, 0].tolist(), top_idx[:, 0].tolist()):
+                w = windows[j]
+                per_chunk.setdefault(owners[j], []).append(((w["start"] + w["end"]) / 2, score, spk))
+
+        out: List[Dict[str, Any]] = []
+        n_split = n_added = 0
+        for i, chunk in enumerate(chunks):
+            wins = per_chunk.get(i)
+            if wins is None or len(wins) < 2:
+                out.append(chunk)
+                continue
+            labels = smooth_labels(window_labels([w[1] for w in wins], [w[2] for w in wins], threshold))
+            pieces = split_at_words(chunk, [t for t, _, _ in change_times(labels, [w[0] for w in wins])])
+            if len(pieces) > 1:
+                n_split += 1
+                n_added += len(pieces) - 1
+            out.extend(pieces)
+        if trace is not None:
+            trace.count("windows", len(windows))
+        window_sec = sum(w["end"] - w["start"] for w in windows)
+        return out, speaker_change_stats(
+            len(checked), len(windows), window_sec, checked_sec, n_split, n_added, time.time() - started
+        )
+
+    def _iter_results(
+        self,
+        audio: AudioSource,
+        final_chunks: List[Dict[str, Any]],
+        matrix: EnrollmentMatrix,
+        threshold: float,
+        aggregate: str,
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]],
+        batch_segments: Optional[int] = None,
+        top_k: int = 0,
+        search: str = "exact",
+        audio_hash: Optional[str] = None,
+        score_table: Optional[ScoreTable] = None,
+        trace: Optional[RequestTrace] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """문장 청크를 시간 순서대로 처리하며 결과를 하나씩 내보냅니다.
+
+        batch_segments 개의 세그먼트가 모일 때마다 임베딩/점수 계산을 수행하므로,
+        메모리 사용량은 녹음 길이가 아니라 (가장 긴 세그먼트 x 배치 크기) 에 비례합니다.
+        None 이면 모든 세그먼트를 한 번에 배치 처리합니다.
+
+        audio_hash 가 주어지면 세그먼트 임베딩 캐시를, score_table 이 주어지면 세그먼트별 상위 화자 점수
+        캐시를 사용하여 이미 계산된 구간은 threshold 만 다시 적용합니다.
+        """
+        sr = audio.sample_rate
+        pending: List[Dict[str, Any]] = []
+        to_score: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+
+        def _flush() -> Iterator[Dict[str, Any]]:
+            if to_score:
+                chunks = [c for c, _ in to_score]
+                if score_table is None:
+                    embedded_idx, seg_embs = self.extract_chunk_embeddings(
+                        audio, chunks, sr, embed_fn=embed_fn, audio_hash=audio_hash, trace=trace
+                    )
+                    if embedded_idx:
+                        # 모든 세그먼트 x 모든 기준 임베딩을 하나의 코사인 유사도 행렬로 계산합니다.
+                        with span(trace, "scoring"):
+                            assigned = score_segments(
+                                seg_embs, matrix, threshold, aggregate=aggregate, top_k=top_k, search=search
+                            )
+                        for idx, scored in zip(embedded_idx, assigned):
+                            to_score[idx][1].update(scored)
+                else:
+                    for idx, scored in self._score_with_table(
+                        audio, chunks, matrix, threshold, aggregate, embed_fn, top_k, search, audio_hash, score_table,
+                        trace=trace
+                    ):
+                        to_score[idx][1].update(scored)
+            for res in pending:
+                yield res
+            pending.clear()
+            to_score.clear()
+
+        for chunk in final_chunks:
+            start, end = chunk["start"], chunk["end"]
+
+            # [추가] 0.5초 이하의 매우 짧은 구간과 VAD 로 음성이 없다고 판단한 구간은 식별 과정을 건너뜁니다.
+            if chunk.get("speaker") in SKIP_LABELS:
+                res = {
+                    "start": round(start, 3),
+                    "end": round(end, 3),
+                    "text": chunk["text"],
+                    "speaker": chunk["speaker"],
+                    "score": 0.0
+                }
+                _copy_chunk_info(chunk, res)
+                pending.append(res)
+                continue
+
+            s_idx, e_idx = chunk_sample_range(chunk, audio.n_samples, sr)
+            if e_idx <= s_idx:
+                continue
+
+            res = {
+                "start": round(start, 3),
+                "end": round(end, 3),
+                "text": chunk["text"],
+                "speaker": "unknown",
+                "score": 0.0
+            }
+            _copy_chunk_info(chunk, res)
+            pending.append(res)
+            to_score.append((chunk, res))
+            if batch_segments is not None and len(to_score) >= batch_segments:
+                yield from _flush()
+
+        yield from _flush()
+
+    def _score_with_table(
+        self,
+        audio: AudioSource,
+        chunks: List[Dict[str, Any]],
+        matrix: EnrollmentMatrix,
+        threshold: float,
+        aggregate: str,
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]],
+        top_k: int,
+        search: str,
+        audio_hash: Optional[str],
+        score_table: ScoreTable,
+        trace: Optional[RequestTrace] = None,
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """점수 테이블에 없는 구간만 임베딩/점수 계산하고, 모든 구간에 threshold 를 적용합니다."""
+        need_k = min(max(1, top_k), len(matrix))
+        ranges = [chunk_sample_range(c, audio.n_samples, audio.sample_rate) for c in chunks]
+
+        def _cached(r: Tuple[int, int]) -> bool:
+            entry = score_table.get(r)
+            return entry is not None and entry[0].numel() >= need_k
+
+        missing = [i for i, r in enumerate(ranges) if not _cached(r)]
+        if missing and len(matrix):
+            embedded_idx, seg_embs = self.extract_chunk_embeddings(
+                audio, [chunks[i] for i in missing], audio.sample_rate, embed_fn=embed_fn, audio_hash=audio_hash,
+                trace=trace
+            )
+            if embedded_idx:
+                with span(trace, "scoring"):
+                    top_scores, top_idx = top_speaker_scores(
+                        seg_embs, matrix, aggregate, k=max(need_k, SEGMENT_SCORE_TOP), search=search
+                    )
+                for j, row_scores, row_idx in zip(embedded_idx, top_scores, top_idx):
+                    score_table[ranges[missing[j]]] = (row_scores.clone(), row_idx.clone())
+
+        hit = [i for i, r in enumerate(ranges) if _cached(r)]
+        if not hit:
+            return []
+        with span(trace, "scoring"):
+            top_scores = torch.stack([score_table[ranges[i]][0][:need_k] for i in hit])
+            top_idx = torch.stack([score_table[ranges[i]][1][:need_k] for i in hit])
+            return list(zip(hit, assign_speakers(top_scores, top_idx, matrix, threshold, top_k)))
+
+    @staticmethod
+    def _result_records(
+        audio: AudioSource, final_chunks: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """녹음 단위 모드(cluster, cascade)용 문장 결과 틀과 대응하는 청크 (구간이 비어 있는 청크는 제외)."""
+        records: List[Dict[str, Any]] = []
+        chunks: List[Dict[str, Any]] = []
+        for chunk in final_chunks:
+            skipped = chunk.get("speaker") in SKIP_LABELS
+            if not skipped:
+                s_idx, e_idx = chunk_sample_range(chunk, audio.n_samples, audio.sample_rate)
+                if e_idx <= s_idx:
+                    continue
+            record = {
+                "start": round(chunk["start"], 3),
+                "end": round(chunk["end"], 3),
+                "text": chunk["text"],
+                "speaker": chunk["speaker"] if skipped else "unknown",
+                "score": 0.0
+            }
+            _copy_chunk_info(chunk, record)
+            records.append(record)
+            chunks.append(chunk)
+        return records, chunks
+
+    def _cluster_results(
+        self,
+        audio: AudioSource,
+        final_chunks: List[Dict[str, Any]],
+        matrix: EnrollmentMatrix,
+        threshold: float,
+        aggregate: str,
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]],
+        batch_segments: Optional[int] = None,
+        top_k: int = 0,
+        search: str = "exact",
+        audio_hash: Optional[str] = None,
+        trace: Optional[RequestTrace] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """녹음 하나의 세그먼트 임베딩을 먼저 군집화하고, 클러스터 중심만 기준 화자와 비교합니다.
+
+        결과는 모든 임베딩이 끝난 뒤에 나오므로, on_progress 가 주어지면 임베딩 배치마다 처리한 문장 수로 호출합니다
+        (예외를 올리면 남은 배치를 처리하지 않고 중단).
+
+        - 각 세그먼트는 자신이 속한 클러스터 중심의 화자/점수를 받고 'cluster' 번호가 붙습니다.
+        - 'very_short' 이거나 임베딩할 수 없는 청크는 시간상 가장 가까운 이웃 문장의 클러스터 화자를 받습니다
+          ('inferred': True, score 0.0). 이웃이 NEIGHBOR_MAX_GAP 보다 멀면 기존처럼 남겨둡니다.
+        - VAD 가 음성이 없다고 판단한 'no_speech' 청크는 이웃 화자를 받지 않고 그대로 남습니다.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Dict[str, Any]]: 문장 단위 결과와 비교 횟수/소요 시간 통계.
+        """
+        sr = audio.sample_rate
+        started = time.time()
+        records, chunks = self._result_records(audio, final_chunks)
+
+        # 1. 세그먼트 임베딩 (특징 메모리를 제한하기 위해 batch_segments 단위로 추출)
+        step = batch_segments or max(1, len(chunks))
+        embedded_idx: List[int] = []
+        emb_parts: List[torch.Tensor] = []
+        for s in range(0, len(chunks), step):
+            if on_progress is not None:
+                on_progress(s)
+            idx, embs = self.extract_chunk_embeddings(
+                audio, chunks[s: s + step], sr, embed_fn=embed_fn, audio_hash=audio_hash, trace=trace
+            )
+            embedded_idx.extend(s + i for i in idx)
+            if idx:
+                emb_parts.append(embs)
+        if on_progress is not None:
+            on_progress(len(chunks))
+        embed_done = time.time()
+
+        stats = comparison_stats(len(embedded_idx), 0, matrix.embeddings.size(0))
+        if not embedded_idx:
+            stats.update(embed_time=round(embed_done - started, 4), cluster_time=0.0, score_time=0.0)
+            return records, stats
+        seg_embs = torch.cat(emb_parts)
+
+        # 2. 군집화 후 클러스터 중심만 기준 임베딩과 비교
+        with span(trace, "clustering"):
+            labels = agglomerative_cluster(seg_embs.numpy())
+            centroids = torch.from_numpy(cluster_centroids(seg_embs.numpy(), labels))
+        cluster_done = time.time()
+        with span(trace, "scoring"):
+            assigned = score_segments(centroids, matrix, threshold, aggregate=aggregate, top_k=top_k, search=search)
+        score_done = time.time()
+
+        label_of: List[Optional[int]] = [None] * len(records)
+        for i, label in zip(embedded_idx, labels.tolist()):
+            label_of[i] = label
+            records[i].update(assigned[label])
+            records[i]["cluster"] = label
+
+        # 3. 라벨이 없는 청크는 시간상 이웃 문장의 클러스터를 따릅니다.
+        order = sorted(range(len(records)), key=lambda i: (records[i]["start"], records[i]["end"]))
+        inferred = neighbor_labels(
+            [(records[i]["start"], records[i]["end"]) for i in order], [label_of[i] for i in order]
+        )
+        n_inferred = 0
+        for i, label in zip(order, inferred):
+            if label_of[i] is None and label is not None and records[i]["speaker"] != "no_speech":
+                records[i].update(speaker=assigned[label]["speaker"], score=0.0, cluster=label, inferred=True)
+                n_inferred += 1
+
+        stats = comparison_stats(len(embedded_idx), len(centroids), matrix.embeddings.size(0))
+        stats.update(
+            inferred_from_neighbors=n_inferred,
+            embed_time=round(embed_done - started, 4),
+            cluster_time=round(cluster_done - embed_done, 4),
+            score_time=round(score_done - cluster_done, 4),
+        )
+        if CLUSTER_REPORT_BASELINE:
+            # 비교용: 같은 임베딩으로 세그먼트 단위 채점을 수행한 시간과 화자 일치율
+            baseline = score_segments(seg_embs, matrix, threshold, aggregate=aggregate, top_k=top_k, search=search)
+            stats["per_segment_score_time"] = round(time.time() - score_done, 4)
+            agree = sum(b["speaker"] == records[i]["speaker"] for i, b in zip(embedded_idx, baseline))
+            stats["per_segment_agreement"] = round(agree / len(baseline), 4)
+        return records, stats
+
+    def _cascade_results(
+        self,
+        audio: AudioSource,
+        final_chunks: List[Dict[str, Any]],
+        matrix: EnrollmentMatrix,
+        threshold: float,
+        aggregate: str,
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]],
+        batch_segments: Optional[int] = None,
+        top_k: int = 0,
+        audio_hash: Optional[str] = None,
+        trace: Optional[RequestTrace] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """2단계 채점: 짧은 구간 + 저차원 투영으로 후보를 고르고, 애매한 문장만 전체 구간으로 다시 채점합니다.
+
+        1. 문장 가운데 CASCADE_CROP_SEC 구간만 임베딩하고, PCA 투영 공간에서 모든 기준 임베딩과 비교해
+           후보 화자 CASCADE_SHORTLIST 명을 고른 뒤 후보의 기준 임베딩과만 전체 차원 점수를 계산합니다.
+        2. 신뢰 여유(1·2위 차, threshold 와의 거리)가 CASCADE_MARGIN 미만인 문장만 전체 구간을 임베딩해
+           후보 화자와 다시 비교합니다. 이미 전체 구간을 임베딩한 짧은 문장은 다시 계산하지 않습니다.
+        결과에는 최종 점수를 낸 단계('stage': 1 또는 2)가 붙습니다. search 옵션은 사용하지 않습니다.
+        on_progress 는 _cluster_results 와 같이 배치마다 처리한 문장 수로 호출됩니다.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Dict[str, Any]]: 문장 단위 결과와 단계별 세그먼트/비교 횟수 통계.
+        """
+        sr = audio.sample_rate
+        started = time.time()
+        records, chunks = self._result_records(audio, final_chunks)
+        n_refs = matrix.embeddings.size(0)
+        k = min(max(CASCADE_SHORTLIST, top_k, 1), len(matrix))
+        proj = projected_matrix(matrix, CASCADE_PROJ_DIM)
+        stage1 = {
+            "segments": 0, "embedded_seconds": 0.0, "projection_dim": proj.dim,
+            "projected_comparisons": 0, "shortlist_comparisons": 0,
+        }
+        stage2 = {"segments": 0, "embedded_seconds": 0.0, "comparisons": 0, "skipped_full_length": 0}
+        stage1_time = stage2_time = 0.0
+
+        def _seconds(batch: List[Dict[str, Any]], idx: List[int]) -> float:
+            total = 0
+            for i in idx:
+                s_idx, e_idx = chunk_sample_range(batch[i], audio.n_samples, sr)
+                total += e_idx - s_idx
+            return total / sr
+
+        step = batch_segments or max(1, len(chunks))
+        for s in range(0, len(chunks), step):
+            if on_progress is not None:
+                on_progress(s)
+            batch = chunks[s: s + step]
+            t0 = time.time()
+            cropped = [crop_chunk(c, CASCADE_CROP_SEC, audio.n_samples, sr) for c in batch]
+            crops = [c for c, _ in cropped]
+            is_full = [full for _, full in cropped]
+            idx1, embs1 = self.extract_chunk_embeddings(
+                audio, crops, sr, embed_fn=embed_fn, audio_hash=audio_hash, trace=trace
+            )
+            if not idx1:
+                stage1_time += time.time() - t0
+                continue
+            with span(trace, "scoring"):
+                shortlist = shortlist_speakers(embs1, matrix, proj, aggregate, k)
+                top_scores, top_idx, n_cmp = score_shortlist(embs1, matrix, shortlist, aggregate)
+                margin = confidence_margin(top_scores, threshold)
+            stage1["segments"] += len(idx1)
+            stage1["embedded_seconds"] += _seconds(crops, idx1)
+            stage1["projected_comparisons"] += len(idx1) * n_refs
+            stage1["shortlist_comparisons"] += n_cmp
+            t1 = time.time()
+            stage1_time += t1 - t0
+
+            ambiguous = [j for j, m in enumerate(margin.tolist()) if m < CASCADE_MARGIN]
+            stage2["skipped_full_length"] += sum(1 for j in ambiguous if is_full[idx1[j]])
+            ambiguous = [j for j in ambiguous if not is_full[idx1[j]]]
+            rescored: List[int] = []
+            if ambiguous:
+                idx2, embs2 = self.extract_chunk_embeddings(
+                    audio, [batch[idx1[j]] for j in ambiguous], sr, embed_fn=embed_fn, audio_hash=audio_hash,
+                    trace=trace
+                )
+                if idx2:
+                    rescored = [ambiguous[i] for i in idx2]
+                    with span(trace, "scoring"):
+                        scores2, top2, n_cmp2 = score_shortlist(embs2, matrix, shortlist[rescored], aggregate)
+                    top_scores[rescored] = scores2
+                    top_idx[rescored] = top2
+                    stage2["segments"] += len(rescored)
+                    stage2["embedded_seconds"] += _seconds(batch, [idx1[j] for j in rescored])
+                    stage2["comparisons"] += n_cmp2
+            stage2_time += time.time() - t1
+
+            rescored_set = set(rescored)
+            for j, (i, scored) in enumerate(zip(idx1, assign_speakers(top_scores, top_idx, matrix, threshold, top_k))):
+                records[s + i].update(scored)
+                records[s + i]["stage"] = 2 if j in rescored_set else 1
+
+        if on_progress is not None:
+            on_progress(len(chunks))
+        stage1["embedded_seconds"] = round(stage1["embedded_seconds"], 3)
+        stage2["embedded_seconds"] = round(stage2["embedded_seconds"], 3)
+        stats = cascade_stats(n_refs, stage1, stage2)
+        stats.update(stage1_time=round(stage1_time, 4), stage2_time=round(stage2_time, 4))
+        if trace is not None:
+            trace.count("cascade_rescored", stage2["segments"])
+        if METRICS_ENABLED:
+            CASCADE_SEGMENTS_TOTAL.inc(stage1["segments"], stage="1")
+            CASCADE_SEGMENTS_TOTAL.inc(stage2["segments"], stage="2")
+            CASCADE_COMPARISONS_TOTAL.inc(stage1["projected_comparisons"], stage="1_projected")
+            CASCADE_COMPARISONS_TOTAL.inc(stage1["shortlist_comparisons"], stage="1_shortlist")
+            CASCADE_COMPARISONS_TOTAL.inc(stage2["comparisons"], stage="2")
+
+        if CASCADE_REPORT_BASELINE and stage1["segments"]:
+            # 비교용: 모든 문장을 전체 구간으로 임베딩해 모든 기준 임베딩과 비교하는 기존 경로의 시간과 일치율
+            baseline_started = time.time()
+            idx_full, embs_full = self.extract_chunk_embeddings(audio, chunks, sr, embed_fn=embed_fn)
+            baseline = score_segments(embs_full, matrix, threshold, aggregate=aggregate) if idx_full else []
+            stats["per_segment_time"] = round(time.time() - baseline_started, 4)
+            stats["cascade_time"] = round(baseline_started - started, 4)
+            pairs = [(records[i], b) for i, b in zip(idx_full, baseline)]
+            stats["per_segment_agreement"] = round(
+                sum(r["speaker"] == b["speaker"] for r, b in pairs) / len(pairs), 4
+            ) if pairs else None
+            stats["mean_abs_score_diff"] = round(
+                sum(abs(r["score"] - b["score"]) for r, b in pairs) / len(pairs), 4
+            ) if pairs else None
+        return records, stats
+
+    def score_chunks(
+        self,
+        audio: AudioSource,
+        chunks: List[Dict[str, Any]],
+        matrix: EnrollmentMatrix,
+        threshold: float = 0.1,
+        aggregate: str = "max",
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]] = None,
+        top_k: int = 0,
+        search: str = "exact",
+    ) -> List[Dict[str, Any]]:
+        """이미 확정된 문장 청크들만 점수를 매깁니다 (실시간 WebSocket 경로에서 사용, 호출마다 요청 1건으로 집계)."""
+        trace = RequestTrace("ws")
+        _count_matrix(trace, matrix)
+        results = list(self._iter_results(
+            audio, chunks, matrix, threshold, aggregate, embed_fn, top_k=top_k, search=search, trace=trace
+        ))
+        trace.finish(results)
+        return results
+
     def identify_speaker(
         self, 
-        full_audio_path: str, 
+        full_audio: Union[str, torch.Tensor], 
         whisper_data: Union[Dict, List[Dict]], 
         speakers_root: str, 
-        threshold: float = 0.1
+        threshold: float = 0.1,
+        aggregate: str = "max",
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]] = None,
+        top_k: int = 0,
+        search: str = "exact",
+        audio_hash: Optional[str] = None,
+        mode: str = "segment",
+        debug: bool = False,
+        vad: Optional[VADConfig] = None,
+        split: bool = False
     ) -> Dict:
+        """녹음 전체의 문장별 화자를 식별합니다.
+
+        debug=True 이면 단계별 소요 시간/카운트를 'debug' 로, vad 가 주어지면 문장마다 비음성 구간을 잘라 임베딩하고
+        절약한 길이를 'vad' 로 함께 반환합니다. split=True 이면 긴 문장 안의 화자 전환 지점에서 문장을 나누고
+        윈도/분할 통계를 'speaker_change' 로 반환합니다.
+        """
+        _check_options(aggregate, search, mode)
         start_time = time.time()
-        # 1. 원본 오디오 로드 및 전처리
-        wav, sr = torchaudio.load(full_audio_path)
-        wav = self.ensure_mono_16k(wav, sr)
-        sr = 16000
-        n_samples = wav.size(1)
-
-        # 2. 기준 화자(Enrollment) 파일 목록 확보 및 전처리 (16k mono WAV로 변환)
-        speakers_path = Path(speakers_root)
-        enroll_data = {}
-        temp_enroll_dir = Path(f"/tmp/enroll_{int(time.time())}")
-        temp_enroll_dir.mkdir(parents=True, exist_ok=True)
-        
+        trace = RequestTrace("recognize", mode, debug)
         try:
-            if speakers_path.exists():
-                # speakers_root 아래의 각 디렉토리를 화자로 간주
-                for spk_dir in sorted([p for p in speakers_path.iterdir() if p.is_dir()]):
-                    spk_name = spk_dir.name
-                    refs = []
-                    for ext in [".wav", ".flac", ".m4a", ".mp3", ".WAV", ".FLAC", ".M4A", ".MP3"]:
-                        for f in spk_dir.glob(f"*{ext}"):
-                            try:
-                                # 16k mono WAV로 변환하여 임시 저장
-                                wav_enroll, sr_enroll = torchaudio.load(str(f))
-                                wav_enroll = self.ensure_mono_16k(wav_enroll, sr_enroll)
-                                tmp_f = temp_enroll_dir / f"{spk_name}_{f.stem}.wav"
-                                torchaudio.save(str(tmp_f), wav_enroll, 16000)
-                                refs.append(tmp_f)
-                            except Exception as e:
-                                logger.error(f"Failed to process enrollment file {f}: {e}")
-                    
-                    if refs:
-                        enroll_data[spk_name] = refs
-
-                # speakers_root 자체에 오디오 파일이 있는 경우 (화자 이름은 파일명)
-                for ext in [".wav", ".flac", ".m4a", ".mp3", ".WAV", ".FLAC", ".M4A", ".MP3"]:
-                    for f in speakers_path.glob(f"*{ext}"):
-                        if f.stem not in enroll_data:
-                            try:
-                                wav_enroll, sr_enroll = torchaudio.load(str(f))
-                                wav_enroll = self.ensure_mono_16k(wav_enroll, sr_enroll)
-                                tmp_f = temp_enroll_dir / f"direct_{f.stem}.wav"
-                                torchaudio.save(str(tmp_f), wav_enroll, 16000)
-                                enroll_data[f.stem] = [tmp_f]
-                            except Exception as e:
-                                logger.error(f"Failed to process direct enrollment file {f}: {e}")
-
-            if not enroll_data:
-                logger.error(f"No speaker enrollment files found in {speakers_root}")
-                raise RuntimeError(f"No speaker enrollment files found in {speakers_root}")
-
-            logger.info(f"Loaded {len(enroll_data)} speakers for identification")
-
-            # 3. 각 청크별 화자 비교 (refine_whisper_json 유틸 사용)
-            results = []
-            temp_seg_path = f"/tmp/seg_{int(time.time())}.wav"
-
-            # 외부 유틸리티를 사용하여 문장 단위로 재구성
-            final_chunks = refine_whisper_json(whisper_data)
-
-            # 확정된 문장 단위 청크들에 대해 화자 식별 수행
-            for chunk in final_chunks:
-                start, end = chunk["start"], chunk["end"]
-                
-                # [추가] 0.5초 이하의 매우 짧은 구간은 식별 과정을 건너뜁니다.
-                if chunk.get("speaker") == "very_short":
-                    results.append({
-                        "start": round(start, 3),
-                        "end": round(end, 3),
-                        "text": chunk["text"],
-                        "speaker": "very_short",
-                        "score": 0.0
-                    })
-                    continue
-                
-                # 청크 잘라내기
-                s_idx = max(0, int(round(start * sr)))
-                e_idx = min(n_samples, int(round(end * sr)))
-                
-                if e_idx <= s_idx:
-                    continue
-                    
-                seg_wav = wav[:, s_idx:e_idx]
-                torchaudio.save(temp_seg_path, seg_wav, sr)
-                
-                best_spk = "unknown"
-                best_score = -1.0
-                
-                for spk_name, refs in enroll_data.items():
-                    spk_best = -1.0
-                    for ref_path in refs:
-                        try:
-                            r = self.sv_pipeline([temp_seg_path, str(ref_path)])
-                            score = self.extract_score(r)
-                            if score > spk_best:
-                                spk_best = score
-                        except Exception as e:
-                            # 예외 발생 시 로거를 사용하여 기록 [[memory:6804125]]
-                            logger.error(f"Error comparing {temp_seg_path} with {ref_path}: {e}")
-                    
-                    if spk_best > best_score:
-                        best_score = spk_best
-                        best_spk = spk_name
-                
-                assigned = best_spk if best_score >= threshold else "unknown"
-                results.append({
-                    "start": round(start, 3),
-                    "end": round(end, 3),
-                    "text": chunk["text"],
-                    "speaker": assigned,
-                    "score": round(float(best_score), 4) if best_score != -1.0 else 0.0
-                })
-        finally:
-            # 임시 파일 및 폴더 정리
-            if temp_enroll_dir.exists():
-                shutil.rmtree(temp_enroll_dir)
-            if 'temp_seg_path' in locals() and os.path.exists(temp_seg_path):
-                os.remove(temp_seg_path)
-
-        end_time = time.time()
-        return {
+            response = self._identify(
+                full_audio, whisper_data, speakers_root, threshold, aggregate, embed_fn, top_k, search, audio_hash,
+                mode, trace, vad, split
+            )
+        except Exception:
+            trace.finish(status="error")
+            raise
+        trace.finish(response["results"])
+        response["processing_time"] = f"{round(time.time() - start_time, 2)}s"
+        if debug:
+            response["debug"] = trace.breakdown()
+        return response
+
+    def _identify(
+        self,
+        full_audio: Union[str, torch.Tensor],
+        whisper_data: Union[Dict, List[Dict]],
+        speakers_root: str,
+        threshold: float,
+        aggregate: str,
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]],
+        top_k: int,
+        search: str,
+        audio_hash: Optional[str],
+        mode: str,
+        trace: RequestTrace,
+        vad: Optional[VADConfig] = None,
+        split: bool = False,
+    ) -> Dict:
+        # 1. 원본 오디오 로드 및 전처리 (이미 디코딩된 16k mono 파형이면 그대로 사용)
+        decode_info = None
+        if isinstance(full_audio, torch.Tensor):
+            wav = self.ensure_mono_16k(full_audio, 16000)
+        else:
+            with trace.span("decode"):
+                wav, decode_info = load_audio(full_audio)
+
+        # 2. 기준 화자 임베딩 행렬
+        with trace.span("enrollment"):
+            matrix = self.load_matrix(speakers_root)
+        _count_matrix(trace, matrix)
+
+        # 3. 외부 유틸리티를 사용하여 문장 단위로 재구성한 뒤, 청크 임베딩을 한 번에 배치 추출/점수 계산
+        with trace.span("refine"):
+            final_chunks = refine_whisper_json(whisper_data, keep_words=split)
+        audio = TensorAudio(wav)
+        trace.audio_seconds = audio.duration
+        change_stats = None
+        if split:
+            # 두 사람이 이어서/겹쳐 말한 긴 문장은 화자가 바뀌는 단어 경계에서 나눈 뒤 조각별로 채점합니다.
+            final_chunks, change_stats = self.split_speaker_changes(
+                audio, final_chunks, matrix, threshold, aggregate, embed_fn, audio_hash, trace
+            )
+        raw_chunks, vad_stats = final_chunks, None
+        if vad is not None:
+            with trace.span("vad"):
+                final_chunks, vad_stats = apply_vad(audio, final_chunks, vad)
+        cluster_stats = cascade = None
+        if mode == "cluster":
+            # 화자 수가 적은 회의에서는 세그먼트를 먼저 군집화하여 기준 화자 비교 횟수를 줄입니다.
+            results, cluster_stats = self._cluster_results(
+                audio, final_chunks, matrix, threshold, aggregate, embed_fn,
+                top_k=top_k, search=search, audio_hash=audio_hash, trace=trace
+            )
+        elif mode == "cascade":
+            # 대부분의 문장은 짧은 구간만으로 화자가 분명하므로, 애매한 문장만 전체 구간으로 다시 채점합니다.
+            results, cascade = self._cascade_results(
+                audio, final_chunks, matrix, threshold, aggregate, embed_fn,
+                top_k=top_k, audio_hash=audio_hash, trace=trace
+            )
+        else:
+            results = list(self._iter_results(
+                audio, final_chunks, matrix, threshold, aggregate, embed_fn, top_k=top_k, search=search,
+                audio_hash=audio_hash, score_table=self._score_table(audio_hash, matrix, aggregate, search, vad),
+                trace=trace
+            ))
+
+        response = {
             "status": "success",
-            "processing_time": f"{round(end_time - start_time, 2)}s",
+            "processing_time": None,
             "results": results
         }
+        if decode_info is not None:
+            response["audio"] = decode_info
+        if cluster_stats is not None:
+            response["clustering"] = cluster_stats
+        if cascade is not None:
+            response["cascade"] = cascade
+        if change_stats is not None:
+            response["speaker_change"] = change_stats
+        if vad_stats is not None:
+            response["vad"] = vad_stats
+        if audio_hash is not None:
+            response["job_id"] = self.segment_cache.new_job(audio_hash, audio.n_samples, raw_chunks)
+            self._remember_vad(response["job_id"], vad, final_chunks, vad_stats)
+            response["audio_hash"] = audio_hash
+        return response
+
+    def _remember_vad(
+        self, job_id: str, vad: Optional[VADConfig], chunks: List[Dict[str, Any]], stats: Optional[Dict[str, Any]]
+    ) -> None:
+        """재채점 작업에 VAD 결과를 보관해, 같은 설정으로 재채점할 때 오디오 없이 재사용합니다."""
+        job = self.segment_cache.get_job(job_id)
+        if job is not None and vad is not None:
+            job.setdefault("vad", {})[vad.key] = (chunks, stats)
+
+    def _score_table(
+        self,
+        audio_hash: Optional[str],
+        matrix: EnrollmentMatrix,
+        aggregate: str,
+        search: str,
+        vad: Optional[VADConfig] = None,
+    ) -> Optional[ScoreTable]:
+        if audio_hash is None or not self.segment_cache.enabled:
+            return None
+        # mask 모드는 같은 구간이라도 사용한 프레임이 다르므로 VAD 설정별로 점수 테이블을 나눕니다.
+        vad_key = f"|{vad.key}" if vad is not None and vad.mode == "mask" else ""
+        return self.segment_cache.score_table(audio_hash, f"{matrix.key}|{aggregate}|{search}{vad_key}")
+
+    def rescore(
+        self,
+        speakers_root: str,
+        job_id: Optional[str] = None,
+        audio_hash: Optional[str] = None,
+        whisper_data: Optional[Union[Dict, List[Dict]]] = None,
+        threshold: float = 0.1,
+        aggregate: str = "max",
+        top_k: int = 0,
+        search: str = "exact",
+        audio_loader: Optional[Callable[[], torch.Tensor]] = None,
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]] = None,
+        debug: bool = False,
+        vad: Optional[VADConfig] = None,
+    ) -> Dict:
+        """이전 요청의 세그먼트 임베딩/점수 캐시로 결과를 다시 계산합니다.
+
+        Args:
+            job_id: /v1/recognize 응답의 job_id. 주어지면 그 요청의 오디오와 문장 청크를 사용합니다.
+            audio_hash: job_id 대신 오디오 내용 해시로 지정 (이 경우 whisper_data 필요).
+            whisper_data: 경계가 바뀐 새 Whisper 결과. 캐시에 없는 구간만 새로 임베딩합니다.
+            audio_loader: 캐시에 없는 구간이 있을 때 원본 16k mono 파형 [1, T] 을 돌려주는 함수.
+            debug: True 이면 단계별 소요 시간/카운트를 'debug' 로 함께 반환합니다.
+            vad: 비음성 구간을 잘라 채점할 VAD 설정. 원래 요청과 같은 설정이면 보관된 VAD 결과를 재사용하고,
+                아니면 오디오가 필요합니다.
+
+        Raises:
+            KeyError: job_id 를 찾을 수 없을 때.
+            AudioUnavailable: 새로 계산할 구간이 있지만 audio_loader 가 없을 때.
+        """
+        _check_options(aggregate, search)
+        start_time = time.time()
+        trace = RequestTrace("rescore", debug=debug)
+        try:
+            response = self._rescore(
+                speakers_root, job_id, audio_hash, whisper_data, threshold, aggregate, top_k, search,
+                audio_loader, embed_fn, trace, vad
+            )
+        except Exception:
+            trace.finish(status="error")
+            raise
+        trace.finish(response["results"])
+        response["processing_time"] = f"{round(time.time() - start_time, 4)}s"
+        if debug:
+            response["debug"] = trace.breakdown()
+        return response
+
+    def _rescore(
+        self,
+        speakers_root: str,
+        job_id: Optional[str],
+        audio_hash: Optional[str],
+        whisper_data: Optional[Union[Dict, List[Dict]]],
+        threshold: float,
+        aggregate: str,
+        top_k: int,
+        search: str,
+        audio_loader: Optional[Callable[[], torch.Tensor]],
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]],
+        trace: RequestTrace,
+        vad: Optional[VADConfig] = None,
+    ) -> Dict:
+        job = None
+        if job_id:
+            job = self.segment_cache.get_job(job_id)
+            if job is None:
+                raise KeyError(f"Job '{job_id}' not found or expired")
+            if audio_hash and audio_hash != job["audio_hash"]:
+                raise ValueError("audio_hash does not match the job's audio")
+            audio_hash = job["audio_hash"]
+        if not audio_hash:
+            raise ValueError("Either job_id or audio_hash is required")
+
+        if whisper_data is not None:
+            with trace.span("refine"):
+                final_chunks = refine_whisper_json(whisper_data)
+        elif job is not None:
+            final_chunks = job["chunks"]
+        else:
+            raise ValueError("whisper_json is required when rescoring by audio_hash")
+
+        # 오디오는 캐시에 없는 구간을 계산해야 할 때만 디코딩합니다.
+        n_samples = job["n_samples"] if job is not None else self.segment_cache.n_samples(audio_hash)
+        if n_samples is not None:
+            audio: AudioSource = LazyAudio(n_samples, audio_loader)
+        elif audio_loader is not None:
+            with trace.span("decode"):
+                audio = TensorAudio(audio_loader())
+        else:
+            raise AudioUnavailable(f"Audio '{audio_hash}' is not cached; resend the audio file")
+
+        raw_chunks, vad_stats = final_chunks, None
+        if vad is not None:
+            remembered = job.get("vad", {}).get(vad.key) if job is not None and whisper_data is None else None
+            if remembered is not None:
+                final_chunks, vad_stats = remembered
+            else:
+                with trace.span("vad"):
+                    final_chunks, vad_stats = apply_vad(audio, final_chunks, vad)
+
+        with trace.span("enrollment"):
+            matrix = self.load_matrix(speakers_root)
+        _count_matrix(trace, matrix)
+        results = list(self._iter_results(
+            audio, final_chunks, matrix, threshold, aggregate, embed_fn, top_k=top_k, search=search,
+            audio_hash=audio_hash, score_table=self._score_table(audio_hash, matrix, aggregate, search, vad),
+            trace=trace
+        ))
+        if whisper_data is not None:
+            job_id = self.segment_cache.new_job(audio_hash, audio.n_samples, raw_chunks)
+        self._remember_vad(job_id, vad, final_chunks, vad_stats)
+        response = {
+            "status": "success",
+            "processing_time": None,
+            "job_id": job_id,
+            "audio_hash": audio_hash,
+            "audio_decoded": not isinstance(audio, LazyAudio) or audio.loaded,
+            "results": results
+        }
+        if vad_stats is not None:
+            response["vad"] = vad_stats
+        return response
+
+    def identify_speaker_stream(
+        self,
+        audio: AudioSource,
+        whisper_data: Union[Dict, List[Dict]],
+        speakers_root: str,
+        threshold: float = 0.1,
+        aggregate: str = "max",
+        embed_fn: Optional[Callable[[List[torch.Tensor]], torch.Tensor]] = None,
+        batch_segments: int = STREAM_BATCH_SEGMENTS,
+        top_k: int = 0,
+        search: str = "exact",
+        audio_hash: Optional[str] = None,
+        mode: str = "segment",
+        debug: bool = False,
+        on_total: Optional[Callable[[int], None]] = None,
+        vad: Optional[VADConfig] = None,
+        split: bool = False,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """녹음 전체를 메모리에 올리지 않고 필요한 구간만 읽어 결과를 순서대로 내보냅니다.
+
+        Args:
+            audio: 구간 단위로 읽을 수 있는 오디오 (decode_to_pcm_file 의 PcmFile 등).
+            batch_segments: 한 번에 임베딩할 세그먼트 수 (메모리 상한을 결정).
+            debug: True 이면 마지막 요약에 단계별 소요 시간/카운트를 'debug' 로 함께 내보냅니다.
+            on_total: 문장 정제 후 전체 문장 수로 한 번 호출됩니다 (비동기 작업의 진행률 표시용).
+            vad: 비음성 구간을 잘라 임베딩할 VAD 설정 (에너지는 PCM 캐시를 블록 단위로 읽어 계산).
+            split: True 이면 긴 문장 안의 화자 전환 지점에서 문장을 나눕니다 (split_speaker_changes).
+            on_progress: mode=cluster/cascade 에서 임베딩 배치마다 처리한 문장 수로 호출됩니다 (비동기 작업의 진행률/취소 확인용).
+                예외를 올리면 처리를 중단하고 그 예외를 그대로 전달합니다.
+
+        Yields:
+            Dict[str, Any]: 문장 단위 결과. 마지막에는 status/processing_time/count 요약을 내보냅니다.
+        """
+        _check_options(aggregate, search, mode)
+        start_time = time.time()
+        trace = RequestTrace("recognize_stream", mode, debug)
+        trace.audio_seconds = audio.duration
+        # 결과 카운터용으로 화자 필드만 모읍니다 (결과 전체를 보관하지 않음).
+        speakers: List[Dict[str, Any]] = []
+        try:
+            with trace.span("enrollment"):
+                matrix = self.load_matrix(speakers_root)
+            _count_matrix(trace, matrix)
+            with trace.span("refine"):
+                final_chunks = sorted(
+                    refine_whisper_json(whisper_data, keep_words=split), key=lambda c: (c["start"], c["end"])
+                )
+            change_stats = None
+            if split:
+                final_chunks, change_stats = self.split_speaker_changes(
+                    audio, final_chunks, matrix, threshold, aggregate, embed_fn, audio_hash, trace
+                )
+            if on_total is not None:
+                on_total(len(final_chunks))
+            raw_chunks, vad_stats = final_chunks, None
+            if vad is not None:
+                with trace.span("vad"):
+                    final_chunks, vad_stats = apply_vad(audio, final_chunks, vad)
+
+            cluster_stats = cascade = None
+            if mode == "cluster":
+                # 군집화에는 녹음 전체의 임베딩이 필요하므로 결과는 임베딩 추출이 끝난 뒤 한꺼번에 내보냅니다.
+                records, cluster_stats = self._cluster_results(
+                    audio, final_chunks, matrix, threshold, aggregate, embed_fn,
+                    batch_segments=max(1, batch_segments), top_k=top_k, search=search, audio_hash=audio_hash,
+                    trace=trace, on_progress=on_progress
+                )
+            elif mode == "cascade":
+                records, cascade = self._cascade_results(
+                    audio, final_chunks, matrix, threshold, aggregate, embed_fn,
+                    batch_segments=max(1, batch_segments), top_k=top_k, audio_hash=audio_hash, trace=trace,
+                    on_progress=on_progress
+                )
+            else:
+                records = self._iter_results(
+                    audio, final_chunks, matrix, threshold, aggregate, embed_fn,
+                    batch_segments=max(1, batch_segments), top_k=top_k, search=search,
+                    audio_hash=audio_hash, score_table=self._score_table(audio_hash, matrix, aggregate, search, vad),
+                    trace=trace
+                )
+            for res in records:
+                speakers.append({"speaker": res["speaker"]})
+                yield res
+        except Exception:
+            trace.finish(status="error")
+            raise
+        trace.finish(speakers)
+
+        summary = {
+            "status": "success",
+            "processing_time": f"{round(time.time() - start_time, 2)}s",
+            "count": len(speakers)
+        }
+        if debug:
+            summary["debug"] = trace.breakdown()
+        if cluster_stats is not None:
+            summary["clustering"] = cluster_stats
+        if cascade is not None:
+            summary["cascade"] = cascade
+        if change_stats is not None:
+            summary["speaker_change"] = change_stats
+        if vad_stats is not None:
+            summary["vad"] = vad_stats
+        if audio_hash is not None:
+            summary["job_id"] = self.segment_cache.new_job(audio_hash, audio.n_samples, raw_chunks)
+            self._remember_vad(summary["job_id"], vad, final_chunks, vad_stats)
+            summary["audio_hash"] = audio_hash
+        yield summary
 
 # 싱글톤 관리
 # 현재 파일(src/v1/main.py) 기준으로 모델 상대 경로 설정
@@ -193,10 +1179,95 @@ CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_MODEL_PATH = os.path.abspath(os.path.join(CURRENT_DIR, "..", "resoursces", "models", "iic", "speech_eres2net_base_sv_zh-cn_3dspeaker_16k"))
 
 MODEL_PATH = os.getenv("SPEAKER_MODEL_PATH", DEFAULT_MODEL_PATH)
+
+# 사내 직원 목소리 DB 경로 및 임베딩 캐시 설정
+DEFAULT_EMPLOYEE_DIR = os.path.abspath(os.path.join(CURRENT_DIR, "..", "resoursces", "employee"))
+DEFAULT_ENROLL_CACHE_DIR = os.path.abspath(os.path.join(CURRENT_DIR, "..", "resoursces", "cache"))
+ENROLL_CACHE_DIR = os.getenv("ENROLL_CACHE_DIR", DEFAULT_ENROLL_CACHE_DIR)
+ENROLL_REFRESH_INTERVAL = float(os.getenv("ENROLL_REFRESH_INTERVAL", "30"))
+
 engine = None
+scheduler = None
+job_manager = None
+_engine_lock = threading.Lock()
 
 def get_engine():
     global engine
     if engine is None:
-        engine = SpeakerEngine(MODEL_PATH)
+        with _engine_lock:
+            if engine is None:
+                started = time.time()
+                engine = SpeakerEngine(MODEL_PATH)
+                MODEL_LOAD_SECONDS.set(time.time() - started, model="eres2net")
     return engine
+
+def get_scheduler() -> Optional[InferenceScheduler]:
+    """여러 요청의 세그먼트 임베딩을 합쳐 실행하는 스케줄러 싱글톤.
+
+    배치 추출기를 사용할 수 없는 엔진이면 None 을 반환하며, 이 경우 요청별로 직접 추출합니다.
+    """
+    global scheduler
+    if scheduler is None:
+        eng = get_engine()
+        if eng.embedder is None:
+            return None
+        with _engine_lock:
+            if scheduler is None:
+                scheduler = InferenceScheduler(eng.embedder.embed)
+                scheduler.start()
+    return scheduler
+
+def _run_job(job: Job) -> Iterator[Dict[str, Any]]:
+    """비동기 작업 하나를 실행합니다: 저장된 업로드를 PCM 캐시로 디코딩한 뒤 스트리밍 경로로 문장별 결과를 내보냅니다."""
+    params = job.params
+    with open(job.audio_path, "rb") as f:
+        pcm, decode_info = decode_to_pcm_file(f, job.filename, cache_dir=os.path.dirname(job.audio_path))
+    try:
+        yield {"audio": decode_info}
+        sched = get_scheduler()
+        yield from get_engine().identify_speaker_stream(
+            pcm,
+            params["whisper_data"],
+            params["speakers_root"],
+            threshold=params["threshold"],
+            aggregate=params["aggregate"],
+            embed_fn=sched.embed if sched is not None else None,
+            top_k=params["top_k"],
+            search=params["search"],
+            audio_hash=params.get("audio_hash"),
+            mode=params["mode"],
+            on_total=lambda n: setattr(job, "total", n),
+            vad=params.get("vad"),
+            split=params.get("split", False),
+            on_progress=job.report_progress,
+        )
+    finally:
+        pcm.close()
+
+def get_job_manager() -> JobManager:
+    """긴 녹음용 비동기 작업 큐 싱글톤 (공유 엔진/스케줄러 위에서 실행)."""
+    global job_manager
+    if job_manager is None:
+        with _engine_lock:
+            if job_manager is None:
+                job_manager = JobManager(_run_job)
+                job_manager.start()
+    return job_manager
+
+def _scheduler_queue_depth() -> Dict[Tuple[str, ...], float]:
+    return {(): float(scheduler.stats()["queue_depth"])} if scheduler is not None else {}
+
+REGISTRY.register(Gauge(
+    "speaker_scheduler_queue_depth", "Embedding jobs waiting in the inference scheduler queue",
+    fn=_scheduler_queue_depth
+))
+
+def _job_counts() -> Dict[Tuple[str, ...], float]:
+    if job_manager is None:
+        return {}
+    return {(status,): float(n) for status, n in job_manager.stats()["jobs"].items()}
+
+REGISTRY.register(Gauge("speaker_jobs", "Asynchronous jobs by status", ("status",), fn=_job_counts))
+
+def get_employee_db_path() -> str:
+    return os.getenv("EMPLOYEE_DB_PATH", DEFAULT_EMPLOYEE_DIR)
@@ -0,0 +1,356 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# false 이면 단계별 지연 시간/카운터 수집을 모두 건너뜁니다 (요청별 debug 분석은 요청 시에만 측정).
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# 단계 지연 시간 히스토그램 버킷(초)
+STAGE_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _process_start_time() -> float:
+    """프로세스 시작 시각(epoch 초). /proc 를 읽을 수 없으면 이 모듈을 import 한 시각."""
+    try:
+        with open("/proc/self/stat") as f:
+            # 두 번째 필드(실행 파일 이름)에 공백이 있을 수 있으므로 마지막 ')' 뒤부터 셉니다.
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return time.time()
+
+
+# 서버 시작부터 첫 성공 요청까지의 시간(오토스케일링 반응 시간)을 재기 위한 기준 시각
+PROCESS_STARTED = _process_start_time()
+_first_success: Optional[float] = None
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """값을 직접 설정하거나, fn 이 주어지면 /metrics 조회 시점에 fn() 으로 읽습니다."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        fn: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._fn = fn
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._fn is not None:
+            try:
+                values.update(self._fn())
+            except Exception as e:
+                # [[memory:6804125]]
+                logger.error(f"Failed to collect gauge {self.name}: {e}")
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 값 -> (버킷별 개수 [len(buckets) + 1], 합계, 개수)
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._values[key] = entry
+            entry[0][idx] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        """Prometheus 텍스트 노출 형식(0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "speaker_stage_seconds", "Latency of each processing stage in seconds", ("stage",)
+))
+REQUESTS_TOTAL: Counter = REGISTRY.register(Counter(
+    "speaker_requests_total", "Identification requests by entry point, match mode and status", ("endpoint", "mode", "status")
+))
+SEGMENTS_SCORED_TOTAL: Counter = REGISTRY.register(Counter(
+    "speaker_segments_scored_total", "Segments compared against enrolled speakers"
+))
+UNKNOWN_SEGMENTS_TOTAL: Counter = REGISTRY.register(Counter(
+    "speaker_unknown_segments_total", "Scored segments below the threshold (speaker 'unknown')"
+))
+VERY_SHORT_SEGMENTS_TOTAL: Counter = REGISTRY.register(Counter(
+    "speaker_very_short_segments_total", "Segments skipped as too short to identify"
+))
+AUDIO_SECONDS_TOTAL: Counter = REGISTRY.register(Counter(
+    "speaker_audio_seconds_total", "Seconds of audio processed"
+))
+MODEL_LOAD_SECONDS: Gauge = REGISTRY.register(Gauge(
+    "speaker_model_load_seconds", "Time spent loading each model at startup", ("model",)
+))
+ENROLLED: Gauge = REGISTRY.register(Gauge(
+    "speaker_enrolled", "Enrolled speakers and reference embeddings in the last loaded matrix", ("kind",)
+))
+CASCADE_SEGMENTS_TOTAL: Counter = REGISTRY.register(Counter(
+    "speaker_cascade_segments_total", "Segments scored by each stage of mode=cascade", ("stage",)
+))
+CASCADE_COMPARISONS_TOTAL: Counter = REGISTRY.register(Counter(
+    "speaker_cascade_comparisons_total", "Enrollment embedding comparisons by cascade stage", ("stage",)
+))
+STARTUP_SECONDS: Gauge = REGISTRY.register(Gauge(
+    "speaker_startup_seconds", "Time spent on each startup component (import, model load, warm-up, enrollment)", ("component",)
+))
+
+
+def first_success_seconds() -> Optional[float]:
+    """프로세스 시작부터 첫 번째 성공 요청이 끝날 때까지의 시간(초). 아직 없으면 None."""
+    return _first_success
+
+
+def _time_to_first_success() -> Dict[LabelValues, float]:
+    return {(): _first_success} if _first_success is not None else {}
+
+
+REGISTRY.register(Gauge(
+    "speaker_time_to_first_success_seconds", "Seconds from process start to the first successful request",
+    fn=_time_to_first_success
+))
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+class RequestTrace:
+    """요청 하나의 단계별 소요 시간과 세그먼트/화자/기준 임베딩 수.
+
+    같은 단계가 여러 번 실행되면(스트리밍 배치 등) 소요 시간을 합산합니다.
+    debug 가 False 이고 METRICS_ENABLED 도 False 이면 span 은 시간을 재지 않습니다.
+    """
+
+    def __init__(self, endpoint: str, mode: str = "segment", debug: bool = False):
+        self.endpoint = endpoint
+        self.mode = mode
+        self.debug = debug
+        self.active = debug or METRICS_ENABLED
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.audio_seconds: Optional[float] = None
+
+    def span(self, stage: str) -> "_Span":
+        return _Span(self, stage) if self.active else _NULL_SPAN
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        observe_stage(stage, seconds)
+
+    def count(self, name: str, value: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def finish(self, results: Optional[List[Dict[str, Any]]] = None, status: str = "success") -> None:
+        """요청 종료 시 전체 소요 시간과 결과 카운터를 기록합니다."""
+        global _first_success
+        total = time.perf_counter() - self.started
+        if status == "success" and _first_success is None:
+            _first_success = round(time.time() - PROCESS_STARTED, 3)
+            logger.info(f"First successful request {_first_success}s after process start")
+        if results is not None:
+            very_short = sum(1 for r in results if r.get("speaker") == "very_short")
+            scored = len(results) - very_short
+            unknown = sum(1 for r in results if r.get("speaker") == "unknown")
+            self.counts.update(segments=len(results), scored=scored, unknown=unknown, very_short=very_short)
+        if METRICS_ENABLED:
+            STAGE_SECONDS.observe(total, stage="total")
+            REQUESTS_TOTAL.inc(endpoint=self.endpoint, mode=self.mode, status=status)
+            if results is not None:
+                SEGMENTS_SCORED_TOTAL.inc(self.counts["scored"])
+                UNKNOWN_SEGMENTS_TOTAL.inc(self.counts["unknown"])
+                VERY_SHORT_SEGMENTS_TOTAL.inc(self.counts["very_short"])
+            if self.audio_seconds is not None:
+                AUDIO_SECONDS_TOTAL.inc(self.audio_seconds)
+            if "speakers" in self.counts:
+                ENROLLED.set(self.counts["speakers"], kind="speakers")
+                ENROLLED.set(self.counts["refs"], kind="refs")
+        self.stages["total"] = total
+
+    def breakdown(self) -> Dict[str, Any]:
+        """응답에 붙일 단계별 소요 시간(ms)과 카운트."""
+        out: Dict[str, Any] = {
+            "stages_ms": {k: round(v * 1000, 2) for k, v in self.stages.items()},
+            "counts": dict(self.counts),
+        }
+        if self.audio_seconds is not None:
+            out["audio_seconds"] = round(self.audio_seconds, 3)
+        return out
+
+
+class _Span:
+    __slots__ = ("trace", "stage", "started")
+
+    def __init__(self, trace: RequestTrace, stage: str):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self) -> "_Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.trace.add(self.stage, time.perf_counter() - self.started)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(trace: Optional[RequestTrace], stage: str):
+    """trace 가 있으면 요청 단계로, 없으면 전역 히스토그램에만 기록하는 시간 측정 컨텍스트."""
+    if trace is not None:
+        return trace.span(stage)
+    if not METRICS_ENABLED:
+        return _NULL_SPAN
+    return _GlobalSpan(stage)
+
+
+class _GlobalSpan:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "_GlobalSpan":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, stage=self.stage)
+
+
+def render() -> str:
+    return REGISTRY.render()
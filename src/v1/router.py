@@ -1,76 +1,586 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import asyncio
 import json
+import logging
 import os
-import uuid
-import shutil
-from .main import get_engine
-from .utils.json_paser import refine_whisper_json
+import time
+from .audio import AudioUnavailable, RollingAudioBuffer, decode_stream, decode_to_pcm_file, stream_sha1
+from .main import get_engine, get_scheduler, get_employee_db_path, get_job_manager
+from .jobs import PRIORITIES, JobQueueFull, save_upload
+from .metrics import observe_stage
+from .scheduler import SchedulerFull
+from .scoring import AGGREGATIONS, SEARCH_MODES
+from .clustering import MATCH_MODES
+from .utils.json_paser import IncrementalRefiner, refine_whisper_json
+from .vad import VADConfig, vad_config
+
+logger = logging.getLogger(__name__)
+
+# 실시간 WebSocket 설정
+WS_MAX_PENDING = int(os.getenv("WS_MAX_PENDING", "16"))
+WS_LATENCY_TARGET_MS = float(os.getenv("WS_LATENCY_TARGET_MS", "1500"))
+WS_AUDIO_WAIT_SEC = float(os.getenv("WS_AUDIO_WAIT_SEC", "5"))
+WS_MAX_BUFFER_SEC = float(os.getenv("WS_MAX_BUFFER_SEC", "600"))
 
 router_v1 = APIRouter(prefix="/v1", tags=["speaker"])
 
-# 사내 직원 목소리 DB 경로 설정
-CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
-DEFAULT_EMPLOYEE_DIR = os.path.abspath(os.path.join(CURRENT_DIR, "..", "resoursces", "employee"))
+def parse_whisper_json(content: bytes):
+    """업로드된 Whisper JSON 바이트를 메모리에서 파싱하고 형식을 검증합니다."""
+    try:
+        whisper_data = json.loads(content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid Whisper JSON: {e}")
+
+    # chunks(Whisper) 또는 segments(WhisperX) 키가 있는지 확인
+    if isinstance(whisper_data, dict):
+        valid_data = whisper_data.get("chunks") or whisper_data.get("segments")
+        if valid_data is None:
+            raise HTTPException(status_code=400, detail="No 'chunks' or 'segments' found in Whisper JSON")
+    elif not isinstance(whisper_data, list):
+        raise HTTPException(status_code=400, detail="Invalid Whisper JSON format")
+    return whisper_data
 
 @router_v1.post("/recognize")
 async def recognize_speaker(
     audio: UploadFile = File(..., description="화자를 식별할 원본 음성 파일 (wav, mp3, m4a)"),
     whisper_json: UploadFile = File(..., description="Whisper STT 결과 JSON 파일 (chunks 포함)"),
-    threshold: float = Form(0.2, description="화자 일치 여부를 판단할 임계값 (보통 0.25~0.35 권장). 이 점수보다 낮으면 'unknown'으로 분류됩니다.")
+    threshold: float = Form(0.2, description="화자 일치 여부를 판단할 임계값 (보통 0.25~0.35 권장). 이 점수보다 낮으면 'unknown'으로 분류됩니다."),
+    aggregate: str = Form("max", description="화자별 기준 음성 점수 집계 방식 (max 또는 mean)"),
+    stream: bool = Form(False, description="True 이면 녹음을 메모리 매핑된 PCM 캐시에서 구간 단위로 읽고, 결과를 NDJSON 으로 한 줄씩 스트리밍합니다 (긴 녹음용)."),
+    top_k: int = Form(0, description="0 보다 크면 문장마다 상위 k 명의 후보 화자와 점수를 'candidates' 로 함께 반환합니다."),
+    search: str = Form("exact", description="화자 검색 방식: exact (전체 비교) 또는 ivf (대규모 직원 DB 용 근사 top-k 검색, aggregate=max 에서만 적용)"),
+    mode: str = Form("segment", description="segment (문장마다 기준 화자와 비교), cluster (녹음 내 세그먼트를 먼저 군집화하고 클러스터 중심만 비교) 또는 cascade (짧은 구간으로 후보를 고르고 애매한 문장만 전체 구간으로 재채점)"),
+    debug: bool = Form(False, description="True 이면 단계별 소요 시간(ms)과 세그먼트/화자/기준 임베딩 수를 'debug' 로 함께 반환합니다."),
+    vad: Optional[str] = Form(None, description="비음성 구간 처리: off, trim (문장 앞뒤 무음 제거), mask (긴 문장 내부 휴지까지 제거). 기본값은 VAD_MODE"),
+    vad_margin_db: Optional[float] = Form(None, description="잡음 바닥 대비 음성으로 볼 최소 에너지 차이(dB, 기본값 VAD_MARGIN_DB)"),
+    split_speakers: bool = Form(False, description="True 이면 긴 문장 안에서 슬라이딩 윈도로 화자 전환을 찾아 단어 경계에서 문장을 나눕니다.")
 ):
-    # 임시 파일 저장
-    temp_id = str(uuid.uuid4())
-    temp_audio = f"/tmp/{temp_id}_{audio.filename}"
-    temp_json = f"/tmp/{temp_id}_{whisper_json.filename}"
-
     try:
-        # 메인 오디오 및 JSON 저장
-        with open(temp_audio, "wb") as buffer:
-            shutil.copyfileobj(audio.file, buffer)
-        with open(temp_json, "wb") as buffer:
-            shutil.copyfileobj(whisper_json.file, buffer)
-
+        vad_cfg = vad_config(vad, vad_margin_db)
         # 사내 직원 DB 경로 사용
-        target_speakers_path = os.getenv("EMPLOYEE_DB_PATH", DEFAULT_EMPLOYEE_DIR)
+        target_speakers_path = get_employee_db_path()
         
         if not os.path.exists(target_speakers_path):
             raise HTTPException(status_code=500, detail=f"Employee DB path not found: {target_speakers_path}")
 
-        # Whisper JSON 읽기
-        with open(temp_json, "r", encoding="utf-8") as f:
-            whisper_data = json.load(f)
-            
-        # chunks(Whisper) 또는 segments(WhisperX) 키가 있는지 확인
-        if isinstance(whisper_data, dict):
-            valid_data = whisper_data.get("chunks") or whisper_data.get("segments")
-            if valid_data is None:
-                raise HTTPException(status_code=400, detail="No 'chunks' or 'segments' found in Whisper JSON")
-        elif not isinstance(whisper_data, list):
-            raise HTTPException(status_code=400, detail="Invalid Whisper JSON format")
+        # Whisper JSON 은 임시 파일 없이 메모리에서 파싱
+        whisper_data = parse_whisper_json(await whisper_json.read())
+
+        # 같은 녹음을 다시 보낼 때 세그먼트 캐시를 재사용하도록 업로드 내용 해시를 계산합니다.
+        audio_hash = await run_in_threadpool(stream_sha1, audio.file)
+
+        if stream:
+            return await _recognize_stream(
+                audio, whisper_data, target_speakers_path, threshold, aggregate, top_k, search, audio_hash, mode, debug,
+                vad_cfg, split_speakers
+            )
+
+        # 업로드 스트림을 바로 16k mono float32 로 디코딩 (이벤트 루프 밖에서 수행)
+        wav, decode_info = await run_in_threadpool(decode_stream, audio.file, audio.filename)
+        observe_stage("decode", decode_info["decode_time"])
 
         # 화자 인식 실행 (whisper_data 전체를 전달)
-        engine = get_engine()
-        result = engine.identify_speaker(
-            temp_audio, 
+        # 모델 연산은 스레드 풀에서 실행하고, 세그먼트 임베딩은 스케줄러가 다른 요청과 합쳐 배치로 처리합니다.
+        engine = await run_in_threadpool(get_engine)
+        scheduler = await run_in_threadpool(get_scheduler)
+        result = await run_in_threadpool(
+            engine.identify_speaker,
+            wav, 
             whisper_data, 
             target_speakers_path, 
-            threshold=threshold
+            threshold=threshold,
+            aggregate=aggregate,
+            embed_fn=scheduler.embed if scheduler is not None else None,
+            top_k=top_k,
+            search=search,
+            audio_hash=audio_hash,
+            mode=mode,
+            debug=debug,
+            vad=vad_cfg,
+            split=split_speakers
         )
+        result["audio"] = decode_info
+        if debug:
+            result["debug"]["stages_ms"]["decode"] = round(decode_info["decode_time"] * 1000, 2)
 
         return result
 
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SchedulerFull as e:
+        logger.warning(f"Rejected recognize request: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
         logger.exception(f"Error in recognize_speaker: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    
+
+async def _recognize_stream(
+    audio: UploadFile, whisper_data, speakers_root: str, threshold: float, aggregate: str, top_k: int, search: str,
+    audio_hash: Optional[str] = None, mode: str = "segment", debug: bool = False, vad: Optional[VADConfig] = None,
+    split: bool = False
+):
+    """긴 녹음용 스트리밍 모드: 디코딩 결과를 디스크 PCM 캐시로 두고 결과를 NDJSON 으로 내보냅니다."""
+    pcm, decode_info = await run_in_threadpool(decode_to_pcm_file, audio.file, audio.filename)
+    observe_stage("decode", decode_info["decode_time"])
+    try:
+        engine = await run_in_threadpool(get_engine)
+        scheduler = await run_in_threadpool(get_scheduler)
+    except Exception:
+        pcm.close()
+        raise
+
+    def _lines():
+        try:
+            yield json.dumps({"audio": decode_info}, ensure_ascii=False) + "\n"
+            for record in engine.identify_speaker_stream(
+                pcm,
+                whisper_data,
+                speakers_root,
+                threshold=threshold,
+                aggregate=aggregate,
+                embed_fn=scheduler.embed if scheduler is not None else None,
+                top_k=top_k,
+                search=search,
+                audio_hash=audio_hash,
+                mode=mode,
+                debug=debug,
+                vad=vad,
+                split=split,
+            ):
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # 응답 헤더가 이미 전송되었으므로 오류도 NDJSON 한 줄로 알립니다.
+            logger.exception(f"Error in streaming recognize: {e}")
+            yield json.dumps({"status": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            pcm.close()
+
+    return StreamingResponse(iterate_in_threadpool(_lines()), media_type="application/x-ndjson")
+
+@router_v1.post("/rescore")
+async def rescore_speaker(
+    job_id: Optional[str] = Form(None, description="이전 /v1/recognize 응답의 job_id"),
+    audio_hash: Optional[str] = Form(None, description="job_id 대신 사용할 오디오 내용 해시 (whisper_json 필요)"),
+    threshold: float = Form(0.2, description="새 화자 일치 임계값"),
+    aggregate: str = Form("max", description="화자별 기준 음성 점수 집계 방식 (max 또는 mean)"),
+    top_k: int = Form(0, description="0 보다 크면 문장마다 상위 k 명의 후보 화자를 함께 반환합니다."),
+    search: str = Form("exact", description="화자 검색 방식: exact 또는 ivf"),
+    whisper_json: Optional[UploadFile] = File(None, description="경계가 바뀐 새 Whisper 결과 (없으면 이전 요청의 문장 사용)"),
+    audio: Optional[UploadFile] = File(None, description="캐시에 없는 구간을 계산할 때만 필요한 원본 음성 파일"),
+    debug: bool = Form(False, description="True 이면 단계별 소요 시간(ms)과 카운트를 'debug' 로 함께 반환합니다."),
+    vad: Optional[str] = Form(None, description="비음성 구간 처리: off, trim (문장 앞뒤 무음 제거), mask (긴 문장 내부 휴지까지 제거). 기본값은 VAD_MODE"),
+    vad_margin_db: Optional[float] = Form(None, description="잡음 바닥 대비 음성으로 볼 최소 에너지 차이(dB, 기본값 VAD_MARGIN_DB)")
+):
+    """
+    이전 요청의 세그먼트 임베딩/점수 캐시를 사용해 threshold 나 문장 경계만 바꿔 다시 채점합니다.
+    캐시에 없는 구간만 새로 임베딩하며, 모든 구간이 캐시되어 있으면 모델을 호출하지 않습니다.
+    """
+    try:
+        vad_cfg = vad_config(vad, vad_margin_db)
+        target_speakers_path = get_employee_db_path()
+        whisper_data = parse_whisper_json(await whisper_json.read()) if whisper_json is not None else None
+
+        audio_loader = None
+        if audio is not None:
+            uploaded_hash = await run_in_threadpool(stream_sha1, audio.file)
+            if audio_hash and audio_hash != uploaded_hash:
+                raise HTTPException(status_code=400, detail="Uploaded audio does not match audio_hash")
+            audio_hash = uploaded_hash
+
+            def audio_loader():
+                return decode_stream(audio.file, audio.filename)[0]
+
+        engine = await run_in_threadpool(get_engine)
+        scheduler = await run_in_threadpool(get_scheduler)
+        return await run_in_threadpool(
+            engine.rescore,
+            target_speakers_path,
+            job_id=job_id,
+            audio_hash=audio_hash,
+            whisper_data=whisper_data,
+            threshold=threshold,
+            aggregate=aggregate,
+            top_k=top_k,
+            search=search,
+            audio_loader=audio_loader,
+            embed_fn=scheduler.embed if scheduler is not None else None,
+            debug=debug,
+            vad=vad_cfg
+        )
+
+    except HTTPException:
+        raise
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]) if e.args else str(e))
+    except AudioUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SchedulerFull as e:
+        logger.warning(f"Rejected rescore request: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.exception(f"Error in rescore_speaker: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router_v1.post("/jobs", status_code=202)
+async def submit_job(
+    audio: UploadFile = File(..., description="분석할 긴 녹음 파일"),
+    whisper_json: UploadFile = File(..., description="Whisper STT 결과 JSON 파일"),
+    threshold: float = Form(0.25, description="화자 일치 임계값"),
+    aggregate: str = Form("max", description="화자별 기준 음성 점수 집계 방식 (max 또는 mean)"),
+    top_k: int = Form(0, description="0 보다 크면 문장마다 상위 k 명의 후보 화자를 함께 반환합니다."),
+    search: str = Form("exact", description="화자 검색 방식: exact 또는 ivf"),
+    mode: str = Form("segment", description="segment, cluster 또는 cascade"),
+    priority: str = Form("interactive", description="우선순위 클래스: interactive (먼저 실행) 또는 backfill"),
+    vad: Optional[str] = Form(None, description="비음성 구간 처리: off, trim (문장 앞뒤 무음 제거), mask (긴 문장 내부 휴지까지 제거). 기본값은 VAD_MODE"),
+    vad_margin_db: Optional[float] = Form(None, description="잡음 바닥 대비 음성으로 볼 최소 에너지 차이(dB, 기본값 VAD_MARGIN_DB)"),
+    split_speakers: bool = Form(False, description="True 이면 긴 문장 안에서 슬라이딩 윈도로 화자 전환을 찾아 단어 경계에서 문장을 나눕니다.")
+):
+    """
+    긴 녹음용 비동기 작업을 등록하고 job_id 를 바로 반환합니다.
+    진행률은 GET /v1/jobs/{job_id}, 부분/최종 결과는 GET /v1/jobs/{job_id}/results 로 조회합니다.
+    """
+    if aggregate not in AGGREGATIONS or search not in SEARCH_MODES or mode not in MATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"aggregate/search/mode must be one of {AGGREGATIONS}/{SEARCH_MODES}/{MATCH_MODES}")
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {tuple(PRIORITIES)}")
+    try:
+        vad_cfg = vad_config(vad, vad_margin_db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    whisper_data = parse_whisper_json(await whisper_json.read())
+    manager = await run_in_threadpool(get_job_manager)
+    # 디코딩은 작업 실행 시 워커에서 하므로 업로드 원본만 저장하고 바로 응답합니다.
+    audio_path, audio_hash = await run_in_threadpool(save_upload, audio.file, manager.directory)
+    params = {
+        "whisper_data": whisper_data,
+        "speakers_root": get_employee_db_path(),
+        "threshold": threshold,
+        "aggregate": aggregate,
+        "top_k": top_k,
+        "search": search,
+        "mode": mode,
+        "audio_hash": audio_hash,
+        "vad": vad_cfg,
+        "split": split_speakers,
+    }
+    try:
+        job = manager.submit(params, audio_path, audio.filename or "", priority)
+    except JobQueueFull as e:
+        os.remove(audio_path)
+        logger.warning(f"Rejected job: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"status": "success", "job": job.describe(), "queue_position": manager.position(job)}
+
+@router_v1.get("/jobs")
+async def list_jobs():
+    """
+    보관 중인 비동기 작업 목록과 상태별 개수를 반환합니다.
+    """
+    manager = await run_in_threadpool(get_job_manager)
+    return {"status": "success", "stats": manager.stats(), "jobs": manager.list()}
+
+@router_v1.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    작업 상태와 진행률(처리한 문장 수 / 전체 문장 수)을 반환합니다.
+    """
+    manager = await run_in_threadpool(get_job_manager)
+    try:
+        job = manager.get(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"status": "success", "job": job.describe(), "queue_position": manager.position(job)}
+
+@router_v1.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, offset: int = 0, limit: int = 0):
+    """
+    지금까지 확정된 문장 결과를 offset 부터 반환합니다 (limit 이 0 이면 전부).
+    작업이 끝나면 'summary' 에 처리 시간과 재채점용 job_id/audio_hash 가 포함됩니다.
+    """
+    manager = await run_in_threadpool(get_job_manager)
+    try:
+        job = manager.get(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    offset = max(0, offset)
+    results = job.results[offset: offset + limit] if limit > 0 else job.results[offset:]
+    return {
+        "status": "success",
+        "job": job.describe(),
+        "offset": offset,
+        "next_offset": offset + len(results),
+        "complete": job.status == "succeeded",
+        "results": results,
+        "summary": job.summary,
+    }
+
+@router_v1.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    대기/실행 중인 작업은 취소하고, 이미 끝난 작업은 결과를 삭제합니다.
+    """
+    manager = await run_in_threadpool(get_job_manager)
+    try:
+        job = manager.get(job_id)
+        if job.status in ("queued", "running"):
+            job = manager.cancel(job_id)
+            return {"status": "success", "action": "cancelled", "job": job.describe()}
+        manager.delete(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": "success", "action": "deleted", "job_id": job_id}
+
+@router_v1.get("/segment-cache/stats")
+async def segment_cache_stats():
+    """
+    세그먼트 임베딩 캐시 적중률과 보관 중인 작업 수를 반환합니다.
+    """
+    from . import main
+    if main.engine is None:
+        return {"status": "idle", "stats": None}
+    return {"status": "success", "stats": main.engine.segment_cache.stats()}
+
+@router_v1.websocket("/ws/recognize")
+async def recognize_live(websocket: WebSocket):
+    """
+    실시간 회의 화자 태깅용 WebSocket.
+
+    클라이언트 메시지:
+    - 텍스트 `{"type": "config", "threshold": 0.2, "aggregate": "max", "sample_format": "s16le"}` (선택, 첫 메시지)
+    - 바이너리: 16kHz mono PCM 프레임 (s16le 또는 f32le, 스트림 시작 시각 기준)
+    - 텍스트 `{"type": "words", "words": [...]}` / `{"type": "segment", "segment": {...}}` / `{"type": "segments", "segments": [...]}`
+    - 텍스트 `{"type": "end"}`: 남은 단어를 모두 문장으로 확정하고 종료
+
+    서버 메시지: `sentence`(화자 태깅 결과, latency_ms 포함), `backpressure`, `done`, `error`.
+    """
+    await websocket.accept()
+    config = {"threshold": 0.2, "aggregate": "max", "sample_format": "s16le", "top_k": 0}
+    try:
+        engine = await run_in_threadpool(get_engine)
+        scheduler = await run_in_threadpool(get_scheduler)
+        matrix = await run_in_threadpool(engine.load_matrix, get_employee_db_path())
+    except Exception as e:
+        logger.exception(f"Failed to prepare live recognition: {e}")
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1011)
+        return
+
+    refiner = IncrementalRefiner()
+    buffer: Optional[RollingAudioBuffer] = None
+    sentences: "asyncio.Queue" = asyncio.Queue(maxsize=WS_MAX_PENDING)
+    audio_arrived = asyncio.Event()
+    embed_fn = scheduler.embed if scheduler is not None else None
+
+    def _scorer_failure() -> RuntimeError:
+        error = None if scorer_task.cancelled() else scorer_task.exception()
+        return RuntimeError(f"Sentence scorer stopped: {error}")
+
+    async def _until_scorer_stops(aw):
+        """aw 를 기다리되, 그 전에 채점 태스크가 끝나면(실패) 취소하고 예외를 올립니다."""
+        fut = asyncio.ensure_future(aw)
+        await asyncio.wait({fut, scorer_task}, return_when=asyncio.FIRST_COMPLETED)
+        if not fut.done():
+            fut.cancel()
+            raise _scorer_failure()
+        return fut.result()
+
+    async def _enqueue(items):
+        for sent in items:
+            sent["_finalized_at"] = time.monotonic()
+            if sentences.full():
+                # 채점 속도보다 빠르게 보내고 있음을 알리고, 자리가 날 때까지 수신을 멈춥니다.
+                await websocket.send_json({"type": "backpressure", "pending": sentences.qsize()})
+            # 채점 태스크가 죽으면 큐가 비지 않으므로 무한 대기하지 않도록 함께 기다립니다.
+            await _until_scorer_stops(sentences.put(sent))
+
+    async def _scorer():
+        while True:
+            sent = await sentences.get()
+            if sent is None:
+                break
+            # 문장 끝까지의 오디오가 도착할 때까지 기다립니다 (최대 WS_AUDIO_WAIT_SEC).
+            deadline = time.monotonic() + WS_AUDIO_WAIT_SEC
+            while buffer is not None and buffer.duration < sent["end"] and time.monotonic() < deadline:
+                audio_arrived.clear()
+                try:
+                    await asyncio.wait_for(audio_arrived.wait(), timeout=max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+
+            finalized_at = sent.pop("_finalized_at")
+            try:
+                if buffer is None:
+                    record = dict(sent, speaker=sent["speaker"] if sent["speaker"] == "very_short" else "unknown", score=0.0)
+                else:
+                    scored = await run_in_threadpool(
+                        engine.score_chunks, buffer, [sent], matrix,
+                        config["threshold"], config["aggregate"], embed_fn, top_k=int(config["top_k"])
+                    )
+                    record = scored[0] if scored else dict(sent, score=0.0)
+                    # 이미 채점한 구간 이전의 오디오는 버립니다 (아직 확정되지 않은 단어 구간은 유지).
+                    keep_from = sent["end"] if refiner.pending_start is None else min(sent["end"], refiner.pending_start)
+                    buffer.trim_before(int(keep_from * buffer.sample_rate))
+            except Exception as e:
+                # 한 문장의 실패(스케줄러 포화, 디코딩 오류 등)는 알리고 다음 문장을 계속 채점합니다.
+                # [[memory:6804125]]
+                logger.error(f"Failed to score live sentence {sent['start']:.2f}-{sent['end']:.2f}s: {e}")
+                await websocket.send_json({"type": "error", "detail": str(e), "start": sent["start"], "end": sent["end"]})
+                continue
+
+            latency_ms = round((time.monotonic() - finalized_at) * 1000, 1)
+            await websocket.send_json(dict(
+                record, type="sentence", latency_ms=latency_ms, late=latency_ms > WS_LATENCY_TARGET_MS
+            ))
+
+    scorer_task = asyncio.create_task(_scorer())
+    try:
+        while True:
+            # 채점 태스크가 실패하면(클라이언트 연결 끊김 등) 다음 메시지를 기다리지 않고 종료합니다.
+            if scorer_task.done():
+                raise _scorer_failure()
+            message = await _until_scorer_stops(websocket.receive())
+            if message.get("type") == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                if buffer is None:
+                    buffer = RollingAudioBuffer(sample_format=config["sample_format"], max_seconds=WS_MAX_BUFFER_SEC)
+                buffer.append(message["bytes"])
+                audio_arrived.set()
+                continue
+
+            payload = json.loads(message.get("text") or "{}")
+            kind = payload.get("type")
+            if kind == "config":
+                for key in ("threshold", "aggregate", "sample_format", "top_k"):
+                    if key in payload:
+                        config[key] = payload[key]
+                if config["aggregate"] not in AGGREGATIONS:
+                    raise ValueError(f"aggregate must be one of {AGGREGATIONS}")
+            elif kind == "words":
+                await _enqueue(await run_in_threadpool(refiner.add_words, payload.get("words") or []))
+            elif kind == "segment":
+                await _enqueue(await run_in_threadpool(refiner.add_segment, payload.get("segment") or {}))
+            elif kind == "segments":
+                for seg in payload.get("segments") or []:
+                    await _enqueue(await run_in_threadpool(refiner.add_segment, seg))
+            elif kind == "end":
+                await _enqueue(await run_in_threadpool(refiner.flush))
+                await _until_scorer_stops(sentences.put(None))
+                await scorer_task
+                await websocket.send_json({"type": "done"})
+                await websocket.close()
+                return
+            else:
+                await websocket.send_json({"type": "error", "detail": f"Unknown message type: {kind}"})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.exception(f"Error in live recognition: {e}")
+        try:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
     finally:
-        # 임시 파일 정리
-        for p in [temp_audio, temp_json]:
-            if os.path.exists(p):
-                os.remove(p)
+        if not scorer_task.done():
+            scorer_task.cancel()
+        if buffer is not None:
+            buffer.close()
+
+async def _employee_store():
+    engine = await run_in_threadpool(get_engine)
+    return await run_in_threadpool(engine.get_enrollment_store, get_employee_db_path())
+
+@router_v1.get("/speakers")
+async def list_speakers():
+    """
+    등록된 화자 목록과 화자별 기준 음성 수, 총 등록 길이(초), 마지막 임베딩 계산 시각을 반환합니다.
+    """
+    store = await _employee_store()
+    speakers = store.speaker_stats()
+    return {"status": "success", "count": len(speakers), "speakers": speakers}
+
+@router_v1.get("/speakers/{speaker}")
+async def get_speaker(speaker: str):
+    store = await _employee_store()
+    stats = store.speaker_stats(speaker)
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"Speaker not found: {speaker}")
+    return {"status": "success", "speaker": stats}
+
+async def _enroll(speaker: str, files: List[UploadFile], replace: bool):
+    store = await _employee_store()
+    try:
+        stats = await run_in_threadpool(
+            store.enroll_speaker, speaker, [(f.filename, f.file) for f in files], replace
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception(f"Error enrolling speaker '{speaker}': {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "success", "speaker": stats}
+
+@router_v1.post("/speakers")
+async def enroll_speaker(
+    speaker: str = Form(..., description="등록할 화자 이름 (직원 DB 디렉토리명)"),
+    files: List[UploadFile] = File(..., description="기준 음성 파일 (wav, flac, m4a, mp3), 여러 개 가능")
+):
+    """
+    화자를 새로 등록하거나 기존 화자에 기준 음성을 추가합니다. 임베딩은 한 번만 계산되어 서버 재시작 없이 바로 반영됩니다.
+    """
+    return await _enroll(speaker, files, replace=False)
+
+@router_v1.put("/speakers/{speaker}")
+async def replace_speaker(
+    speaker: str,
+    files: List[UploadFile] = File(..., description="새 기준 음성 파일 (기존 파일은 모두 삭제됩니다)")
+):
+    """
+    화자의 기준 음성을 모두 새 파일로 교체합니다.
+    """
+    return await _enroll(speaker, files, replace=True)
+
+@router_v1.delete("/speakers/{speaker}")
+async def delete_speaker(speaker: str):
+    """
+    화자의 기준 음성 파일과 임베딩을 삭제합니다.
+    """
+    store = await _employee_store()
+    try:
+        removed = await run_in_threadpool(store.remove_speaker, speaker)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if removed == 0:
+        raise HTTPException(status_code=404, detail=f"Speaker not found: {speaker}")
+    return {"status": "success", "speaker": speaker, "removed_refs": removed}
+
+@router_v1.get("/scheduler/stats")
+async def scheduler_stats():
+    """
+    추론 스케줄러의 대기열 깊이, 배치 채움 비율, 대기 시간 통계를 반환합니다.
+    """
+    from . import main
+    if main.scheduler is None:
+        return {"status": "idle", "stats": None}
+    return {"status": "success", "stats": main.scheduler.stats()}
+
+@router_v1.get("/kiwi/stats")
+async def kiwi_stats():
+    """
+    Kiwi 모델 로드 시간과 형태소 분석 캐시 적중률을 반환합니다.
+    """
+    from .utils.kr_tag import kiwi_tagger
+    return {"status": "success", "stats": kiwi_tagger.stats()}
 
 @router_v1.post("/refine-json")
 async def refine_json(
@@ -83,14 +593,12 @@ async def refine_json(
         content = await whisper_json.read()
         whisper_data = json.loads(content)
         
-        refined_data = refine_whisper_json(whisper_data)
+        refined_data = await run_in_threadpool(refine_whisper_json, whisper_data)
         return {
             "status": "success",
             "count": len(refined_data),
             "results": refined_data
         }
     except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
         logger.exception(f"Error in refine_json: {e}")
         raise HTTPException(status_code=500, detail=str(e))
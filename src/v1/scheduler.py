@@ -0,0 +1,172 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHED_MAX_QUEUE = int(os.getenv("SCHED_MAX_QUEUE", "64"))
+SCHED_MAX_BATCH_ITEMS = int(os.getenv("SCHED_MAX_BATCH_ITEMS", "256"))
+SCHED_MAX_WAIT_MS = float(os.getenv("SCHED_MAX_WAIT_MS", "20"))
+
+
+class SchedulerFull(RuntimeError):
+    """스케줄러 대기열이 가득 차 요청을 받을 수 없는 경우."""
+
+
+class _Job:
+    __slots__ = ("items", "future", "enqueued_at")
+
+    def __init__(self, items: List[Any]):
+        self.items = items
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class InferenceScheduler:
+    """여러 요청의 세그먼트 임베딩 작업을 하나의 배치로 합쳐 전용 스레드에서 실행합니다.
+
+    각 요청(스레드)은 `embed(items)` 로 작업을 제출하고 결과를 기다립니다.
+    워커는 첫 작업이 도착한 뒤 `max_wait_ms` 까지 또는 `max_batch_items` 가 찰 때까지
+    다른 요청의 작업을 모아 `embed_fn` 을 한 번 호출합니다.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[Any]], Any],
+        max_queue: int = SCHED_MAX_QUEUE,
+        max_batch_items: int = SCHED_MAX_BATCH_ITEMS,
+        max_wait_ms: float = SCHED_MAX_WAIT_MS,
+    ):
+        self.embed_fn = embed_fn
+        self.max_batch_items = max(1, max_batch_items)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "jobs": 0,
+            "items": 0,
+            "batches": 0,
+            "rejected": 0,
+            "fill_ratio_sum": 0.0,
+            "wait_ms_sum": 0.0,
+            "wait_ms_max": 0.0,
+            "run_ms_sum": 0.0,
+        }
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Inference scheduler started (max_queue={self._queue.maxsize}, "
+            f"max_batch_items={self.max_batch_items}, max_wait_ms={self.max_wait * 1000:.0f})"
+        )
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, items: List[Any]) -> Future:
+        """작업을 대기열에 넣습니다. 대기열이 가득 차면 SchedulerFull 을 발생시킵니다."""
+        if self._thread is None:
+            self.start()
+        job = _Job(items)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["rejected"] += 1
+            raise SchedulerFull(f"Inference queue is full ({self._queue.maxsize} pending jobs)")
+        return job.future
+
+    def embed(self, items: List[Any]) -> Any:
+        """작업을 제출하고 결과가 나올 때까지 블로킹합니다 (워커 스레드에서 호출)."""
+        if not items:
+            return self.embed_fn(items)
+        return self.submit(items).result()
+
+    def _collect(self, first: _Job) -> List[_Job]:
+        jobs = [first]
+        n_items = len(first.items)
+        deadline = first.enqueued_at + self.max_wait
+        while n_items < self.max_batch_items:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                # 종료 신호는 현재 배치를 처리한 뒤 반영합니다.
+                self._queue.put(None)
+                break
+            jobs.append(job)
+            n_items += len(job.items)
+        return jobs
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            jobs = [j for j in self._collect(first) if j.future.set_running_or_notify_cancel()]
+            if not jobs:
+                continue
+
+            items: List[Any] = []
+            for job in jobs:
+                items.extend(job.items)
+            started = time.monotonic()
+            try:
+                out = self.embed_fn(items)
+            except Exception as e:
+                logger.error(f"Batched inference failed for {len(jobs)} jobs / {len(items)} items: {e}")
+                for job in jobs:
+                    job.future.set_exception(e)
+                continue
+            finished = time.monotonic()
+
+            offset = 0
+            for job in jobs:
+                job.future.set_result(out[offset: offset + len(job.items)])
+                offset += len(job.items)
+
+            with self._stats_lock:
+                st = self._stats
+                st["jobs"] += len(jobs)
+                st["items"] += len(items)
+                st["batches"] += 1
+                st["fill_ratio_sum"] += min(1.0, len(items) / self.max_batch_items)
+                st["run_ms_sum"] += (finished - started) * 1000
+                for job in jobs:
+                    wait_ms = (started - job.enqueued_at) * 1000
+                    st["wait_ms_sum"] += wait_ms
+                    st["wait_ms_max"] = max(st["wait_ms_max"], wait_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            st = dict(self._stats)
+        batches = st["batches"] or 1
+        jobs = st["jobs"] or 1
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "jobs": int(st["jobs"]),
+            "items": int(st["items"]),
+            "batches": int(st["batches"]),
+            "rejected": int(st["rejected"]),
+            "avg_batch_items": round(st["items"] / batches, 2),
+            "avg_fill_ratio": round(st["fill_ratio_sum"] / batches, 4),
+            "avg_wait_ms": round(st["wait_ms_sum"] / jobs, 2),
+            "max_wait_ms": round(st["wait_ms_max"], 2),
+            "avg_batch_run_ms": round(st["run_ms_sum"] / batches, 2),
+        }
@@ -0,0 +1,154 @@
+import logging
+from typing import Any, Dict, List, Tuple, Optional
+
+import torch
+
+from .speaker_index import SEARCH_MODES
+
+logger = logging.getLogger(__name__)
+
+AGGREGATIONS: Tuple[str, ...] = ("max", "mean")
+# sv_pipeline 이 반환하던 점수와 동일하게 소수점 5자리로 반올림합니다.
+SCORE_DECIMALS = 5
+
+
+class EnrollmentMatrix:
+    """기준 화자 임베딩을 하나의 정규화된 행렬로 묶은 스냅샷.
+
+    Attributes:
+        speakers: 화자 이름 리스트 (열 인덱스 순서).
+        embeddings: L2 정규화된 기준 임베딩 [R, D].
+        ref_speaker: 각 기준 임베딩이 속한 화자 인덱스 [R].
+    """
+
+    def __init__(self, speakers: List[str], embeddings: torch.Tensor, ref_speaker: torch.Tensor, index: Any = None):
+        self.speakers = speakers
+        self.embeddings = embeddings
+        self.ref_speaker = ref_speaker
+        # 메모리 매핑된 SpeakerIndex (있으면 IVF 근사 검색에 사용)
+        self.index = index
+        # 기준 임베딩 내용 식별자 (세그먼트 점수 캐시 키, EnrollmentStore 가 설정)
+        self.key: Optional[str] = None
+        self.ref_counts = torch.bincount(ref_speaker, minlength=len(speakers)).clamp(min=1) if len(speakers) else ref_speaker
+
+    @classmethod
+    def from_speaker_embeddings(cls, enroll_data: Dict[str, List[torch.Tensor]]) -> "EnrollmentMatrix":
+        speakers: List[str] = []
+        rows: List[torch.Tensor] = []
+        owners: List[int] = []
+        for spk_name, refs in enroll_data.items():
+            if not refs:
+                continue
+            spk_idx = len(speakers)
+            speakers.append(spk_name)
+            for emb in refs:
+                rows.append(emb.reshape(-1).float())
+                owners.append(spk_idx)
+        if rows:
+            embeddings = torch.nn.functional.normalize(torch.stack(rows), dim=1)
+        else:
+            embeddings = torch.zeros((0, 0))
+        return cls(speakers, embeddings, torch.tensor(owners, dtype=torch.long))
+
+    def __len__(self) -> int:
+        return len(self.speakers)
+
+
+def cosine_matrix(seg_embs: torch.Tensor, matrix: EnrollmentMatrix) -> torch.Tensor:
+    """세그먼트 임베딩 [S, D] 과 모든 기준 임베딩 [R, D] 의 코사인 유사도 [S, R]."""
+    seg = torch.nn.functional.normalize(seg_embs.float(), dim=1)
+    scores = seg @ matrix.embeddings.t()
+    return torch.round(scores * 10 ** SCORE_DECIMALS) / 10 ** SCORE_DECIMALS
+
+
+def aggregate_speaker_scores(ref_scores: torch.Tensor, matrix: EnrollmentMatrix, aggregate: str = "max") -> torch.Tensor:
+    """기준 임베딩 단위 점수 [S, R] 를 화자 단위 점수 [S, N] 로 집계합니다."""
+    if aggregate not in AGGREGATIONS:
+        raise ValueError(f"Unsupported aggregate '{aggregate}', expected one of {AGGREGATIONS}")
+    n_seg, n_spk = ref_scores.size(0), len(matrix)
+    index = matrix.ref_speaker.unsqueeze(0).expand(n_seg, -1)
+    if aggregate == "max":
+        out = torch.full((n_seg, n_spk), -1.0, dtype=ref_scores.dtype)
+        return out.scatter_reduce(1, index, ref_scores, reduce="amax", include_self=True)
+    out = torch.zeros((n_seg, n_spk), dtype=ref_scores.dtype)
+    out.scatter_add_(1, index, ref_scores)
+    return out / matrix.ref_counts.to(ref_scores.dtype)
+
+
+def _round_score(score: float) -> float:
+    return round(float(score), 4) if score != -1.0 else 0.0
+
+
+def top_speaker_scores(
+    seg_embs: torch.Tensor,
+    matrix: EnrollmentMatrix,
+    aggregate: str = "max",
+    k: int = 1,
+    search: str = "exact",
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """세그먼트별 상위 k 명의 화자 점수 [S, k] 와 화자 인덱스 [S, k] (점수 내림차순, 동점이면 화자 순서).
+
+    search='ivf' 는 SpeakerIndex 근사 검색을 사용하며 aggregate='max' 에서만 적용됩니다.
+    """
+    k = max(1, min(k, len(matrix)))
+    index = matrix.index
+    if search == "ivf" and aggregate == "max" and index is not None and index.has_ivf:
+        top_scores, top_idx = index.search(seg_embs.numpy(), k=k, mode="ivf")
+        top_scores = torch.round(torch.from_numpy(top_scores) * 10 ** SCORE_DECIMALS) / 10 ** SCORE_DECIMALS
+        return top_scores, torch.from_numpy(top_idx)
+    spk_scores = aggregate_speaker_scores(cosine_matrix(seg_embs, matrix), matrix, aggregate)
+    if k == 1:
+        # torch.max 는 동점일 때 첫 번째 인덱스를 반환하므로 기존 루프와 결과가 같습니다.
+        return spk_scores.max(dim=1, keepdim=True)
+    top_scores, top_idx = torch.sort(spk_scores, dim=1, descending=True, stable=True)
+    return top_scores[:, :k], top_idx[:, :k]
+
+
+def assign_speakers(
+    top_scores: torch.Tensor,
+    top_idx: torch.Tensor,
+    matrix: EnrollmentMatrix,
+    threshold: float,
+    top_k: int = 0,
+) -> List[Dict[str, Any]]:
+    """top_speaker_scores 결과에 threshold 를 적용해 {"speaker", "score"[, "candidates"]} 를 만듭니다."""
+    assigned: List[Dict[str, Any]] = []
+    for scores, idxs in zip(top_scores.tolist(), top_idx.tolist()):
+        score, idx = scores[0], idxs[0]
+        res: Dict[str, Any] = {
+            "speaker": matrix.speakers[idx] if idx >= 0 and score >= threshold else "unknown",
+            "score": _round_score(score),
+        }
+        if top_k > 0:
+            res["candidates"] = [
+                {"speaker": matrix.speakers[i], "score": _round_score(sc)}
+                for sc, i in zip(scores[:top_k], idxs[:top_k]) if i >= 0
+            ]
+        assigned.append(res)
+    return assigned
+
+
+def score_segments(
+    seg_embs: torch.Tensor,
+    matrix: EnrollmentMatrix,
+    threshold: float,
+    aggregate: str = "max",
+    top_k: int = 0,
+    search: str = "exact",
+) -> List[Dict[str, Any]]:
+    """세그먼트별 할당 화자와 최고 점수를 반환합니다.
+
+    기존 루프와 동일하게 화자 순서상 먼저 나온 최고 점수 화자를 선택하며,
+    최고 점수가 threshold 미만이면 'unknown' 으로 분류합니다.
+
+    Args:
+        top_k: 0 보다 크면 상위 k 명의 후보 화자와 점수를 'candidates' 로 함께 반환합니다.
+        search: 'exact' (전체 행렬) 또는 'ivf' (SpeakerIndex 근사 검색, aggregate='max' 에서만 사용).
+
+    Returns:
+        List[Dict[str, Any]]: {"speaker", "score"[, "candidates"]} 리스트.
+    """
+    if seg_embs.numel() == 0 or len(matrix) == 0:
+        return [{"speaker": "unknown", "score": 0.0} for _ in range(seg_embs.size(0))]
+    top_scores, top_idx = top_speaker_scores(seg_embs, matrix, aggregate, k=max(1, top_k), search=search)
+    return assign_speakers(top_scores, top_idx, matrix, threshold, top_k)
@@ -0,0 +1,266 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# 메모리에 보관할 최대 세그먼트 임베딩 수 (0 이면 캐시 사용 안 함)
+SEGMENT_CACHE_MAX_ITEMS = int(os.getenv("SEGMENT_CACHE_MAX_ITEMS", "50000"))
+# 디스크 계층 위치 (비어 있으면 메모리만 사용)
+SEGMENT_CACHE_DIR = os.getenv("SEGMENT_CACHE_DIR", "")
+SEGMENT_CACHE_DISK_MB = float(os.getenv("SEGMENT_CACHE_DISK_MB", "2048"))
+# 디스크 사용량은 기록/삭제 때마다 누적 관리하고, 다른 프로세스가 쓴 양을 반영하기 위해 이 간격(초)마다만 디렉토리를 다시 셉니다.
+SEGMENT_CACHE_DISK_RESCAN_SEC = float(os.getenv("SEGMENT_CACHE_DISK_RESCAN_SEC", "600"))
+# 재채점용으로 보관할 작업(job) 수와 (오디오, 화자 DB, 집계 방식) 별 점수 테이블 수
+JOB_CACHE_MAX = int(os.getenv("JOB_CACHE_MAX", "256"))
+# 세그먼트마다 캐시할 상위 화자 점수 개수 (이보다 큰 top_k 요청은 다시 계산)
+SEGMENT_SCORE_TOP = int(os.getenv("SEGMENT_SCORE_TOP", "10"))
+
+SampleRange = Tuple[int, int]
+# 세그먼트 구간 -> (상위 점수 [M], 화자 인덱스 [M])
+ScoreTable = Dict[SampleRange, Tuple[torch.Tensor, torch.Tensor]]
+
+
+class SegmentCache:
+    """오디오 내용 해시 + 세그먼트 샘플 구간을 키로 하는 세그먼트 임베딩/점수 캐시.
+
+    - 임베딩: 메모리 LRU (SEGMENT_CACHE_MAX_ITEMS) + 선택적 디스크 계층.
+      디스크에는 오디오별 디렉토리에 put 단위 shard(.pt)를 추가로 기록하고, 오디오를 처음 조회할 때 한 번에 읽습니다.
+    - 점수: (오디오 해시, 화자 DB 식별자, 집계/검색 방식) 별 세그먼트 상위 점수 테이블 (메모리 LRU).
+    - 작업: 재채점(/v1/rescore)용으로 job_id -> 오디오 해시/문장 청크 기록.
+    """
+
+    def __init__(
+        self,
+        model_id: str = "",
+        max_items: int = SEGMENT_CACHE_MAX_ITEMS,
+        disk_dir: str = SEGMENT_CACHE_DIR,
+        disk_mb: float = SEGMENT_CACHE_DISK_MB,
+        max_jobs: int = JOB_CACHE_MAX,
+        disk_rescan_sec: float = SEGMENT_CACHE_DISK_RESCAN_SEC,
+    ):
+        self.max_items = max_items
+        self.disk_dir = os.path.join(disk_dir, model_id or "default") if disk_dir else ""
+        self.disk_mb = disk_mb
+        self.max_jobs = max_jobs
+        self._embs: "OrderedDict[Tuple[str, int, int], torch.Tensor]" = OrderedDict()
+        self._n_samples: Dict[str, int] = {}
+        self._disk_loaded: set = set()
+        self._tables: "OrderedDict[Tuple[str, str], ScoreTable]" = OrderedDict()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 디스크 계층: 오디오별 사용 바이트 (오래 사용하지 않은 순서)와 합계
+        self.disk_rescan_sec = disk_rescan_sec
+        self._disk_usage: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_scanned_at: Optional[float] = None
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_items > 0
+
+    # ---- 세그먼트 임베딩 ----
+
+    def get_many(self, audio_hash: str, ranges: List[SampleRange]) -> List[Optional[torch.Tensor]]:
+        """구간별 캐시된 임베딩 (없으면 None). 메모리에 없으면 디스크 계층을 한 번 읽어 채웁니다."""
+        if not self.enabled:
+            return [None] * len(ranges)
+        if self.disk_dir and audio_hash not in self._disk_loaded:
+            self._load_disk(audio_hash)
+        out: List[Optional[torch.Tensor]] = []
+        with self._lock:
+            for s_idx, e_idx in ranges:
+                key = (audio_hash, s_idx, e_idx)
+                emb = self._embs.get(key)
+                if emb is None:
+                    self.misses += 1
+                else:
+                    self._embs.move_to_end(key)
+                    self.hits += 1
+                out.append(emb)
+        return out
+
+    def put_many(self, audio_hash: str, n_samples: int, ranges: List[SampleRange], embs: torch.Tensor) -> None:
+        if not self.enabled or not ranges:
+            return
+        # 배치 결과의 view 가 배치 전체를 붙잡지 않도록 복사해 둡니다.
+        embs = embs.detach().float().cpu().clone()
+        with self._lock:
+            self._n_samples[audio_hash] = n_samples
+            for (s_idx, e_idx), emb in zip(ranges, embs):
+                key = (audio_hash, s_idx, e_idx)
+                self._embs[key] = emb
+                self._embs.move_to_end(key)
+            self._evict()
+        if self.disk_dir:
+            self._write_shard(audio_hash, n_samples, ranges, embs)
+
+    def n_samples(self, audio_hash: str) -> Optional[int]:
+        """캐시에 기록된 오디오 길이(샘플 수). 모르면 None."""
+        if self.disk_dir and audio_hash not in self._disk_loaded:
+            self._load_disk(audio_hash)
+        with self._lock:
+            return self._n_samples.get(audio_hash)
+
+    def _evict(self) -> None:
+        while len(self._embs) > self.max_items:
+            (audio_hash, _, _), _ = self._embs.popitem(last=False)
+            # 일부 구간이 메모리에서 빠졌으므로 다음 조회 때 디스크를 다시 읽게 합니다.
+            self._disk_loaded.discard(audio_hash)
+            self.evictions += 1
+
+    def _audio_dir(self, audio_hash: str) -> str:
+        return os.path.join(self.disk_dir, audio_hash[:2], audio_hash)
+
+    def _write_shard(self, audio_hash: str, n_samples: int, ranges: List[SampleRange], embs: torch.Tensor) -> None:
+        directory = self._audio_dir(audio_hash)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            name = f"{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}.pt"
+            tmp_path = os.path.join(directory, f".{name}.tmp")
+            torch.save({
+                "n_samples": n_samples,
+                "ranges": torch.tensor(ranges, dtype=torch.long),
+                "embeddings": embs,
+            }, tmp_path)
+            path = os.path.join(directory, name)
+            os.replace(tmp_path, path)
+            self._record_disk(audio_hash, os.path.getsize(path))
+        except Exception as e:
+            logger.error(f"Failed to write segment cache shard for {audio_hash}: {e}")
+
+    def _load_disk(self, audio_hash: str) -> None:
+        directory = self._audio_dir(audio_hash)
+        loaded = 0
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith(".pt") or name.startswith("."):
+                    continue
+                try:
+                    shard = torch.load(os.path.join(directory, name), map_location="cpu")
+                except Exception as e:
+                    logger.error(f"Failed to read segment cache shard {name}: {e}")
+                    continue
+                with self._lock:
+                    self._n_samples[audio_hash] = int(shard["n_samples"])
+                    for (s_idx, e_idx), emb in zip(shard["ranges"].tolist(), shard["embeddings"]):
+                        key = (audio_hash, s_idx, e_idx)
+                        if key not in self._embs:
+                            self._embs[key] = emb
+                            loaded += 1
+            # 최근 사용 기록을 남겨 디스크 정리 시 나중에 지워지도록 합니다.
+            os.utime(directory)
+            self._record_disk(audio_hash, 0)
+        with self._lock:
+            self._evict()
+            self._disk_loaded.add(audio_hash)
+            self.disk_hits += loaded
+
+    def _scan_disk(self) -> None:
+        """디스크 계층 전체를 세어 오디오별 사용량을 다시 만듭니다 (self._disk_lock 을 잡은 상태에서 호출)."""
+        audio_dirs = []
+        if os.path.isdir(self.disk_dir):
+            for prefix in os.listdir(self.disk_dir):
+                prefix_dir = os.path.join(self.disk_dir, prefix)
+                if not os.path.isdir(prefix_dir):
+                    continue
+                for audio_hash in os.listdir(prefix_dir):
+                    directory = os.path.join(prefix_dir, audio_hash)
+                    size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+                    audio_dirs.append((os.path.getmtime(directory), audio_hash, size))
+        self._disk_usage = OrderedDict((audio_hash, size) for _, audio_hash, size in sorted(audio_dirs))
+        self._disk_bytes = sum(self._disk_usage.values())
+        self._disk_scanned_at = time.time()
+
+    def _record_disk(self, audio_hash: str, added: int) -> None:
+        """오디오의 디스크 사용량에 added 바이트를 더하고 최근 사용으로 표시한 뒤, 한도를 넘으면 정리합니다.
+
+        디렉토리 전체를 세는 것은 처음과 SEGMENT_CACHE_DISK_RESCAN_SEC 마다 한 번뿐이므로, 기록 비용은 캐시 크기와 무관합니다.
+        """
+        with self._disk_lock:
+            if self._disk_scanned_at is None or time.time() - self._disk_scanned_at > self.disk_rescan_sec:
+                # 방금 기록한 shard 도 디렉토리에 있으므로 다시 센 값에 이미 포함됩니다.
+                self._scan_disk()
+            else:
+                self._disk_usage[audio_hash] = self._disk_usage.get(audio_hash, 0) + added
+                self._disk_bytes += added
+            if audio_hash in self._disk_usage:
+                self._disk_usage.move_to_end(audio_hash)
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """디스크 계층이 SEGMENT_CACHE_DISK_MB 를 넘으면 오래 사용하지 않은 오디오부터 지웁니다 (self._disk_lock 보유)."""
+        limit = self.disk_mb * 1024 * 1024
+        while self._disk_bytes > limit and self._disk_usage:
+            audio_hash, size = self._disk_usage.popitem(last=False)
+            shutil.rmtree(self._audio_dir(audio_hash), ignore_errors=True)
+            self._disk_bytes -= size
+            with self._lock:
+                self._disk_loaded.discard(audio_hash)
+
+    # ---- 세그먼트 점수 ----
+
+    def score_table(self, audio_hash: str, score_key: str) -> ScoreTable:
+        """(오디오, 화자 DB/집계 방식) 별 점수 테이블. 호출자가 직접 채웁니다."""
+        key = (audio_hash, score_key)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is None:
+                table = {}
+                self._tables[key] = table
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.max_jobs:
+                self._tables.popitem(last=False)
+            return table
+
+    # ---- 재채점 작업 ----
+
+    def new_job(self, audio_hash: str, n_samples: int, chunks: List[Dict[str, Any]]) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._n_samples[audio_hash] = n_samples
+            self._jobs[job_id] = {
+                "audio_hash": audio_hash,
+                "n_samples": n_samples,
+                "chunks": chunks,
+                "created_at": time.time(),
+            }
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs.move_to_end(job_id)
+            return job
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "items": len(self._embs),
+                "max_items": self.max_items,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "score_tables": len(self._tables),
+                "jobs": len(self._jobs),
+                "disk_dir": self.disk_dir or None,
+                "disk_mb": round(self._disk_bytes / (1024 * 1024), 3) if self.disk_dir else None,
+            }
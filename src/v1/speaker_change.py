@@ -0,0 +1,138 @@
+import os
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .utils.json_paser import MIN_SPEAKER_DURATION, SPEAKER_UNKNOWN, SPEAKER_VERY_SHORT
+
+logger = logging.getLogger(__name__)
+
+# 슬라이딩 윈도 길이/간격(초). 윈도 임베딩 길이 합계는 문장 길이의 약 (길이 / 간격) 배입니다.
+SPLIT_WINDOW_SEC = float(os.getenv("SPLIT_WINDOW_SEC", "1.5"))
+SPLIT_HOP_SEC = float(os.getenv("SPLIT_HOP_SEC", "0.75"))
+# 이보다 긴 문장만 화자 전환을 검사합니다.
+SPLIT_MIN_SENTENCE_SEC = float(os.getenv("SPLIT_MIN_SENTENCE_SEC", "3.0"))
+# 연속으로 같은 화자가 이 개수 이상인 윈도 구간만 전환으로 인정합니다 (한두 윈도의 흔들림 무시).
+SPLIT_MIN_RUN = int(os.getenv("SPLIT_MIN_RUN", "2"))
+# 나눈 조각의 최소 길이(초). 더 짧아지는 전환 지점은 사용하지 않습니다.
+SPLIT_MIN_PIECE_SEC = float(os.getenv("SPLIT_MIN_PIECE_SEC", "1.0"))
+
+UNKNOWN_LABEL = -1
+
+
+def window_ranges(s_idx: int, e_idx: int, window: int, hop: int) -> List[Tuple[int, int]]:
+    """[s_idx, e_idx) 안의 고정 길이 윈도 (마지막 윈도는 구간 끝에 맞춤)."""
+    if e_idx - s_idx <= window:
+        return [(s_idx, e_idx)]
+    starts = list(range(s_idx, e_idx - window + 1, hop))
+    if starts[-1] + window < e_idx:
+        starts.append(e_idx - window)
+    return [(s, s + window) for s in starts]
+
+
+def smooth_labels(labels: Sequence[int], min_run: int = SPLIT_MIN_RUN) -> List[int]:
+    """min_run 보다 짧은 같은 라벨 구간을 앞 구간(첫 구간이면 뒤 구간)의 라벨로 바꿉니다."""
+    out = list(labels)
+    if min_run <= 1 or not out:
+        return out
+    runs: List[List[int]] = []  # [label, start, end)
+    for i, label in enumerate(out):
+        if runs and runs[-1][0] == label:
+            runs[-1][2] = i + 1
+        else:
+            runs.append([label, i, i + 1])
+    if len(runs) == 1:
+        return out
+    for r, (label, s, e) in enumerate(runs):
+        if e - s >= min_run:
+            continue
+        if r > 0:
+            replace = runs[r - 1][0]
+        else:
+            replace = next((run[0] for run in runs[1:] if run[2] - run[1] >= min_run), runs[1][0])
+        runs[r][0] = replace
+        out[s:e] = [replace] * (e - s)
+    return out
+
+
+def change_times(labels: Sequence[int], centers: Sequence[float]) -> List[Tuple[float, int, int]]:
+    """라벨이 바뀌는 지점의 시각(양쪽 윈도 중심의 중간)과 (이전 라벨, 다음 라벨)."""
+    return [
+        ((centers[i - 1] + centers[i]) / 2, labels[i - 1], labels[i])
+        for i in range(1, len(labels)) if labels[i] != labels[i - 1]
+    ]
+
+
+def _piece(chunk: Dict[str, Any], words: List[Dict[str, Any]]) -> Dict[str, Any]:
+    start, end = words[0]["start"], words[-1]["end"]
+    return {
+        "start": start,
+        "end": end,
+        "text": " ".join(w["word"] for w in words if w["word"]),
+        "speaker": SPEAKER_VERY_SHORT if end - start < MIN_SPEAKER_DURATION else SPEAKER_UNKNOWN,
+        "words": words,
+        # 원래 문장 구간 (나눈 조각을 다시 묶을 때 사용)
+        "sentence": [chunk["start"], chunk["end"]],
+    }
+
+
+def split_at_words(
+    chunk: Dict[str, Any], times: Sequence[float], min_piece: float = SPLIT_MIN_PIECE_SEC
+) -> List[Dict[str, Any]]:
+    """전환 시각마다 가장 가까운 단어 경계에서 문장을 나눕니다. 조각이 min_piece 보다 짧아지는 경계는 건너뜁니다.
+
+    단어 정보가 없거나 나눌 경계가 없으면 원래 청크 하나를 그대로 반환합니다.
+    """
+    words = chunk.get("words") or []
+    if len(words) < 2 or not times:
+        return [chunk]
+    # 단어 i 와 i+1 사이 경계 시각
+    bounds = [(words[i]["end"] + words[i + 1]["start"]) / 2 for i in range(len(words) - 1)]
+    cuts: List[int] = []
+    for t in times:
+        i = min(range(len(bounds)), key=lambda b: abs(bounds[b] - t))
+        prev_start = words[cuts[-1] + 1]["start"] if cuts else words[0]["start"]
+        if i in cuts or (cuts and i < cuts[-1]):
+            continue
+        if words[i]["end"] - prev_start < min_piece or words[-1]["end"] - words[i + 1]["start"] < min_piece:
+            continue
+        cuts.append(i)
+    if not cuts:
+        return [chunk]
+    pieces: List[Dict[str, Any]] = []
+    lo = 0
+    for i in cuts + [len(words) - 1]:
+        pieces.append(_piece(chunk, words[lo: i + 1]))
+        lo = i + 1
+    return pieces
+
+
+def needs_check(chunk: Dict[str, Any], min_sec: float = SPLIT_MIN_SENTENCE_SEC) -> bool:
+    return (
+        chunk.get("speaker") not in (SPEAKER_VERY_SHORT, "no_speech")
+        and len(chunk.get("words") or []) >= 2
+        and chunk["end"] - chunk["start"] > min_sec
+    )
+
+
+def window_labels(top_scores: Sequence[float], top_idx: Sequence[int], threshold: float) -> List[int]:
+    """윈도별 최고 점수 화자 인덱스 (threshold 미만이면 UNKNOWN_LABEL)."""
+    return [int(i) if s >= threshold else UNKNOWN_LABEL for s, i in zip(top_scores, top_idx)]
+
+
+def speaker_change_stats(
+    n_checked: int, n_windows: int, window_sec: float, checked_sec: float, n_split: int, n_added: int,
+    elapsed: Optional[float] = None,
+) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "sentences_checked": n_checked,
+        "windows": n_windows,
+        "window_seconds": round(window_sec, 3),
+        "checked_seconds": round(checked_sec, 3),
+        # 검사한 문장 길이 대비 추가로 임베딩한 길이 (일반 경로 대비 추가 비용의 상한)
+        "window_ratio": round(window_sec / checked_sec, 3) if checked_sec else 0.0,
+        "sentences_split": n_split,
+        "pieces_added": n_added,
+    }
+    if elapsed is not None:
+        stats["elapsed"] = round(elapsed, 4)
+    return stats
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 1
+CURRENT_FILE = "CURRENT"
+# 이 개수 이상의 기준 임베딩이 있을 때만 IVF(근사 검색) 리스트를 만듭니다.
+IVF_MIN_REFS = int(os.getenv("SPEAKER_INDEX_IVF_MIN_REFS", "2000"))
+IVF_NPROBE = int(os.getenv("SPEAKER_INDEX_NPROBE", "8"))
+SEARCH_MODES: Tuple[str, ...] = ("exact", "ivf")
+# 정확 검색 시 한 번에 곱할 기준 임베딩 행 수 (float16 인덱스 업캐스트 메모리 상한)
+EXACT_BLOCK_ROWS = 65536
+
+
+def entries_digest(rows: List[Tuple[str, str]], model_id: str = "", dtype: str = "float32") -> str:
+    """(경로, 내용 해시) 목록과 임베딩 모델 식별자/저장 형식으로 인덱스 내용 식별자를 만듭니다.
+
+    같은 파일이라도 모델(백엔드/양자화 포함)이나 dtype 이 다르면 임베딩이 다르므로 다른 인덱스로 취급합니다.
+    """
+    h = hashlib.sha1()
+    h.update(f"{model_id}\0{dtype}\n".encode("utf-8"))
+    for path, sha1 in rows:
+        h.update(path.encode("utf-8"))
+        h.update(b"\0")
+        h.update(sha1.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def spherical_kmeans(x: np.ndarray, n_lists: int, n_iter: int = 10, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """정규화된 벡터에 대한 구면 k-means. (centroids [L, D], assignment [N])."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=n_lists, replace=False)].astype(np.float32)
+    assign = np.zeros(len(x), dtype=np.int64)
+    for _ in range(n_iter):
+        assign = np.argmax(x @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        # 빈 리스트는 임의의 점으로 다시 초기화합니다.
+        sums[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=True)]
+        norms[empty] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids, assign
+
+
+def write_index(
+    directory: str,
+    speakers: List[str],
+    embeddings: np.ndarray,
+    ref_speaker: np.ndarray,
+    paths: List[str],
+    digest: str,
+    dtype: str = "float32",
+) -> str:
+    """기준 임베딩을 메모리 매핑 가능한 인덱스 디렉토리로 기록합니다.
+
+    레이아웃 (`<directory>/<버전>/`):
+    - embeddings.npy: L2 정규화된 [R, D] 행렬 (float32 또는 float16), 화자별로 연속 배치
+    - offsets.npy: 화자 i 의 기준 임베딩은 행 offsets[i]:offsets[i+1]
+    - ivf_centroids.npy / ivf_ids.npy / ivf_offsets.npy: IVF 근사 검색 리스트 (R >= IVF_MIN_REFS 일 때)
+    - meta.json: 화자 이름, 경로, dtype, digest
+
+    `CURRENT` 파일을 원자적으로 교체하므로 읽는 쪽은 항상 완성된 버전만 봅니다.
+
+    Returns:
+        str: 기록된 버전 디렉토리 경로.
+    """
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"Unsupported index dtype '{dtype}'")
+    os.makedirs(directory, exist_ok=True)
+    version = f"v{int(time.time() * 1000)}_{os.getpid()}"
+    tmp_dir = os.path.join(directory, f".{version}.tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    order = np.argsort(ref_speaker, kind="stable")
+    emb = np.ascontiguousarray(embeddings[order], dtype=np.float32)
+    owners = ref_speaker[order]
+    counts = np.bincount(owners, minlength=len(speakers)) if len(owners) else np.zeros(len(speakers), dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    np.save(os.path.join(tmp_dir, "embeddings.npy"), emb.astype(dtype))
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+
+    n_lists = 0
+    if len(emb) >= IVF_MIN_REFS:
+        n_lists = int(min(4096, max(1, np.sqrt(len(emb)))))
+        centroids, assign = spherical_kmeans(emb, n_lists)
+        ivf_ids = np.argsort(assign, kind="stable").astype(np.int64)
+        ivf_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))]).astype(np.int64)
+        np.save(os.path.join(tmp_dir, "ivf_centroids.npy"), centroids)
+        np.save(os.path.join(tmp_dir, "ivf_ids.npy"), ivf_ids)
+        np.save(os.path.join(tmp_dir, "ivf_offsets.npy"), ivf_offsets)
+
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "format": INDEX_FORMAT,
+            "digest": digest,
+            "dtype": dtype,
+            "dim": int(emb.shape[1]) if emb.ndim == 2 else 0,
+            "n_refs": int(len(emb)),
+            "n_lists": n_lists,
+            "speakers": speakers,
+            "paths": [paths[i] for i in order],
+        }, f, ensure_ascii=False)
+
+    final_dir = os.path.join(directory, version)
+    os.replace(tmp_dir, final_dir)
+    current_tmp = os.path.join(directory, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(current_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(current_tmp, os.path.join(directory, CURRENT_FILE))
+    _cleanup_old_versions(directory, keep=version)
+    return final_dir
+
+
+def _cleanup_old_versions(directory: str, keep: str, max_keep: int = 2) -> None:
+    # 다른 워커가 아직 매핑 중일 수 있으므로 직전 버전까지는 남겨둡니다 (Linux 에서는 삭제해도 매핑은 유지됨).
+    versions = sorted(d for d in os.listdir(directory) if d.startswith("v") and d != keep)
+    for old in versions[: max(0, len(versions) - (max_keep - 1))]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+
+
+class SpeakerIndex:
+    """메모리 매핑된 화자 인덱스. 여러 워커 프로세스가 같은 페이지 캐시를 공유합니다."""
+
+    def __init__(self, version_dir: str):
+        self.version_dir = version_dir
+        with open(os.path.join(version_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        self.speakers: List[str] = self.meta["speakers"]
+        self.paths: List[str] = self.meta["paths"]
+        self.digest: str = self.meta["digest"]
+        # mode 'c' (copy-on-write): 파일은 수정되지 않으며 프로세스 간 페이지가 공유됩니다.
+        self.embeddings = np.load(os.path.join(version_dir, "embeddings.npy"), mmap_mode="c")
+        self.offsets = np.load(os.path.join(version_dir, "offsets.npy"))
+        self.ref_speaker = np.repeat(np.arange(len(self.speakers)), np.diff(self.offsets))
+        self.centroids: Optional[np.ndarray] = None
+        if self.meta.get("n_lists"):
+            self.centroids = np.load(os.path.join(version_dir, "ivf_centroids.npy"))
+            self.ivf_ids = np.load(os.path.join(version_dir, "ivf_ids.npy"), mmap_mode="r")
+            self.ivf_offsets = np.load(os.path.join(version_dir, "ivf_offsets.npy"))
+
+    @classmethod
+    def open(cls, directory: str) -> Optional["SpeakerIndex"]:
+        """CURRENT 가 가리키는 버전을 엽니다. 인덱스가 없으면 None."""
+        current = os.path.join(directory, CURRENT_FILE)
+        if not os.path.exists(current):
+            return None
+        with open(current, "r", encoding="utf-8") as f:
+            version = f.read().strip()
+        return cls(os.path.join(directory, version))
+
+    def __len__(self) -> int:
+        return len(self.speakers)
+
+    @property
+    def has_ivf(self) -> bool:
+        return self.centroids is not None
+
+    def _speaker_max(self, ref_scores: np.ndarray) -> np.ndarray:
+        """행별 기준 임베딩 점수 [S, R] 를 화자별 최댓값 [S, N] 으로 (화자별 행이 연속이므로 reduceat)."""
+        n_spk = len(self.speakers)
+        out = np.full((ref_scores.shape[0], n_spk), -1.0, dtype=np.float32)
+        nonempty = np.diff(self.offsets) > 0
+        if nonempty.any():
+            out[:, nonempty] = np.maximum.reduceat(ref_scores, self.offsets[:-1][nonempty], axis=1)
+        return out
+
+    def _exact_scores(self, queries: np.ndarray) -> np.ndarray:
+        n_refs = self.embeddings.shape[0]
+        if n_refs <= EXACT_BLOCK_ROWS:
+            return queries @ np.asarray(self.embeddings, dtype=np.float32).T
+        parts = []
+        for s in range(0, n_refs, EXACT_BLOCK_ROWS):
+            parts.append(queries @ np.asarray(self.embeddings[s: s + EXACT_BLOCK_ROWS], dtype=np.float32).T)
+        return np.concatenate(parts, axis=1)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 5,
+        mode: str = "exact",
+        nprobe: int = IVF_NPROBE,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """화자 단위 top-k 검색 (화자 점수 = 기준 임베딩 코사인 최댓값).
+
+        Args:
+            queries: [S, D] 세그먼트 임베딩 (정규화 여부 무관).
+            k: 반환할 화자 수.
+            mode: 'exact' (전체 스캔) 또는 'ivf' (가까운 nprobe 개 리스트만 스캔).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: 점수 [S, k] 와 화자 인덱스 [S, k] (점수 내림차순, 없으면 -1).
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode '{mode}', expected one of {SEARCH_MODES}")
+        q = np.asarray(queries, dtype=np.float32)
+        q = q / np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+        n_spk = len(self.speakers)
+        if n_spk == 0:
+            return np.zeros((len(q), 0), dtype=np.float32), np.zeros((len(q), 0), dtype=np.int64)
+        k = max(1, min(k, n_spk))
+
+        if mode == "exact" or not self.has_ivf:
+            spk_scores = self._speaker_max(self._exact_scores(q))
+        else:
+            spk_scores = np.full((len(q), n_spk), -1.0, dtype=np.float32)
+            probe = np.argsort(-(q @ self.centroids.T), axis=1)[:, :nprobe]
+            # 쿼리가 아니라 리스트 단위로 순회하여, 같은 리스트를 탐색하는 쿼리들을 한 번의 행렬곱으로 처리합니다.
+            for c in np.unique(probe):
+                ids = np.asarray(self.ivf_ids[self.ivf_offsets[c]: self.ivf_offsets[c + 1]])
+                if len(ids) == 0:
+                    continue
+                qs = np.nonzero((probe == c).any(axis=1))[0]
+                scores = q[qs] @ np.asarray(self.embeddings[ids], dtype=np.float32).T
+                # 리스트 안의 ids 는 오름차순(= 화자순)이므로 화자 경계별 reduceat 으로 최댓값을 구합니다.
+                owners, starts = np.unique(self.ref_speaker[ids], return_index=True)
+                reduced = np.maximum.reduceat(scores, starts, axis=1)
+                spk_scores[qs[:, None], owners[None, :]] = np.maximum(spk_scores[qs[:, None], owners[None, :]], reduced)
+
+        top = np.argpartition(-spk_scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(spk_scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        top[top_scores <= -1.0] = -1
+        return top_scores, top
@@ -0,0 +1,185 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from .main import get_engine, get_scheduler, get_employee_db_path
+from .metrics import MODEL_LOAD_SECONDS, PROCESS_STARTED, STARTUP_SECONDS, first_success_seconds
+from .utils.json_paser import refine_whisper_json
+from .utils.kr_tag import kiwi_tagger
+
+logger = logging.getLogger(__name__)
+
+# true 이면 서버는 바로 요청을 받고 모델 로드/워밍업은 백그라운드에서 진행합니다 (준비 여부는 GET /ready).
+# false 이면 모든 구성 요소가 준비된 뒤에 요청을 받습니다 (구성 요소끼리는 여전히 병렬로 로드).
+STARTUP_BACKGROUND = os.getenv("STARTUP_BACKGROUND", "true").lower() in ("1", "true", "yes")
+# 모델 로드 후 더미 오디오로 임베딩을 한 번 실행해 첫 요청이 치를 초기화 비용(커널 선택, 메모리 할당)을 미리 치릅니다.
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() in ("1", "true", "yes")
+STARTUP_WARMUP_SEC = float(os.getenv("STARTUP_WARMUP_SEC", "2.0"))
+# GET /ready 가 200 을 반환하기 위해 준비되어야 하는 구성 요소 (등록되지 않은 이름은 무시)
+READY_COMPONENTS: Tuple[str, ...] = tuple(
+    c.strip() for c in os.getenv("READY_COMPONENTS", "engine,scheduler,warmup,enrollment,kiwi").split(",") if c.strip()
+)
+
+# Kiwi 워밍업 문장 (문장 분리 + 어미 분석 경로를 모두 거치도록 종결/연결 어미를 섞습니다)
+WARMUP_TEXT = "회의를 시작하겠습니다. 지난주 안건부터 검토하고 다음 일정을 정리해 보죠."
+
+Step = Tuple[str, Callable[[], Any]]
+
+
+class Component:
+    """시작 단계 구성 요소 하나의 상태: pending → loading → ready | failed (앞 단계가 실패하면 skipped)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.status = "pending"
+        self.started_at: Optional[float] = None
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "seconds": self.seconds,
+            "started_after": round(self.started_at - PROCESS_STARTED, 3) if self.started_at is not None else None,
+            "error": self.error,
+        }
+
+
+class StartupLoader:
+    """무거운 구성 요소(모델, Kiwi, 기준 임베딩)를 체인별 백그라운드 스레드에서 병렬로 로드합니다.
+
+    체인 안의 단계는 순서대로 실행되고(예: 모델 → 워밍업 → 기준 임베딩), 체인끼리는 동시에 실행됩니다.
+    단계마다 상태와 소요 시간을 기록하며, 한 단계가 실패하면 같은 체인의 다음 단계는 skipped 로 남습니다.
+    """
+
+    def __init__(self, chains: Sequence[Sequence[Step]], required: Sequence[str] = READY_COMPONENTS):
+        self.chains = [list(chain) for chain in chains]
+        self.components: Dict[str, Component] = {name: Component(name) for chain in chains for name, _ in chain}
+        self.required = tuple(name for name in required if name in self.components)
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self) -> "StartupLoader":
+        if self._threads:
+            return self
+        self.started_at = time.time()
+        STARTUP_SECONDS.set(self.started_at - PROCESS_STARTED, component="import")
+        for i, chain in enumerate(self.chains):
+            t = threading.Thread(target=self._run_chain, args=(chain,), name=f"startup-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        if not self._threads:
+            self._done.set()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """모든 체인이 끝날 때까지 기다립니다. 필수 구성 요소가 모두 준비되었으면 True."""
+        self._done.wait(timeout)
+        return self.ready()
+
+    def ready(self) -> bool:
+        return all(self.components[name].status == "ready" for name in self.required)
+
+    def _run_chain(self, chain: List[Step]) -> None:
+        failed: Optional[str] = None
+        for name, fn in chain:
+            comp = self.components[name]
+            if failed is not None:
+                comp.status, comp.error = "skipped", f"{failed} failed"
+                continue
+            comp.status, comp.started_at = "loading", time.time()
+            started = time.perf_counter()
+            try:
+                fn()
+                comp.status = "ready"
+            except Exception as e:
+                # [[memory:6804125]]
+                logger.error(f"Startup component '{name}' failed: {e}")
+                comp.status, comp.error = "failed", str(e)
+                failed = name
+            comp.seconds = round(time.perf_counter() - started, 3)
+            STARTUP_SECONDS.set(comp.seconds, component=name)
+            logger.info(f"Startup component '{name}' {comp.status} in {comp.seconds}s")
+        with self._lock:
+            if self.ready_at is None and self.ready():
+                self.ready_at = time.time()
+                logger.info(f"Server ready {round(self.ready_at - PROCESS_STARTED, 3)}s after process start")
+            if all(c.status not in ("pending", "loading") for c in self.components.values()):
+                self._done.set()
+
+    def describe(self) -> Dict[str, Any]:
+        """GET /ready 응답: 구성 요소별 상태/소요 시간과 프로세스 시작 기준 시점(초)."""
+        first_success = first_success_seconds()
+        return {
+            "ready": self.ready(),
+            "required": list(self.required),
+            "components": {name: comp.describe() for name, comp in self.components.items()},
+            "uptime": round(time.time() - PROCESS_STARTED, 3),
+            "import_seconds": round(self.started_at - PROCESS_STARTED, 3) if self.started_at is not None else None,
+            "time_to_ready": round(self.ready_at - PROCESS_STARTED, 3) if self.ready_at is not None else None,
+            "time_to_first_success": first_success,
+        }
+
+
+def warmup_audio(seconds: float = STARTUP_WARMUP_SEC, sr: int = 16000) -> torch.Tensor:
+    """워밍업용 더미 음성 [1, T]: 배음이 있는 유성음 + 약한 잡음 (결정적)."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 140.0 + 20.0 * np.sin(2 * np.pi * 3.0 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    wav = sum(np.sin(k * phase) / k for k in range(1, 16)) * 0.1 + 0.003 * rng.standard_normal(len(t))
+    return torch.from_numpy(wav.astype(np.float32)).unsqueeze(0)
+
+
+def _load_engine() -> None:
+    # get_engine 이 모델 로드 시간을 MODEL_LOAD_SECONDS 에 기록합니다.
+    get_engine()
+
+
+def _start_scheduler() -> None:
+    get_scheduler()
+
+
+def _warmup_engine() -> None:
+    """길이가 다른 두 구간을 스케줄러(없으면 배치 추출기)로 임베딩해 첫 요청 경로를 미리 실행합니다."""
+    engine = get_engine()
+    sched = get_scheduler()
+    wav = warmup_audio()
+    duration = wav.size(1) / 16000
+    chunks = [{"start": 0.0, "end": duration, "text": ""}, {"start": 0.0, "end": duration / 2, "text": ""}]
+    idx, _ = engine.extract_chunk_embeddings(wav, chunks, embed_fn=sched.embed if sched is not None else None)
+    if len(idx) != len(chunks):
+        raise RuntimeError(f"warm-up embedded {len(idx)}/{len(chunks)} segments")
+
+
+def _load_enrollment() -> None:
+    store = get_engine().get_enrollment_store(get_employee_db_path(), force_refresh=True)
+    stats = store.last_stats
+    logger.info(f"Enrollment store ready: {stats.get('entries', 0)} refs in {stats.get('elapsed', 0)}s")
+
+
+def _load_kiwi() -> None:
+    if kiwi_tagger.load() is None:
+        raise RuntimeError("Kiwi failed to load")
+    if kiwi_tagger.load_seconds is not None:
+        MODEL_LOAD_SECONDS.set(kiwi_tagger.load_seconds, model="kiwi")
+    if STARTUP_WARMUP:
+        words = [{"word": w, "start": i * 0.4, "end": i * 0.4 + 0.35} for i, w in enumerate(WARMUP_TEXT.split())]
+        refine_whisper_json({"segments": [{"start": 0.0, "end": words[-1]["end"], "text": WARMUP_TEXT, "words": words}]})
+
+
+def default_loader() -> StartupLoader:
+    """서버 기본 시작 단계: (모델 → 스케줄러 → 워밍업 → 기준 임베딩) 과 (Kiwi 로드 + 워밍업) 을 병렬로 실행합니다."""
+    engine_chain: List[Step] = [("engine", _load_engine), ("scheduler", _start_scheduler)]
+    if STARTUP_WARMUP:
+        engine_chain.append(("warmup", _warmup_engine))
+    engine_chain.append(("enrollment", _load_enrollment))
+    return StartupLoader([engine_chain, [("kiwi", _load_kiwi)]])
@@ -1,5 +1,6 @@
+import bisect
 import logging
-from typing import Dict, List, Any, Final
+from typing import Dict, List, Any, Final, Iterable, Iterator, Optional
 
 from .kr_tag import kiwi_tagger
 
@@ -9,9 +10,11 @@ logger = logging.getLogger(__name__)
 MIN_SPEAKER_DURATION: Final[float] = 0.5
 SPEAKER_VERY_SHORT: Final[str] = "very_short"
 SPEAKER_UNKNOWN: Final[str] = "unknown"
+# IncrementalRefiner 가 확정하지 않고 보관할 최대 단어 수
+MAX_PENDING_WORDS: Final[int] = 400
 
 
-def refine_whisper_json(whisper_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+def refine_whisper_json(whisper_data: Dict[str, Any], keep_words: bool = False) -> List[Dict[str, Any]]:
     """Whisper 출력을 Kiwi를 사용하여 문장 단위로 정제하고 짧은 구간을 분류합니다.
 
     로직 단계:
@@ -20,89 +23,209 @@ def refine_whisper_json(whisper_data: Dict[str, Any]) -> List[Dict[str, Any]]:
     3. Kiwi의 `split_into_sents` 기능을 사용하여 문장 단위로 분할합니다.
     4. 분할된 문장의 길이가 0.5초 미만인 경우 화자명을 'very_short'로 설정합니다.
 
+    문장-단어 매핑은 정렬된 오프셋 배열에 대한 이진 탐색으로 수행하므로 전체 비용은 O(단어 + 문장 log 단어) 입니다.
+
     Args:
         whisper_data: Whisper 엔진에서 반환된 원본 JSON 데이터.
+        keep_words: True 이면 문장마다 구성 단어({"word", "start", "end"})를 'words' 로 함께 담습니다
+            (문장 내부 화자 전환 지점을 단어 경계에서 나눌 때 사용).
 
     Returns:
         List[Dict[str, Any]]: 정제된 문장 단위 조각 리스트.
     """
     raw_segments = whisper_data.get("segments") or whisper_data.get("chunks") or []
-    
+
     all_words: List[Dict[str, Any]] = []
     for seg in raw_segments:
-        words = seg.get("words", [])
-        if not words:
-            # 단어 단위 정보가 없는 경우 세그먼트 자체를 하나의 단어처럼 처리
-            all_words.append({
-                "start": float(seg.get("start", 0)),
-                "end": float(seg.get("end", 0)),
-                "word": seg.get("text", "").strip(),
-            })
-        else:
-            all_words.extend(words)
+        all_words.extend(segment_words(seg))
 
     if not all_words:
         return []
 
     # 단어들을 하나의 텍스트로 합치면서 각 단어의 문자열 위치(offset) 기록
-    full_text: str = ""
-    word_map: List[tuple[int, int, Dict[str, Any]]] = []
-    
-    for w in all_words:
-        w_text = (w.get("word") or w.get("text", "")).strip()
-        if not w_text:
-            continue
-        
-        start_char = len(full_text)
-        if full_text:  # 첫 단어가 아니면 공백 추가
-            full_text += " "
-            start_char += 1
-        
-        full_text += w_text
-        end_char = len(full_text)
-        word_map.append((start_char, end_char, w))
-            
-    if not full_text:
+    word_map = _join_words(all_words)
+    if not word_map.text:
         return []
-    
+
     # 2. Kiwi를 사용하여 문장 분리 수행
     try:
-        kiwi_sentences = kiwi_tagger.split_into_sents(full_text)
+        kiwi_sentences = kiwi_tagger.split_into_sents(word_map.text)
     except Exception as e:
         # [[memory:6804125]] 예외 발생 시 로깅
         logger.error(f"Kiwi split_into_sents failed during refine: {e}")
         kiwi_sentences = []
-    
-    final_results: List[Dict[str, Any]] = []
-    
+
     if not kiwi_sentences:
         # 분리 실패 시 전체를 하나의 세그먼트로 처리
-        start_time = float(all_words[0].get("start", 0))
-        end_time = float(all_words[-1].get("end", 0))
-        duration = end_time - start_time
-        
-        final_results.append({
-            "start": start_time,
-            "end": end_time,
-            "text": full_text,
-            "speaker": SPEAKER_VERY_SHORT if duration < MIN_SPEAKER_DURATION else SPEAKER_UNKNOWN
-        })
-    else:
-        for sent in kiwi_sentences:
-            # 문장 오프셋 내에 걸쳐있는 단어들 매핑
-            sent_words = [w for s, e, w in word_map if not (e <= sent.start or s >= sent.end)]
-            
-            if sent_words:
-                start_time = float(sent_words[0].get("start", 0))
-                end_time = float(sent_words[-1].get("end", 0))
-                duration = end_time - start_time
-                
-                final_results.append({
-                    "start": start_time,
-                    "end": end_time,
-                    "text": sent.text,
-                    "speaker": SPEAKER_VERY_SHORT if duration < MIN_SPEAKER_DURATION else SPEAKER_UNKNOWN
-                })
-                
+        return [_make_sentence(all_words, word_map.text, keep_words)]
+
+    final_results: List[Dict[str, Any]] = []
+    for sent in kiwi_sentences:
+        # 문장 오프셋 내에 걸쳐있는 단어들 매핑
+        sent_words = word_map.overlapping(sent.start, sent.end)
+        if sent_words:
+            final_results.append(_make_sentence(sent_words, sent.text, keep_words))
     return final_results
 
+
+def iter_refined_sentences(segments: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Whisper 세그먼트를 하나씩 받아 확정된 문장을 바로 내보내는 제너레이터.
+
+    `IncrementalRefiner` 를 사용하므로 메모리에는 아직 닫히지 않은 문장의 단어만 유지됩니다.
+    Kiwi 가 부분 텍스트로 문장을 판단하므로 경계가 `refine_whisper_json` 과 다를 수 있습니다.
+    """
+    refiner = IncrementalRefiner()
+    for seg in segments:
+        yield from refiner.add_segment(seg)
+    yield from refiner.flush()
+
+
+class _WordMap:
+    """공백으로 이어 붙인 단어 텍스트와 단어별 문자 오프셋 (오프셋은 오름차순)."""
+
+    __slots__ = ("text", "starts", "ends", "words")
+
+    def __init__(self, text: str, starts: List[int], ends: List[int], words: List[Dict[str, Any]]):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+        self.words = words
+
+    def overlapping(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """[start, end) 문자 구간과 겹치는 단어들."""
+        lo = bisect.bisect_right(self.ends, start)
+        hi = bisect.bisect_left(self.starts, end, lo)
+        return self.words[lo:hi]
+
+    def after(self, offset: int) -> List[Dict[str, Any]]:
+        """offset 이후에 시작하는 단어들."""
+        return self.words[bisect.bisect_left(self.starts, offset):]
+
+
+def _join_words(words: List[Dict[str, Any]]) -> _WordMap:
+    """단어들을 공백으로 이어 붙이며 (반복 문자열 연결 없이) 각 단어의 오프셋을 기록합니다."""
+    texts: List[str] = []
+    starts: List[int] = []
+    ends: List[int] = []
+    kept: List[Dict[str, Any]] = []
+    pos = 0
+    for w in words:
+        w_text = (w.get("word") or w.get("text", "")).strip()
+        if not w_text:
+            continue
+        if texts:  # 첫 단어가 아니면 공백 추가
+            pos += 1
+        starts.append(pos)
+        pos += len(w_text)
+        ends.append(pos)
+        texts.append(w_text)
+        kept.append(w)
+    return _WordMap(" ".join(texts), starts, ends, kept)
+
+
+def _make_sentence(sent_words: List[Dict[str, Any]], text: str, keep_words: bool = False) -> Dict[str, Any]:
+    start_time = float(sent_words[0].get("start", 0))
+    end_time = float(sent_words[-1].get("end", 0))
+    duration = end_time - start_time
+    sentence = {
+        "start": start_time,
+        "end": end_time,
+        "text": text,
+        "speaker": SPEAKER_VERY_SHORT if duration < MIN_SPEAKER_DURATION else SPEAKER_UNKNOWN
+    }
+    if keep_words:
+        sentence["words"] = [
+            {
+                "word": (w.get("word") or w.get("text", "")).strip(),
+                "start": float(w.get("start", 0)),
+                "end": float(w.get("end", 0)),
+            }
+            for w in sent_words
+        ]
+    return sentence
+
+
+def segment_words(seg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Whisper 세그먼트의 단어 목록 (단어 정보가 없으면 세그먼트 자체를 하나의 단어로 취급)."""
+    words = seg.get("words", [])
+    if words:
+        return list(words)
+    return [{
+        "start": float(seg.get("start", 0)),
+        "end": float(seg.get("end", 0)),
+        "word": seg.get("text", "").strip(),
+    }]
+
+
+class IncrementalRefiner:
+    """실시간으로 들어오는 Whisper 단어들을 누적하며, Kiwi 가 닫힌 문장으로 판단한 것만 확정합니다.
+
+    - 누적 텍스트를 Kiwi 로 분리했을 때 마지막 문장을 제외한 문장은 닫힌 문장입니다.
+    - 마지막 문장은 종결 부호(. ? !)로 끝나거나 종결 어미(EF)로 끝나는 경우에만 닫힌 것으로 봅니다.
+    - `flush()` 는 스트림 종료 시 남은 단어를 모두 문장으로 확정합니다.
+    """
+
+    TERMINAL_PUNCT = (".", "?", "!")
+
+    def __init__(self):
+        self.pending: List[Dict[str, Any]] = []
+
+    def add_words(self, words: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.pending.extend(w for w in words if (w.get("word") or w.get("text", "")).strip())
+        return self._finalize(final=False)
+
+    def add_segment(self, seg: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.add_words(segment_words(seg))
+
+    def flush(self) -> List[Dict[str, Any]]:
+        return self._finalize(final=True)
+
+    @property
+    def pending_start(self) -> Optional[float]:
+        """아직 확정되지 않은 첫 단어의 시작 시각."""
+        return float(self.pending[0].get("start", 0)) if self.pending else None
+
+    def _is_closed(self, text: str) -> bool:
+        stripped = text.strip()
+        if stripped.endswith(self.TERMINAL_PUNCT):
+            return True
+        return kiwi_tagger.get_ending_type(stripped) == "EF"
+
+    def _finalize(self, final: bool) -> List[Dict[str, Any]]:
+        if not self.pending:
+            return []
+        word_map = _join_words(self.pending)
+        if not word_map.text:
+            self.pending = []
+            return []
+
+        try:
+            sentences = kiwi_tagger.split_into_sents(word_map.text)
+        except Exception as e:
+            # [[memory:6804125]] 예외 발생 시 로깅
+            logger.error(f"Kiwi split_into_sents failed during incremental refine: {e}")
+            sentences = []
+
+        # 종결 신호 없이 단어가 계속 쌓이면 매번 전체를 다시 분석하게 되므로 상한에서 강제로 확정합니다.
+        final = final or len(word_map.words) >= MAX_PENDING_WORDS
+        if not sentences:
+            if not final:
+                return []
+            self.pending = []
+            return [_make_sentence(word_map.words, word_map.text)]
+
+        closed = list(sentences) if final else list(sentences[:-1])
+        if not final and self._is_closed(sentences[-1].text):
+            closed.append(sentences[-1])
+        if not closed:
+            return []
+
+        results: List[Dict[str, Any]] = []
+        for sent in closed:
+            sent_words = word_map.overlapping(sent.start, sent.end)
+            if sent_words:
+                results.append(_make_sentence(sent_words, sent.text))
+
+        # 마지막으로 확정된 문장 이후의 단어만 남깁니다.
+        self.pending = word_map.after(closed[-1].end)
+        return results
@@ -1,30 +1,167 @@
+import os
+import time
+import queue
 import logging
-import re
-from kiwipiepy import Kiwi
-from typing import List, Any, Optional
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Any, Optional, Tuple
+
+if TYPE_CHECKING:
+    from kiwipiepy import Kiwi
 
 logger = logging.getLogger(__name__)
 
+# 배치 API(여러 텍스트 동시 분석)에 사용할 Kiwi 스레드 수 (0 이면 단일 스레드, -1 이면 CPU 코어 수).
+# 서버는 이미 요청 스레드와 추론 스레드가 코어를 나눠 쓰므로 기본값은 0 이고, 전용 배치 작업에서만 켜는 것을 권장합니다.
+KIWI_NUM_WORKERS = int(os.getenv("KIWI_NUM_WORKERS", "0"))
+# 형태소 분석 결과 LRU 캐시 크기 (0 이면 캐시 사용 안 함)
+KIWI_CACHE_SIZE = int(os.getenv("KIWI_CACHE_SIZE", "4096"))
+# 0 이면 하나의 Kiwi 인스턴스를 모든 요청이 잠금 없이 공유하고,
+# N 이면 독립 인스턴스 N 개를 풀로 두어 요청마다 빌려 씁니다 (인스턴스당 모델 메모리 추가).
+# Kiwi 의 analyze/split_into_sents 는 로드된 모델을 읽기만 하므로 여러 스레드에서 동시에 호출해도 안전합니다
+# (사용자 사전 추가 등 모델을 바꾸는 호출은 로드 이후 하지 않습니다). tests/test_kr_tag.py 참고.
+KIWI_POOL_SIZE = int(os.getenv("KIWI_POOL_SIZE", "0"))
+
+TERMINAL_PUNCT = (".", "!", "?")
+
+
+class AnalysisCache:
+    """텍스트 -> 형태소 태그 튜플 LRU 캐시 (스레드 안전, 분석 자체는 잠금 밖에서 수행)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> Optional[Tuple[str, ...]]:
+        with self._lock:
+            tags = self._data.get(text)
+            if tags is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(text)
+            self.hits += 1
+            return tags
+
+    def put(self, text: str, tags: Tuple[str, ...]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[text] = tags
+            self._data.move_to_end(text)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
 class KiwiTagger:
     _instance = None
+    _init_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(KiwiTagger, cls).__new__(cls)
+            with cls._init_lock:
+                if cls._instance is None:
+                    instance = super(KiwiTagger, cls).__new__(cls)
+                    # 모델은 첫 사용 시점(또는 load() 호출 시)에 로드합니다.
+                    instance._kiwi = None
+                    instance._loaded = False
+                    instance._load_lock = threading.Lock()
+                    instance._pool = None
+                    instance.load_seconds = None
+                    instance.cache = AnalysisCache(KIWI_CACHE_SIZE)
+                    cls._instance = instance
+        return cls._instance
+
+    @staticmethod
+    def _create_kiwi() -> "Kiwi":
+        # kiwipiepy 는 import 자체도 무거우므로 서버 import 시점이 아니라 로드 시점에 가져옵니다.
+        from kiwipiepy import Kiwi
+
+        # 사용자 설정에 따라 'cong' 모델 사용
+        return Kiwi(
+            num_workers=KIWI_NUM_WORKERS,
+            integrate_allomorph=True,
+            model_type='cong',
+            typo_cost_threshold=2.5
+        )
+
+    def load(self) -> Optional["Kiwi"]:
+        """Kiwi 모델을 로드합니다 (이미 로드했으면 즉시 반환). 실패 시 None."""
+        if self._loaded:
+            return self._kiwi
+        with self._load_lock:
+            if self._loaded:
+                return self._kiwi
+            start = time.time()
             try:
-                # 사용자 설정에 따라 'cong' 모델 사용
-                cls._instance.kiwi = Kiwi(
-                    num_workers=0, 
-                    integrate_allomorph=True, 
-                    model_type='cong', 
-                    typo_cost_threshold=2.5
+                self._kiwi = self._create_kiwi()
+                if KIWI_POOL_SIZE > 0:
+                    pool: "queue.Queue[Kiwi]" = queue.Queue()
+                    pool.put(self._kiwi)
+                    for _ in range(KIWI_POOL_SIZE - 1):
+                        pool.put(self._create_kiwi())
+                    self._pool = pool
+                self.load_seconds = round(time.time() - start, 3)
+                logger.info(
+                    f"Kiwi initialized successfully with model_type='cong' in {self.load_seconds}s "
+                    f"(num_workers={KIWI_NUM_WORKERS}, pool_size={KIWI_POOL_SIZE})."
                 )
-                logger.info("Kiwi initialized successfully with model_type='cong'.")
             except Exception as e:
                 # [[memory:6804125]] 예외 발생 시 로깅
                 logger.error(f"Failed to initialize Kiwi in KiwiTagger: {e}")
-                cls._instance.kiwi = None
-        return cls._instance
+                self._kiwi = None
+            self._loaded = True
+        return self._kiwi
+
+    @property
+    def kiwi(self) -> Optional["Kiwi"]:
+        return self.load()
+
+    @contextmanager
+    def _acquire(self) -> Iterator["Kiwi"]:
+        """분석에 사용할 Kiwi 인스턴스. 풀이 없으면 공유 인스턴스를 잠금 없이 그대로 사용합니다."""
+        if self._pool is None:
+            yield self._kiwi
+            return
+        kiwi = self._pool.get()
+        try:
+            yield kiwi
+        finally:
+            self._pool.put(kiwi)
+
+    def _analyze_tags(self, texts: List[str]) -> List[Tuple[str, ...]]:
+        """텍스트별 최상위 분석 결과의 태그 튜플 (캐시 적중분은 Kiwi 를 호출하지 않음)."""
+        out: List[Optional[Tuple[str, ...]]] = [self.cache.get(t) for t in texts]
+        # 같은 배치 안의 중복 텍스트는 한 번만 분석합니다.
+        missing = list(dict.fromkeys(texts[i] for i, tags in enumerate(out) if tags is None))
+        if missing:
+            with self._acquire() as kiwi:
+                if len(missing) == 1:
+                    results = [kiwi.analyze(missing[0])]
+                else:
+                    # Iterable 입력은 Kiwi 내부 스레드 풀(num_workers)로 병렬 분석됩니다.
+                    results = list(kiwi.analyze(missing))
+            analyzed: Dict[str, Tuple[str, ...]] = {}
+            for text, analysis in zip(missing, results):
+                tags = tuple(t.tag for t in analysis[0][0]) if analysis else ()
+                self.cache.put(text, tags)
+                analyzed[text] = tags
+            out = [tags if tags is not None else analyzed[t] for t, tags in zip(texts, out)]
+        return out
 
     def split_into_sents(self, text: str) -> List[Any]:
         """
@@ -33,57 +170,93 @@ class KiwiTagger:
         if not text.strip() or self.kiwi is None:
             return []
         try:
-            return self.kiwi.split_into_sents(text)
+            with self._acquire() as kiwi:
+                return kiwi.split_into_sents(text)
         except Exception as e:
             # [[memory:6804125]]
             logger.error(f"Kiwi split_into_sents failed: {e}")
             return []
 
+    def split_into_sents_batch(self, texts: List[str]) -> List[List[Any]]:
+        """여러 텍스트를 Kiwi 멀티스레드 인터페이스로 한 번에 문장 분리합니다 (입력 순서 유지)."""
+        out: List[List[Any]] = [[] for _ in texts]
+        idx = [i for i, t in enumerate(texts) if t.strip()]
+        if not idx or self.kiwi is None:
+            return out
+        try:
+            with self._acquire() as kiwi:
+                for i, sents in zip(idx, kiwi.split_into_sents([texts[i] for i in idx])):
+                    out[i] = sents
+        except Exception as e:
+            # [[memory:6804125]]
+            logger.error(f"Kiwi batch split_into_sents failed: {e}")
+        return out
+
+    @staticmethod
+    def _ending_type(tags: Tuple[str, ...]) -> Optional[str]:
+        # EF가 하나라도 있으면 EF 우선 반환, EC가 있으면 EC 반환
+        if 'EF' in tags:
+            return 'EF'
+        if 'EC' in tags:
+            return 'EC'
+        return None
+
     def get_ending_type(self, text: str) -> Optional[str]:
         """
         텍스트의 어미 타입을 반환합니다 (EF, EC, 또는 None).
         """
-        if not text.strip() or self.kiwi is None:
-            return None
-            
+        return self.get_ending_types([text])[0]
+
+    def get_ending_types(self, texts: List[str]) -> List[Optional[str]]:
+        """get_ending_type 의 배치 버전."""
+        out: List[Optional[str]] = [None] * len(texts)
+        idx = [i for i, t in enumerate(texts) if t.strip()]
+        if not idx or self.kiwi is None:
+            return out
         try:
-            analysis = self.kiwi.analyze(text)
-            if analysis:
-                tokens = analysis[0][0]
-                # EF가 하나라도 있으면 EF 우선 반환
-                if any(t.tag == 'EF' for t in tokens):
-                    return 'EF'
-                # EC가 있으면 EC 반환
-                if any(t.tag == 'EC' for t in tokens):
-                    return 'EC'
+            for i, tags in zip(idx, self._analyze_tags([texts[i] for i in idx])):
+                out[i] = self._ending_type(tags)
         except Exception as e:
             # [[memory:6804125]]
-            logger.error(f"Kiwi analysis failed for text '{text}': {e}")
-            if any(p in text for p in [".", "!", "?"]):
-                return 'EF'
-        
-        return None
+            logger.error(f"Kiwi analysis failed for {len(idx)} texts: {e}")
+            for i in idx:
+                if any(p in texts[i] for p in TERMINAL_PUNCT):
+                    out[i] = 'EF'
+        return out
 
     def is_terminal_ending(self, text: str) -> bool:
         """
         텍스트에 종결 어미(EF) 또는 연결 어미(EC)가 포함되어 있는지 확인합니다.
         """
-        if not text.strip() or self.kiwi is None:
-            return False
-            
+        return self.is_terminal_endings([text])[0]
+
+    def is_terminal_endings(self, texts: List[str]) -> List[bool]:
+        """is_terminal_ending 의 배치 버전."""
+        out = [False] * len(texts)
+        idx = [i for i, t in enumerate(texts) if t.strip()]
+        if not idx or self.kiwi is None:
+            return out
         try:
-            analysis = self.kiwi.analyze(text)
-            if analysis:
-                tokens = analysis[0][0]
+            for i, tags in zip(idx, self._analyze_tags([texts[i] for i in idx])):
                 # EF(종결 어미) 또는 EC(연결 어미)가 하나라도 있으면 분할 후보로 간주
-                return any(t.tag in ['EF', 'EC'] for t in tokens)
+                out[i] = 'EF' in tags or 'EC' in tags
         except Exception as e:
             # [[memory:6804125]] 예외 발생 시 로깅
-            logger.error(f"Kiwi analysis failed for text '{text}': {e}")
+            logger.error(f"Kiwi analysis failed for {len(idx)} texts: {e}")
             # 분석 실패 시 마침표 등으로 보조 판단
-            return any(p in text for p in [".", "!", "?"])
-        
-        return False
+            for i in idx:
+                out[i] = any(p in texts[i] for p in TERMINAL_PUNCT)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        """모델 로드 시간과 분석 캐시 적중률."""
+        return {
+            "loaded": self._loaded and self._kiwi is not None,
+            "load_seconds": self.load_seconds,
+            "num_workers": KIWI_NUM_WORKERS,
+            "pool_size": KIWI_POOL_SIZE,
+            "cache": self.cache.stats(),
+        }
 
-# 싱글톤 인스턴스 생성
+# 싱글톤 인스턴스 생성 (모델은 첫 사용 시 지연 로드)
 kiwi_tagger = KiwiTagger()
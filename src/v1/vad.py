@@ -0,0 +1,212 @@
+import os
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from .batching import fbank_frame_range
+
+logger = logging.getLogger(__name__)
+
+VAD_MODES: Tuple[str, ...] = ("off", "trim", "mask")
+# 요청에서 지정하지 않았을 때 사용할 기본 모드 (off 이면 기존과 동일)
+VAD_MODE = os.getenv("VAD_MODE", "off")
+# 잡음 바닥(프레임 에너지 하위 백분위) 대비 음성으로 판단할 최소 에너지 차이(dB)
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "15"))
+# 이 값(dBFS)보다 조용한 프레임은 항상 비음성으로 봅니다.
+VAD_ABS_FLOOR_DB = float(os.getenv("VAD_ABS_FLOOR_DB", "-60"))
+# 음성 프레임 앞뒤로 음성으로 확장할 길이(초, 자음/어미 잘림 방지)
+VAD_HANGOVER_SEC = float(os.getenv("VAD_HANGOVER_SEC", "0.15"))
+# 문장 안 음성이 이보다 짧으면 임베딩하지 않고 'no_speech' 로 표시합니다.
+VAD_MIN_SPEECH_SEC = float(os.getenv("VAD_MIN_SPEECH_SEC", "0.3"))
+# mask 모드에서 제거할 문장 내부 휴지의 최소 길이(초). 더 짧은 휴지는 그대로 둡니다.
+VAD_MIN_PAUSE_SEC = float(os.getenv("VAD_MIN_PAUSE_SEC", "0.3"))
+NOISE_PERCENTILE = 10
+PEAK_PERCENTILE = 95
+# 에너지 계산 시 한 번에 읽을 길이(초). 긴 PcmFile 도 블록 단위로만 메모리에 올립니다.
+VAD_BLOCK_SEC = 60.0
+PRE_EMPHASIS = 0.97
+
+
+@dataclass(frozen=True)
+class VADConfig:
+    mode: str = "trim"
+    margin_db: float = VAD_MARGIN_DB
+    hangover_sec: float = VAD_HANGOVER_SEC
+    min_speech_sec: float = VAD_MIN_SPEECH_SEC
+    min_pause_sec: float = VAD_MIN_PAUSE_SEC
+
+    @property
+    def key(self) -> str:
+        """점수 캐시 식별자에 붙일 설정 문자열."""
+        return f"vad={self.mode}:{self.margin_db}:{self.hangover_sec}:{self.min_speech_sec}:{self.min_pause_sec}"
+
+
+def vad_config(mode: Optional[str] = None, margin_db: Optional[float] = None) -> Optional[VADConfig]:
+    """요청 옵션으로 VAD 설정을 만듭니다. mode 가 None 이면 VAD_MODE, 'off' 이면 None 을 반환합니다."""
+    mode = (mode or VAD_MODE).lower()
+    if mode not in VAD_MODES:
+        raise ValueError(f"vad must be one of {VAD_MODES}")
+    if mode == "off":
+        return None
+    return VADConfig(mode=mode, margin_db=VAD_MARGIN_DB if margin_db is None else float(margin_db))
+
+
+def frame_energy_db(wav: np.ndarray, shift: int = 160, length: int = 400) -> np.ndarray:
+    """fbank 와 같은 프레임 격자(프레임 i = 샘플 [i*shift, i*shift+length))의 프리엠퍼시스 에너지(dBFS) [F].
+
+    누적합으로 모든 프레임의 제곱합을 한 번에 계산하므로 FFT 없이 O(샘플 수)입니다.
+    프리엠퍼시스로 저주파 험/DC 성분을 줄여 음성 대역 에너지에 가깝게 만듭니다.
+    """
+    n = wav.shape[-1]
+    if n < length:
+        return np.zeros(0, dtype=np.float32)
+    x = wav.astype(np.float64, copy=False)
+    y = np.empty_like(x)
+    y[0] = x[0]
+    y[1:] = x[1:] - PRE_EMPHASIS * x[:-1]
+    csum = np.concatenate(([0.0], np.cumsum(y * y)))
+    starts = np.arange((n - length) // shift + 1) * shift
+    energy = (csum[starts + length] - csum[starts]) / length
+    return (10 * np.log10(energy + 1e-12)).astype(np.float32)
+
+
+def _dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    """True 구간을 앞뒤로 radius 프레임씩 넓힙니다."""
+    if radius <= 0 or not mask.any():
+        return mask
+    csum = np.concatenate(([0], np.cumsum(mask, dtype=np.int64)))
+    idx = np.arange(len(mask))
+    lo = np.clip(idx - radius, 0, len(mask))
+    hi = np.clip(idx + radius + 1, 0, len(mask))
+    return (csum[hi] - csum[lo]) > 0
+
+
+def _fill_short_gaps(mask: np.ndarray, min_gap: int) -> np.ndarray:
+    """min_gap 프레임보다 짧은 False 구간을 True 로 채웁니다."""
+    if min_gap <= 1 or mask.all():
+        return mask
+    out = mask.copy()
+    padded = np.concatenate(([True], mask, [True]))
+    diff = np.diff(padded.astype(np.int8))
+    gap_starts = np.flatnonzero(diff == -1)
+    gap_ends = np.flatnonzero(diff == 1)
+    for s, e in zip(gap_starts, gap_ends):
+        if e - s < min_gap:
+            out[s:e] = True
+    return out
+
+
+class RecordingVAD:
+    """녹음 하나의 프레임 에너지를 한 번 계산해 두고, 문장마다 음성 프레임을 판단합니다.
+
+    임계값은 녹음 전체 에너지 분포로 정합니다: min(잡음 바닥 + margin, 상위 에너지 - margin) 과 절대 하한 중 큰 값.
+    조용한 구간이 거의 없는 녹음에서도 음성 프레임을 잘라내지 않도록 상위 에너지 기준을 함께 씁니다.
+    """
+
+    def __init__(self, audio: Any, sample_rate: int = 16000, block_sec: float = VAD_BLOCK_SEC):
+        self.audio = audio
+        self.sample_rate = sample_rate
+        self.shift = sample_rate // 100
+        self.length = sample_rate * 25 // 1000
+        self.energy_db = self._compute(max(1, int(block_sec * 100)))
+        self._masks: Dict[Tuple[float, float], np.ndarray] = {}
+
+    def _compute(self, block_frames: int) -> np.ndarray:
+        n_samples = self.audio.n_samples
+        total = 0 if n_samples < self.length else (n_samples - self.length) // self.shift + 1
+        parts: List[np.ndarray] = []
+        for f0 in range(0, total, block_frames):
+            f1 = min(total, f0 + block_frames)
+            wav = self.audio.read(f0 * self.shift, (f1 - 1) * self.shift + self.length)
+            parts.append(frame_energy_db(wav.reshape(-1).numpy(), self.shift, self.length))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    def threshold_db(self, margin_db: float) -> float:
+        if not len(self.energy_db):
+            return VAD_ABS_FLOOR_DB
+        floor, peak = np.percentile(self.energy_db, [NOISE_PERCENTILE, PEAK_PERCENTILE])
+        return float(max(VAD_ABS_FLOOR_DB, min(floor + margin_db, peak - margin_db)))
+
+    def speech_mask(self, cfg: VADConfig) -> np.ndarray:
+        """녹음 전체의 프레임별 음성 여부 [F] (설정별로 한 번만 계산)."""
+        key = (cfg.margin_db, cfg.hangover_sec)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = _dilate(self.energy_db > self.threshold_db(cfg.margin_db), int(round(cfg.hangover_sec * 100)))
+            self._masks[key] = mask
+        return mask
+
+    def annotate(self, chunk: Dict[str, Any], cfg: VADConfig) -> Dict[str, Any]:
+        """문장 청크의 음성 구간 정보를 붙인 사본을 반환합니다.
+
+        - speech_duration: 문장 안 음성 프레임 길이(초)
+        - 음성이 min_speech_sec 보다 짧으면 speaker='no_speech' 로 표시합니다.
+        - embed_start/embed_end: 앞뒤 비음성을 잘라낸 임베딩 구간(초). 결과의 start/end 는 원래 값을 유지합니다.
+        - speech_keep (mask 모드): 임베딩 구간 프레임 중 사용할 프레임 (긴 문장 내부 휴지 제외)
+        """
+        out = dict(chunk)
+        sr, mask = self.sample_rate, self.speech_mask(cfg)
+        s_idx = max(0, int(round(chunk["start"] * sr)))
+        e_idx = min(self.audio.n_samples, int(round(chunk["end"] * sr)))
+        f0, f1 = fbank_frame_range(s_idx, e_idx, len(mask), sr)
+        seg = mask[f0:f1]
+        speech_frames = int(seg.sum())
+        out["speech_duration"] = round(speech_frames / 100, 3)
+        if speech_frames < max(1, int(round(cfg.min_speech_sec * 100))):
+            out["speaker"] = "no_speech"
+            return out
+        first = int(np.argmax(seg))
+        last = len(seg) - 1 - int(np.argmax(seg[::-1]))
+        out["embed_start"] = (f0 + first) * self.shift / sr
+        out["embed_end"] = ((f0 + last) * self.shift + self.length) / sr
+        if cfg.mode == "mask":
+            keep = _fill_short_gaps(seg[first:last + 1], int(round(cfg.min_pause_sec * 100)))
+            if not keep.all():
+                out["speech_keep"] = keep
+        return out
+
+
+def apply_vad(audio: Any, chunks: List[Dict[str, Any]], cfg: VADConfig) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """refine_whisper_json 청크에 음성 구간 정보를 붙이고, 임베딩에서 절약한 길이를 요약합니다."""
+    vad = RecordingVAD(audio, audio.sample_rate)
+    out: List[Dict[str, Any]] = []
+    stats = {"mode": cfg.mode, "segments": 0, "no_speech": 0, "segment_seconds": 0.0, "embedded_seconds": 0.0}
+    for chunk in chunks:
+        if chunk.get("speaker") == "very_short":
+            out.append(chunk)
+            continue
+        annotated = vad.annotate(chunk, cfg)
+        out.append(annotated)
+        stats["segments"] += 1
+        stats["segment_seconds"] += max(0.0, chunk["end"] - chunk["start"])
+        if annotated.get("speaker") == "no_speech":
+            stats["no_speech"] += 1
+        elif "speech_keep" in annotated:
+            stats["embedded_seconds"] += float(annotated["speech_keep"].sum()) / 100
+        else:
+            stats["embedded_seconds"] += annotated["embed_end"] - annotated["embed_start"]
+    stats["threshold_db"] = round(vad.threshold_db(cfg.margin_db), 2)
+    stats["segment_seconds"] = round(stats["segment_seconds"], 3)
+    stats["embedded_seconds"] = round(stats["embedded_seconds"], 3)
+    stats["saved_ratio"] = (
+        round(1 - stats["embedded_seconds"] / stats["segment_seconds"], 4) if stats["segment_seconds"] else 0.0
+    )
+    return out, stats
+
+
+def select_speech_frames(feats: torch.Tensor, keep: np.ndarray) -> torch.Tensor:
+    """평균 정규화된 fbank [T, 80] 에서 keep 프레임만 남기고 다시 평균 정규화합니다.
+
+    상수를 뺀 특징에서 프레임을 고른 뒤 다시 평균을 빼면, 원래 특징에서 고른 프레임을 정규화한 것과 같습니다.
+    """
+    n = feats.size(0)
+    mask = np.ones(n, dtype=bool)
+    m = min(n, len(keep))
+    mask[:m] = keep[:m]
+    if not mask.any():
+        return feats
+    selected = feats[torch.from_numpy(mask)]
+    return selected - selected.mean(dim=0, keepdim=True)
@@ -0,0 +1,56 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def stub_meeting():
+    """스텁 임베딩 모델 엔진과 두 화자가 번갈아 말하는 짧은 합성 회의 (파형, Whisper 결과, 정답, 기준 행렬).
+
+    기준 음성 파일 대신 합성 음성의 임베딩으로 EnrollmentMatrix 를 직접 만듭니다.
+    """
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("torchaudio")
+    pytest.importorskip("kiwipiepy")
+    import numpy as np
+
+    from src.v1.main import SpeakerEngine
+    from src.v1.scoring import EnrollmentMatrix
+    from src.v1.segment_cache import SegmentCache
+    from src.resoursces.test.synthetic_meeting import (
+        SAMPLE_RATE, StubEmbeddingModel, make_sentence, make_voice, synth_voice,
+    )
+
+    engine = SpeakerEngine("stub", embedding_model=StubEmbeddingModel())
+    rng = np.random.default_rng(0)
+    names = ["spk00", "spk01"]
+    voices = [make_voice(rng) for _ in names]
+    matrix = EnrollmentMatrix.from_speaker_embeddings({
+        name: [engine.embed_waveform(torch.from_numpy(synth_voice(voice, 6.0, rng)).unsqueeze(0))]
+        for name, voice in zip(names, voices)
+    })
+    matrix.key = "stub-refs"
+
+    parts, segments, truth = [], [], []
+    t = 0.0
+    for i in range(6):
+        gap = 0.003 * rng.standard_normal(int(0.4 * SAMPLE_RATE)).astype(np.float32)
+        parts.append(gap)
+        t += len(gap) / SAMPLE_RATE
+        wav = synth_voice(voices[i % 2], 2.5, rng)
+        parts.append(wav)
+        segments.append(make_sentence(rng, t, t + len(wav) / SAMPLE_RATE))
+        truth.append(names[i % 2])
+        t += len(wav) / SAMPLE_RATE
+    wav = torch.from_numpy(np.concatenate(parts)).unsqueeze(0)
+
+    def fresh_engine():
+        """세그먼트 캐시를 비운 엔진 (메모리 전용)."""
+        engine.segment_cache = SegmentCache(model_id=engine.model_id, disk_dir="")
+        return engine
+
+    return {
+        "engine": fresh_engine,
+        "matrix": matrix,
+        "wav": wav,
+        "whisper": {"segments": segments},
+        "truth": truth,
+    }
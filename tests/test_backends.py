@@ -0,0 +1,24 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.v1.backends import export_path, weights_digest  # noqa: E402
+
+
+def test_weights_digest_tracks_checkpoint_values():
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(4, 3), torch.nn.BatchNorm1d(3))
+    digest = weights_digest(model)
+    assert digest == weights_digest(model)
+
+    with torch.no_grad():
+        model[0].weight[0, 0] += 1e-3
+    assert weights_digest(model) != digest
+
+
+def test_export_path_includes_digest(tmp_path):
+    old = export_path(str(tmp_path), "eres2net", "onnx", "int8", "aaaa")
+    new = export_path(str(tmp_path), "eres2net", "onnx", "int8", "bbbb")
+    assert old != new
+    assert new.endswith("eres2net.bbbb.int8.onnx")
+    assert export_path(str(tmp_path), "bench", "torchscript", "none").endswith("bench.none.ts")
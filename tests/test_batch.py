@@ -0,0 +1,35 @@
+import json
+
+from src.batch import read_checkpoint
+
+
+def _write(path, records, tail: bytes = b""):
+    with open(path, "wb") as f:
+        for record in records:
+            f.write(json.dumps(record).encode("utf-8") + b"\n")
+        f.write(tail)
+
+
+def test_read_checkpoint_missing_file(tmp_path):
+    assert read_checkpoint(str(tmp_path / "out.jsonl")) == set()
+
+
+def test_read_checkpoint_truncates_incomplete_last_line(tmp_path):
+    path = tmp_path / "out.jsonl"
+    records = [{"id": "a", "status": "success"}, {"id": "b", "status": "error"}]
+    _write(path, records, tail=b'{"id": "c", "stat')
+    complete = path.read_bytes()[: -len(b'{"id": "c", "stat')]
+
+    assert read_checkpoint(str(path)) == {"a", "b"}
+    assert path.read_bytes() == complete
+    # 잘라낸 뒤 이어서 기록해도 모든 줄이 온전한 JSON 입니다.
+    with open(path, "ab") as f:
+        f.write(json.dumps({"id": "c", "status": "success"}).encode("utf-8") + b"\n")
+    assert [json.loads(line)["id"] for line in path.read_bytes().splitlines()] == ["a", "b", "c"]
+
+
+def test_read_checkpoint_retry_failed(tmp_path):
+    path = tmp_path / "out.jsonl"
+    _write(path, [{"id": "a", "status": "success"}, {"id": "b", "status": "error"}])
+    assert read_checkpoint(str(path), retry_failed=True) == {"a"}
+    assert path.read_bytes().endswith(b"\n")
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from src.v1.clustering import agglomerative_cluster, neighbor_labels
+
+
+def _unit(*angles_deg):
+    rad = np.deg2rad(np.array(angles_deg, dtype=np.float64))
+    return np.stack([np.cos(rad), np.sin(rad)], axis=1).astype(np.float32)
+
+
+def test_agglomerative_cluster_empty():
+    labels = agglomerative_cluster(np.zeros((0, 4), dtype=np.float32))
+    assert labels.shape == (0,)
+
+
+def test_agglomerative_cluster_labels_follow_first_appearance():
+    a, b, c = np.eye(3, dtype=np.float32)
+    embs = np.stack([b, a, b * 2.0, c, a + 0.01 * b])
+    labels = agglomerative_cluster(embs, threshold=0.4)
+    assert labels.tolist() == [0, 1, 0, 2, 1]
+
+
+def test_agglomerative_cluster_threshold_stop():
+    # cos(60도) = 0.5: 임계값 이상이면 병합, 초과하면 병합하지 않습니다.
+    embs = _unit(0, 60)
+    assert agglomerative_cluster(embs, threshold=0.49).tolist() == [0, 0]
+    assert agglomerative_cluster(embs, threshold=0.51).tolist() == [0, 1]
+
+
+def test_agglomerative_cluster_average_linkage():
+    # 0도/10도는 먼저 병합되고, 90도와의 평균 유사도는 (cos 90 + cos 80) / 2 ≈ 0.087 이므로 0.1 에서 멈춥니다.
+    embs = _unit(0, 10, 90)
+    assert agglomerative_cluster(embs, threshold=0.1).tolist() == [0, 0, 1]
+    assert agglomerative_cluster(embs, threshold=0.05).tolist() == [0, 0, 0]
+
+
+def test_neighbor_labels_max_gap_boundary():
+    times = [(0.0, 1.0), (3.0, 4.0)]
+    assert neighbor_labels(times, [0, None], max_gap=2.0) == [0, 0]
+    assert neighbor_labels(times, [0, None], max_gap=1.5) == [0, None]
+    assert neighbor_labels(times, [None, 1], max_gap=2.0) == [1, 1]
+
+
+def test_neighbor_labels_prefers_closer_neighbor():
+    times = [(0.0, 1.0), (1.5, 2.0), (2.2, 3.0)]
+    assert neighbor_labels(times, [0, None, 1], max_gap=2.0) == [0, 1, 1]
+    # 간격이 같으면 앞 구간을 따릅니다.
+    times = [(0.0, 1.0), (1.5, 2.0), (2.5, 3.0)]
+    assert neighbor_labels(times, [0, None, 1], max_gap=2.0) == [0, 0, 1]
+
+
+def test_neighbor_labels_without_labels():
+    assert neighbor_labels([(0.0, 1.0), (1.0, 2.0)], [None, None]) == [None, None]
+
+
+def test_cluster_mode_keeps_vad_no_speech(stub_meeting, monkeypatch):
+    torch = pytest.importorskip("torch")
+    from src.v1.vad import VADConfig
+
+    engine = stub_meeting["engine"]()
+    monkeypatch.setattr(engine, "load_matrix", lambda root: stub_meeting["matrix"])
+    # 마지막 문장 바로 뒤(이웃 화자 추론 거리 안)에 무음 구간의 문장을 붙입니다.
+    end = stub_meeting["wav"].size(1) / 16000
+    wav = torch.cat([stub_meeting["wav"], torch.zeros(1, 2 * 16000)], dim=1)
+    words = [
+        {"word": w, "start": end + 0.2 + i * 0.5, "end": end + 0.6 + i * 0.5}
+        for i, w in enumerate(["조용한", "구간입니다."])
+    ]
+    silent = {"start": end + 0.2, "end": end + 1.1, "text": "조용한 구간입니다.", "words": words}
+    whisper = {"segments": stub_meeting["whisper"]["segments"] + [silent]}
+
+    result = engine.identify_speaker(
+        wav, whisper, "unused", threshold=0.0, mode="cluster", vad=VADConfig(mode="trim")
+    )
+    last = result["results"][-1]
+    assert last["speaker"] == "no_speech"
+    assert "inferred" not in last and "cluster" not in last
+    assert [r["speaker"] for r in result["results"][:-1]] == stub_meeting["truth"]
@@ -0,0 +1,62 @@
+import os
+import threading
+
+from src.v1.jobs import JobManager
+
+
+def _audio(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"audio")
+    return str(path)
+
+
+def test_stop_cancels_queued_jobs_and_removes_uploads(tmp_path):
+    release = threading.Event()
+    started = threading.Event()
+
+    def run(job):
+        started.set()
+        release.wait(5.0)
+        yield {"status": "success"}
+
+    manager = JobManager(run, workers=1, directory=str(tmp_path))
+    running = manager.submit({}, _audio(tmp_path, "a"))
+    assert started.wait(5.0)
+    queued = [manager.submit({}, _audio(tmp_path, f"q{i}")) for i in range(3)]
+
+    # 실행 중인 작업은 다음 결과 시점에 취소됩니다.
+    stopper = threading.Thread(target=manager.stop)
+    stopper.start()
+    release.set()
+    stopper.join(10.0)
+
+    assert running.status == "cancelled"
+    assert [job.status for job in queued] == ["cancelled"] * 3
+    assert all(job.finished_at is not None for job in queued)
+    assert not any(os.path.exists(job.audio_path) for job in [running] + queued)
+    assert manager.stats()["jobs"]["queued"] == 0
+    assert manager._queued == 0
+
+
+def test_position_follows_queue_order(tmp_path):
+    release = threading.Event()
+    started = threading.Event()
+
+    def run(job):
+        started.set()
+        release.wait(5.0)
+        yield {"status": "success"}
+
+    manager = JobManager(run, workers=1, directory=str(tmp_path))
+    try:
+        manager.submit({}, _audio(tmp_path, "a"))
+        assert started.wait(5.0)
+        first = manager.submit({}, _audio(tmp_path, "b"), priority="backfill")
+        second = manager.submit({}, _audio(tmp_path, "c"), priority="backfill")
+        urgent = manager.submit({}, _audio(tmp_path, "d"), priority="interactive")
+        # 시계가 같거나 거꾸로 가도 순서는 제출 순서(seq)를 따릅니다.
+        first.created_at, second.created_at = 2000.0, 1000.0
+        assert [manager.position(job) for job in (urgent, first, second)] == [0, 1, 2]
+    finally:
+        release.set()
+        manager.stop()
@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("kiwipiepy")
+
+from src.v1.utils.json_paser import IncrementalRefiner, iter_refined_sentences, refine_whisper_json  # noqa: E402
+
+TEXT = "회의를 시작하겠습니다. 지난주 안건부터 검토하죠. 다음 일정은 금요일입니다. 질문 있으신가요?"
+
+
+def _segments():
+    words = [{"word": w, "start": i * 0.5, "end": i * 0.5 + 0.4} for i, w in enumerate(TEXT.split())]
+    # 세그먼트 경계가 문장 경계와 맞지 않도록 세 단어씩 나눕니다.
+    return [
+        {"start": ws[0]["start"], "end": ws[-1]["end"], "text": " ".join(w["word"] for w in ws), "words": ws}
+        for ws in (words[i:i + 3] for i in range(0, len(words), 3))
+    ]
+
+
+def _key(sentences):
+    return [(s["start"], s["end"], s["text"], s["speaker"]) for s in sentences]
+
+
+def test_flush_matches_refine_whisper_json():
+    expected = refine_whisper_json({"segments": _segments()})
+    assert len(expected) == 4
+
+    refiner = IncrementalRefiner()
+    out = refiner.add_words([w for seg in _segments() for w in seg["words"]])
+    out += refiner.flush()
+    assert _key(out) == _key(expected)
+    assert refiner.pending_start is None
+
+
+def test_incremental_segments_match_refine_whisper_json():
+    expected = refine_whisper_json({"segments": _segments()})
+    assert _key(iter_refined_sentences(_segments())) == _key(expected)
+
+
+def test_refiner_holds_open_sentence_until_flush():
+    refiner = IncrementalRefiner()
+    words = [{"word": w, "start": i * 0.5, "end": i * 0.5 + 0.4} for i, w in enumerate("다음 일정은 금요일".split())]
+    assert refiner.add_words(words) == []
+    assert refiner.pending_start == 0.0
+    assert _key(refiner.flush()) == [(0.0, 1.4, "다음 일정은 금요일", "unknown")]
+
+
+def test_refine_keep_words():
+    sentences = refine_whisper_json({"segments": _segments()}, keep_words=True)
+    assert [w["word"] for s in sentences for w in s["words"]] == TEXT.split()
+    assert all("words" not in s for s in refine_whisper_json({"segments": _segments()}))
@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("kiwipiepy")
+
+from src.v1.utils.kr_tag import KiwiTagger  # noqa: E402
+
+TEXTS = [
+    "회의를 시작하겠습니다 지난주 안건부터 검토하죠",
+    "다음 일정은 금요일입니다. 질문 있으신가요?",
+    "예산 문제는 다음 주에 다시 논의하고 오늘은 일정만 정리하겠습니다",
+    "네 알겠습니다 그럼 자료를 먼저 공유해 주세요",
+]
+
+
+def test_shared_kiwi_is_safe_across_threads():
+    # KIWI_POOL_SIZE=0 에서는 하나의 Kiwi 를 잠금 없이 공유하므로, 동시 호출 결과가 순차 호출과 같아야 합니다.
+    kiwi = KiwiTagger().load()
+    if kiwi is None:
+        pytest.skip("Kiwi model is not available")
+
+    def analyze(text):
+        tags = tuple(t.tag for t in kiwi.analyze(text)[0][0])
+        sents = tuple(s.text for s in kiwi.split_into_sents(text))
+        return tags, sents
+
+    expected = [analyze(t) for t in TEXTS]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        got = list(pool.map(analyze, TEXTS * 50))
+    assert got == expected * 50
@@ -0,0 +1,42 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.v1.scoring import EnrollmentMatrix, aggregate_speaker_scores, cosine_matrix  # noqa: E402
+
+
+def _matrix(seed: int = 0) -> EnrollmentMatrix:
+    gen = torch.Generator().manual_seed(seed)
+    embeddings = torch.nn.functional.normalize(torch.randn(7, 16, generator=gen), dim=1)
+    # 화자별 기준 임베딩이 연속되지 않은 순서도 다룹니다.
+    ref_speaker = torch.tensor([1, 0, 2, 1, 0, 1, 2])
+    return EnrollmentMatrix(["a", "b", "c"], embeddings, ref_speaker)
+
+
+def _baseline(seg_embs: torch.Tensor, matrix: EnrollmentMatrix, aggregate: str) -> torch.Tensor:
+    """세그먼트 x 기준 임베딩 쌍마다 코사인 점수를 구해 화자별로 모으는 기존 방식."""
+    seg = torch.nn.functional.normalize(seg_embs.float(), dim=1)
+    out = torch.zeros(seg.size(0), len(matrix))
+    for i in range(seg.size(0)):
+        for spk in range(len(matrix)):
+            scores = [
+                float(torch.dot(seg[i], matrix.embeddings[r]))
+                for r in range(matrix.embeddings.size(0)) if int(matrix.ref_speaker[r]) == spk
+            ]
+            out[i, spk] = max(scores) if aggregate == "max" else sum(scores) / len(scores)
+    return out
+
+
+@pytest.mark.parametrize("aggregate", ["max", "mean"])
+def test_aggregate_speaker_scores_matches_pairwise_loop(aggregate):
+    matrix = _matrix()
+    seg_embs = torch.randn(5, 16, generator=torch.Generator().manual_seed(1))
+    got = aggregate_speaker_scores(cosine_matrix(seg_embs, matrix), matrix, aggregate)
+    assert got.shape == (5, 3)
+    assert torch.allclose(got, _baseline(seg_embs, matrix, aggregate), atol=1e-4)
+
+
+def test_aggregate_speaker_scores_rejects_unknown_mode():
+    matrix = _matrix()
+    with pytest.raises(ValueError):
+        aggregate_speaker_scores(torch.zeros(1, 7), matrix, "median")
@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.v1.segment_cache import SegmentCache  # noqa: E402
+from src.v1.vad import VADConfig  # noqa: E402
+
+
+def _embs(n: int, dim: int = 4) -> torch.Tensor:
+    return torch.arange(n * dim, dtype=torch.float32).reshape(n, dim)
+
+
+def test_memory_hit_and_miss():
+    cache = SegmentCache(max_items=10, disk_dir="")
+    cache.put_many("a", 1000, [(0, 100), (100, 200)], _embs(2))
+    got = cache.get_many("a", [(0, 100), (50, 150), (100, 200)])
+    assert torch.equal(got[0], _embs(2)[0])
+    assert got[1] is None
+    assert torch.equal(got[2], _embs(2)[1])
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.get_many("b", [(0, 100)]) == [None]
+
+
+def test_lru_eviction():
+    cache = SegmentCache(max_items=2, disk_dir="")
+    cache.put_many("a", 1000, [(0, 1), (1, 2)], _embs(2))
+    # 최근에 조회한 (0, 1) 은 남고 (1, 2) 가 밀려납니다.
+    cache.get_many("a", [(0, 1)])
+    cache.put_many("a", 1000, [(2, 3)], _embs(1))
+    got = cache.get_many("a", [(0, 1), (1, 2), (2, 3)])
+    assert [g is not None for g in got] == [True, False, True]
+    assert cache.evictions == 1
+
+
+def test_disabled_cache():
+    cache = SegmentCache(max_items=0, disk_dir="")
+    cache.put_many("a", 1000, [(0, 1)], _embs(1))
+    assert cache.get_many("a", [(0, 1)]) == [None]
+
+
+def test_reload_from_disk_shard(tmp_path):
+    writer = SegmentCache(model_id="m", max_items=10, disk_dir=str(tmp_path))
+    writer.put_many("abcdef", 1234, [(0, 100), (100, 200)], _embs(2))
+
+    reader = SegmentCache(model_id="m", max_items=10, disk_dir=str(tmp_path))
+    got = reader.get_many("abcdef", [(0, 100), (100, 200)])
+    assert torch.equal(torch.stack(got), _embs(2))
+    assert reader.disk_hits == 2
+    assert reader.n_samples("abcdef") == 1234
+    # 다른 모델의 캐시는 보이지 않습니다.
+    other = SegmentCache(model_id="other", max_items=10, disk_dir=str(tmp_path))
+    assert other.get_many("abcdef", [(0, 100)]) == [None]
+
+
+def test_disk_prune_tracks_usage_without_rescanning(tmp_path, monkeypatch):
+    cache = SegmentCache(model_id="m", max_items=100, disk_dir=str(tmp_path))
+    cache.put_many("aa0001", 1000, [(0, 1)], _embs(1, dim=256))
+    shard_bytes = cache._disk_bytes
+    assert shard_bytes > 0
+    cache.disk_mb = 2.5 * shard_bytes / (1024 * 1024)
+
+    scans = []
+    original = cache._scan_disk
+    monkeypatch.setattr(cache, "_scan_disk", lambda: scans.append(1) or original())
+    cache.put_many("bb0002", 1000, [(0, 1)], _embs(1, dim=256))
+    cache.get_many("aa0001", [(0, 1)])  # aa0001 을 최근 사용으로 표시
+    cache.put_many("cc0003", 1000, [(0, 1)], _embs(1, dim=256))
+
+    assert scans == []
+    assert os.path.isdir(cache._audio_dir("aa0001"))
+    assert not os.path.exists(cache._audio_dir("bb0002"))
+    assert os.path.isdir(cache._audio_dir("cc0003"))
+    assert list(cache._disk_usage) == ["aa0001", "cc0003"]
+
+
+def test_score_table_key_changes(stub_meeting):
+    engine = stub_meeting["engine"]()
+    matrix = stub_meeting["matrix"]
+    table = engine._score_table("h", matrix, "max", "exact")
+    table[(0, 1)] = (torch.zeros(1), torch.zeros(1, dtype=torch.long))
+    assert engine._score_table("h", matrix, "max", "exact") is table
+
+    assert engine._score_table("h", matrix, "mean", "exact") is not table
+    assert engine._score_table("h", matrix, "max", "ivf") is not table
+    assert engine._score_table("other", matrix, "max", "exact") is not table
+    mask = VADConfig(mode="mask")
+    assert engine._score_table("h", matrix, "max", "exact", mask) is not table
+    # trim 은 같은 구간이면 같은 프레임을 쓰므로 테이블을 공유합니다.
+    assert engine._score_table("h", matrix, "max", "exact", VADConfig(mode="trim")) is table
+
+    old_key = matrix.key
+    try:
+        matrix.key = "changed-refs"
+        assert engine._score_table("h", matrix, "max", "exact") is not table
+    finally:
+        matrix.key = old_key
+
+
+def test_rescore_reuses_cached_embeddings(stub_meeting, monkeypatch):
+    engine = stub_meeting["engine"]()
+    monkeypatch.setattr(engine, "load_matrix", lambda root: stub_meeting["matrix"])
+    first = engine.identify_speaker(
+        stub_meeting["wav"], stub_meeting["whisper"], "unused", threshold=0.0, audio_hash="meeting-hash"
+    )
+    assert first["job_id"]
+
+    calls = []
+    embed = engine.embedder.embed
+    monkeypatch.setattr(engine.embedder, "embed", lambda feats: calls.append(len(feats)) or embed(feats))
+    again = engine.rescore("unused", job_id=first["job_id"], threshold=0.0)
+
+    assert calls == []
+    assert again["audio_decoded"] is False
+    assert [r["speaker"] for r in again["results"]] == [r["speaker"] for r in first["results"]]
+    assert [r["score"] for r in again["results"]] == [r["score"] for r in first["results"]]
@@ -0,0 +1,58 @@
+from src.v1.speaker_change import UNKNOWN_LABEL, change_times, smooth_labels, split_at_words, window_labels, window_ranges
+
+
+def _chunk(n_words: int, step: float = 0.5):
+    words = [{"word": f"w{i}", "start": i * step, "end": i * step + 0.4} for i in range(n_words)]
+    return {"start": 0.0, "end": words[-1]["end"], "text": "", "speaker": "unknown", "words": words}
+
+
+def test_window_ranges_short_span_is_single_window():
+    assert window_ranges(10, 30, 40, 20) == [(10, 30)]
+    assert window_ranges(0, 40, 40, 20) == [(0, 40)]
+
+
+def test_window_ranges_last_window_aligned_to_end():
+    assert window_ranges(0, 100, 30, 15) == [(0, 30), (15, 45), (30, 60), (45, 75), (60, 90), (70, 100)]
+    assert window_ranges(0, 90, 30, 30) == [(0, 30), (30, 60), (60, 90)]
+
+
+def test_smooth_labels_removes_short_runs():
+    assert smooth_labels([0, 0, 0, 1, 0, 0, 2, 2, 2], min_run=2) == [0, 0, 0, 0, 0, 0, 2, 2, 2]
+    # 첫 구간이 짧으면 뒤쪽의 충분히 긴 구간 라벨을 따릅니다.
+    assert smooth_labels([1, 0, 0, 0], min_run=2) == [0, 0, 0, 0]
+    assert smooth_labels([0, 1, 0, 1], min_run=1) == [0, 1, 0, 1]
+    assert smooth_labels([], min_run=2) == []
+
+
+def test_change_times_between_window_centers():
+    assert change_times([0, 0, 1, 1], [1.0, 2.0, 3.0, 4.0]) == [(2.5, 0, 1)]
+    assert change_times([0, 0], [1.0, 2.0]) == []
+
+
+def test_window_labels_threshold():
+    assert window_labels([0.5, 0.1], [2, 3], threshold=0.25) == [2, UNKNOWN_LABEL]
+
+
+def test_split_at_words_cuts_at_nearest_word_boundary():
+    chunk = _chunk(12)
+    pieces = split_at_words(chunk, [3.4], min_piece=1.0)
+    assert [p["text"] for p in pieces] == ["w0 w1 w2 w3 w4 w5 w6", "w7 w8 w9 w10 w11"]
+    assert (pieces[0]["start"], pieces[0]["end"]) == (0.0, 3.4)
+    assert (pieces[1]["start"], pieces[1]["end"]) == (3.5, 5.9)
+    assert all(p["sentence"] == [0.0, 5.9] for p in pieces)
+    assert sum(len(p["words"]) for p in pieces) == 12
+
+
+def test_split_at_words_skips_short_pieces():
+    chunk = _chunk(12)
+    # 첫 조각이 min_piece 보다 짧아지는 경계는 사용하지 않습니다.
+    assert split_at_words(chunk, [0.45], min_piece=1.0) == [chunk]
+    pieces = split_at_words(chunk, [0.45, 3.4], min_piece=1.0)
+    assert len(pieces) == 2
+
+
+def test_split_at_words_without_words_or_times():
+    chunk = {"start": 0.0, "end": 5.0, "text": "", "speaker": "unknown"}
+    assert split_at_words(chunk, [2.5]) == [chunk]
+    chunk = _chunk(6)
+    assert split_at_words(chunk, []) == [chunk]